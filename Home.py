@@ -1,14 +1,9 @@
 import streamlit as st
-from app.services.user_service import login_user, register_user
-from app.data.users import get_user_by_username
-from app.data.db import connect_database
+from app.ui.session import restore_session, start_session, end_session
 
 
 st.set_page_config(page_title="Login / Register", page_icon="🔑", layout="centered")
 
-# Connect to database
-conn = connect_database()
-
 #initialise session state
 if "logged_in" not in st.session_state:
     st.session_state.logged_in = False
@@ -19,6 +14,9 @@ if "username" not in st.session_state:
 if "role" not in st.session_state:                              
     st.session_state.role = ""
 
+#log back in from a session token without touching the users table
+restore_session()
+
 st.title("🔐 Welcome")
 
 #if already logged in, go straight to dashboard
@@ -29,6 +27,10 @@ if st.session_state.logged_in:
         st.switch_page("pages/1_Cyber_Security_Dashboard.py") 
     st.stop()
 
+#pick the bcrypt cost in the background while the form is filled in, logins use the default until then
+from app.services.bcrypt_cost import start_calibration
+start_calibration()
+
 #tabs: login/register
 tab_login, tab_register = st.tabs(["Login", "Register"])
 
@@ -40,13 +42,13 @@ with tab_login:
     login_password = st.text_input("Password", type="password", key="login_password")
 
     if st.button("Log in", type="primary"):
-        success, message = login_user(conn, login_username, login_password)
+        #pandas and the database only load once someone actually logs in
+        from app.services.user_service import login_with_token
+        from app.data.db import get_connection
+        conn = get_connection()
+        success, message, token, user_role = login_with_token(conn, login_username, login_password)
         if success:
-            #fetch full user to get role
-            user = get_user_by_username(conn, login_username)
-            st.session_state.logged_in = True
-            st.session_state.username = login_username
-            st.session_state.role = user[3]
+            start_session(login_username, user_role, token)
             #navigate to dashboard page
             st.success(message)
             st.switch_page("pages/1_Cyber_Security_Dashboard.py")
@@ -67,6 +69,9 @@ with tab_register:
         if new_password != confirm_password:
             st.error("Passwords do not match.")
         else:
+            from app.services.user_service import register_user
+            from app.data.db import get_connection
+            conn = get_connection()
             success, message = register_user(conn, new_username, new_password, role)
             if success:
                 st.success(message)
@@ -76,9 +81,7 @@ with tab_register:
 
 if st.session_state.logged_in:
     if st.button("Log out"):
-        st.session_state.logged_in = False
-        st.session_state.username = ""
-        st.session_state.role = ""
+        end_session()
         st.info("You have been logged out.")
 
     
\ No newline at end of file
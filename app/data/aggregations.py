@@ -0,0 +1,242 @@
+import math
+import sqlite3
+
+import numpy as np
+import pandas as pd
+from app.data.cache import cached_query
+
+#every function here groups inside SQLite so the pages only receive
+#a handful of rows per chart instead of the whole table
+
+
+def _count_by(conn, table, column, where="", params=()):
+    return pd.read_sql_query(
+        f"SELECT {column}, COUNT(*) AS count FROM {table} {where} "
+        f"GROUP BY {column} ORDER BY {column}",
+        conn,
+        params=params,
+    )
+
+
+def table_columns(conn, table):
+    """Return the column names of a table."""
+    cursor = conn.cursor()
+    cursor.execute(f"PRAGMA table_info({table})")
+    return [row[1] for row in cursor.fetchall()]
+
+
+def _ensure_ln(conn):
+    try:
+        conn.execute("SELECT ln(1)")
+    except sqlite3.OperationalError:
+        #SQLite built without its math functions
+        conn.create_function("ln", 1, math.log, deterministic=True)
+
+
+def _axis_bins(column, low, high, bins, log_ratio):
+    """SQL for the 0-based bin of column, the bin centres, and whether the axis is logarithmic."""
+    if low > 0 and high / low > log_ratio:
+        edges = np.logspace(np.log10(low), np.log10(high), bins + 1)
+        width = (math.log(high) - math.log(low)) / bins
+        position = f"(ln({column}) - {math.log(low)!r}) / {width!r}"
+        centres, log = np.sqrt(edges[:-1] * edges[1:]), True
+    else:
+        if low == high:
+            high = low + 1
+        edges = np.linspace(low, high, bins + 1)
+        position = f"({column} - {low!r}) / {(high - low) / bins!r}"
+        centres, log = (edges[:-1] + edges[1:]) / 2, False
+    #the maximum itself lands one past the last bin
+    return f"MIN({bins - 1}, CAST({position} AS INTEGER))", centres, log
+
+
+def _density(conn, table, x, y, bins, log_ratio):
+    where = f"WHERE {x} IS NOT NULL AND {y} IS NOT NULL"
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT COUNT(*), MIN({x}), MAX({x}), MIN({y}), MAX({y}) FROM {table} {where}")
+    total, x_low, x_high, y_low, y_high = cursor.fetchone()
+    if not total:
+        return None
+
+    _ensure_ln(conn)
+    x_bin, x_centres, x_log = _axis_bins(x, float(x_low), float(x_high), bins, log_ratio)
+    y_bin, y_centres, y_log = _axis_bins(y, float(y_low), float(y_high), bins, log_ratio)
+    cells = pd.read_sql_query(
+        f"SELECT {x_bin} AS x_bin, {y_bin} AS y_bin, COUNT(*) AS count FROM {table} {where} "
+        "GROUP BY x_bin, y_bin",
+        conn,
+    )
+    cells[x] = x_centres[cells["x_bin"].to_numpy()]
+    cells[y] = y_centres[cells["y_bin"].to_numpy()]
+    return {
+        "total": total,
+        "cells": cells[[x, y, "count"]],
+        f"{x}_centres": x_centres,
+        f"{y}_centres": y_centres,
+        f"{x}_log": x_log,
+        f"{y}_log": y_log,
+    }
+
+
+#cyber incidents
+
+@cached_query("cyber_incidents")
+def get_incident_metrics(conn):
+    """Get total and high severity incident counts."""
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT COUNT(*), COALESCE(SUM(severity = 'High'), 0) FROM cyber_incidents"
+    )
+    total, high = cursor.fetchone()
+    return {"total": total, "high_severity": high}
+
+
+@cached_query("cyber_incidents")
+def get_incident_counts_by_category(conn):
+    """Get incident counts per category."""
+    return _count_by(conn, "cyber_incidents", "category")
+
+
+@cached_query("cyber_incidents")
+def get_incident_counts_by_severity(conn):
+    """Get incident counts per severity."""
+    return _count_by(conn, "cyber_incidents", "severity")
+
+
+@cached_query("cyber_incidents")
+def get_incident_counts_by_date(conn):
+    """Get incident counts per calendar day from the daily rollup."""
+    return pd.read_sql_query(
+        """SELECT bucket AS date, SUM(count) AS count
+           FROM incident_rollups
+           WHERE bucket_size = 'day' AND count != 0
+           GROUP BY bucket
+           ORDER BY date""",
+        conn,
+        parse_dates=["date"],
+    )
+
+
+@cached_query("cyber_incidents")
+def get_avg_resolution_by_category(conn):
+    """Get average resolution time per incident category, slowest first."""
+    if "resolution_time_hours" not in table_columns(conn, "cyber_incidents"):
+        return pd.DataFrame(columns=["category", "resolution_time_hours"])
+    return pd.read_sql_query(
+        """SELECT category, AVG(resolution_time_hours) AS resolution_time_hours
+           FROM cyber_incidents GROUP BY category
+           ORDER BY resolution_time_hours DESC""",
+        conn,
+    )
+
+
+@cached_query("cyber_incidents")
+def get_unresolved_incidents_by_assignee(conn):
+    """Get unresolved incident counts per assignee, busiest first."""
+    if "assigned_to" not in table_columns(conn, "cyber_incidents"):
+        return pd.DataFrame(columns=["assigned_to", "count"])
+    return pd.read_sql_query(
+        """SELECT assigned_to, COUNT(*) AS count FROM cyber_incidents
+           WHERE status != 'Resolved'
+           GROUP BY assigned_to ORDER BY count DESC""",
+        conn,
+    )
+
+
+#it tickets
+
+@cached_query("it_tickets")
+def get_ticket_metrics(conn, long_threshold=48):
+    """Get total, open, high priority and long-running ticket counts."""
+    cursor = conn.cursor()
+    cursor.execute(
+        """SELECT COUNT(*),
+                  COALESCE(SUM(status = 'Open'), 0),
+                  COALESCE(SUM(priority IN ('High', 'Critical')), 0),
+                  COALESCE(SUM(resolution_time_hours > ?), 0)
+           FROM it_tickets""",
+        (long_threshold,),
+    )
+    total, open_count, high_priority, long_running = cursor.fetchone()
+    return {
+        "total": total,
+        "open": open_count,
+        "high_priority": high_priority,
+        "long_running": long_running,
+    }
+
+
+@cached_query("it_tickets")
+def get_ticket_counts_by_priority(conn):
+    """Get ticket counts per priority."""
+    return _count_by(conn, "it_tickets", "priority")
+
+
+@cached_query("it_tickets")
+def get_ticket_counts_by_status(conn):
+    """Get ticket counts per status."""
+    return _count_by(conn, "it_tickets", "status")
+
+
+@cached_query("it_tickets")
+def get_long_running_tickets(conn, threshold=48, limit=100):
+    """Get the tickets that took longer than threshold hours, slowest first."""
+    return pd.read_sql_query(
+        """SELECT ticket_id, priority, status, assigned_to, resolution_time_hours
+           FROM it_tickets WHERE resolution_time_hours > ?
+           ORDER BY resolution_time_hours DESC LIMIT ?""",
+        conn,
+        params=(threshold, limit),
+    )
+
+
+@cached_query("it_tickets")
+def get_open_tickets_by_staff(conn):
+    """Get open ticket counts per assignee, busiest first."""
+    return pd.read_sql_query(
+        """SELECT assigned_to, COUNT(*) AS count FROM it_tickets
+           WHERE status = 'Open'
+           GROUP BY assigned_to ORDER BY count DESC""",
+        conn,
+    )
+
+
+#datasets
+
+@cached_query("datasets_metadata")
+def get_dataset_metrics(conn):
+    """Get total dataset count and total rows across all datasets."""
+    cursor = conn.cursor()
+    cursor.execute("SELECT COUNT(*), COALESCE(SUM(rows), 0) FROM datasets_metadata")
+    total, total_rows = cursor.fetchone()
+    return {"total": total, "total_rows": total_rows}
+
+
+@cached_query("datasets_metadata")
+def get_dataset_counts_by_uploader(conn):
+    """Get dataset counts per uploader."""
+    return _count_by(conn, "datasets_metadata", "uploaded_by")
+
+
+@cached_query("datasets_metadata")
+def get_dataset_shapes(conn):
+    """Get name, rows, columns and uploader of every dataset, only what the rows vs columns chart plots."""
+    return pd.read_sql_query(
+        "SELECT name, rows, columns, uploaded_by FROM datasets_metadata "
+        "WHERE rows IS NOT NULL AND columns IS NOT NULL",
+        conn,
+    )
+
+
+@cached_query("datasets_metadata")
+def get_dataset_shape_density(conn, bins=60, log_ratio=1_000):
+    """Count datasets per cell of a bins x bins grid over columns and rows, for a density heatmap.
+
+    Returns a dict with total, cells (a DataFrame of columns and rows bin
+    centres with their count, empty cells left out), columns_centres /
+    rows_centres (every centre along that axis) and columns_log / rows_log,
+    true where that axis spans more than log_ratio and was binned on a log
+    scale. Returns None if no dataset has both values.
+    """
+    return _density(conn, "datasets_metadata", "columns", "rows", bins, log_ratio)
+
@@ -0,0 +1,52 @@
+"""Bulk loads without the per-row triggers that maintain derived tables.
+
+The rollup, search index, SLA sketch and change log triggers cost more per
+row than the insert itself. A bulk load drops them, inserts, puts them back,
+rebuilds the derived tables from the base table once and logs a single
+reload marker for delta_frame readers. Everything happens in one
+transaction: other connections never see the table without its triggers,
+and a load that fails rolls the dropped triggers back along with its rows.
+"""
+from contextlib import contextmanager
+
+from app.data.changes import change_triggers, log_reload
+from app.data.rollups import backfill_rollups, rollup_triggers
+from app.data.search import rebuild_search_indexes, search_triggers
+from app.data.sla import backfill_sla_sketches, sketch_triggers
+
+
+def _drop_triggers(conn, names):
+    """Drop the named triggers that exist and return their SQL, to recreate them from."""
+    cursor = conn.cursor()
+    saved = {}
+    for name in names:
+        row = cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = ?", (name,)).fetchone()
+        if row is not None:
+            saved[name] = row[0]
+            cursor.execute(f"DROP TRIGGER {name}")
+    return saved
+
+
+@contextmanager
+def bulk_load(conn, table):
+    """Run the body with table's derived-table triggers dropped, then restore them and rebuild once.
+
+    Opens a write transaction if there isn't one. The caller commits after
+    the block, or rolls back if it raised.
+    """
+    if not conn.in_transaction:
+        conn.execute("BEGIN IMMEDIATE")
+    saved = _drop_triggers(conn, rollup_triggers(table) + search_triggers(table) + sketch_triggers(table)
+                           + change_triggers(table))
+    yield
+    cursor = conn.cursor()
+    for sql in saved.values():
+        cursor.execute(sql)
+    if any(name in saved for name in rollup_triggers(table)):
+        backfill_rollups(conn, tables=(table,), commit=False)
+    if any(name in saved for name in search_triggers(table)):
+        rebuild_search_indexes(conn, tables=(table,), commit=False)
+    if any(name in saved for name in sketch_triggers(table)):
+        backfill_sla_sketches(conn, commit=False)
+    if any(name in saved for name in change_triggers(table)):
+        log_reload(conn, table)
@@ -0,0 +1,203 @@
+import functools
+import sqlite3
+import sys
+import threading
+from collections import OrderedDict
+
+from app.services.instrumentation import timed
+
+# Default memory budget for cached results
+CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+
+def _is_frame(value, kind="DataFrame"):
+    #nothing can be a DataFrame before pandas is imported, so don't import it just to check
+    pd = sys.modules.get("pandas")
+    return pd is not None and isinstance(value, getattr(pd, kind))
+
+
+def _sizeof(value):
+    """Rough size of a cached value in bytes."""
+    if _is_frame(value):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if _is_frame(value, "Series"):
+        return int(value.memory_usage(index=True, deep=True))
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(_sizeof(k) + _sizeof(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(_sizeof(v) for v in value)
+    return sys.getsizeof(value)
+
+
+def _db_path(conn):
+    """Return the file behind a connection, or None for in-memory databases."""
+    row = conn.execute("PRAGMA database_list").fetchone()
+    return row[2] or None
+
+
+class _Watcher:
+    """Notices commits made by other connections and processes.
+
+    PRAGMA data_version on a dedicated connection only changes when somebody
+    else commits, so checking it is enough to know whether the table_versions
+    counters (maintained by triggers) need to be read again.
+    """
+
+    def __init__(self, db_path):
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.data_version = None
+        self.table_versions = {}
+
+    def poll(self):
+        """Return the per-table versions stored in the DB, or None if they are unknown."""
+        data_version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        if data_version == self.data_version:
+            return self.table_versions
+
+        self.data_version = data_version
+        try:
+            rows = self.conn.execute("SELECT table_name, version FROM table_versions").fetchall()
+        except sqlite3.OperationalError:
+            #no table_versions table, so we can't tell which table changed
+            return None
+        self.table_versions = dict(rows)
+        return self.table_versions
+
+
+class ResultCache:
+    """LRU cache of query results stamped with the versions of the tables they read."""
+
+    def __init__(self, max_bytes=CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._local_versions = {}
+        self._epoch = 0
+        self._watchers = {}
+        self._lock = threading.RLock()
+        self._stats = {"hits": 0, "misses": 0, "stale": 0, "evictions": 0}
+
+    def bump(self, table):
+        """Mark a table as changed by a write from this process."""
+        with self._lock:
+            self._local_versions[table] = self._local_versions.get(table, 0) + 1
+
+    def _stamp(self, db_path, tables):
+        watcher = self._watchers.get(db_path)
+        if watcher is None:
+            watcher = self._watchers[db_path] = _Watcher(db_path)
+        previous = watcher.data_version
+        db_versions = watcher.poll()
+        if db_versions is None and watcher.data_version != previous:
+            #another connection committed and we can't tell which table, drop everything
+            self._epoch += 1
+        db_versions = db_versions or {}
+        return (self._epoch,) + tuple(
+            (self._local_versions.get(t, 0), db_versions.get(t, 0)) for t in tables
+        )
+
+    def get_or_compute(self, conn, key, tables, compute):
+        """Return the cached result for key, recomputing it if any of its tables changed."""
+        db_path = _db_path(conn)
+        if db_path is None:
+            return compute()
+
+        key = (db_path,) + key
+        with self._lock:
+            stamp = self._stamp(db_path, tables)
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] == stamp:
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    return entry[1]
+                #stale entries are dropped straight away
+                self._stats["stale"] += 1
+                self._drop(key)
+            self._stats["misses"] += 1
+
+        value = compute()
+        size = _sizeof(value)
+
+        with self._lock:
+            if size <= self.max_bytes and self._stamp(db_path, tables) == stamp:
+                if key in self._entries:
+                    self._drop(key)
+                self._entries[key] = (stamp, value, size)
+                self._bytes += size
+                while self._bytes > self.max_bytes:
+                    oldest = next(iter(self._entries))
+                    self._drop(oldest)
+                    self._stats["evictions"] += 1
+        return value
+
+    def _drop(self, key):
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def clear(self):
+        """Empty the cache and reset the stats."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            for name in self._stats:
+                self._stats[name] = 0
+
+    def stats(self):
+        """Return hit/miss counts, hit rate and memory use."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+            stats["bytes"] = self._bytes
+            stats["max_bytes"] = self.max_bytes
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+
+result_cache = ResultCache()
+
+
+def bump_table_version(*tables):
+    """Invalidate cached results that read any of the given tables."""
+    for table in tables:
+        result_cache.bump(table)
+
+
+def cache_stats():
+    """Return the shared result cache stats."""
+    return result_cache.stats()
+
+
+def _freeze(value):
+    if isinstance(value, (list, tuple, set)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    return value
+
+
+def cached_query(*tables):
+    """Cache a read function taking conn as its first argument.
+
+    Results are shared by every session, so DataFrames are handed out as
+    shallow copies and callers must not modify them in place. Only real
+    computations are timed by the instrumentation, not cache hits.
+    """
+    def decorator(func):
+        compute = timed(func)
+
+        @functools.wraps(func)
+        def wrapper(conn, *args, **kwargs):
+            key = (func.__module__, func.__qualname__, _freeze(args), _freeze(kwargs))
+            value = result_cache.get_or_compute(
+                conn, key, tables, lambda: compute(conn, *args, **kwargs)
+            )
+            if _is_frame(value):
+                return value.copy(deep=False)
+            if isinstance(value, dict):
+                return dict(value)
+            return value
+        wrapper.uncached = func
+        return wrapper
+    return decorator
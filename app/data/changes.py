@@ -0,0 +1,271 @@
+"""Change tracking for incidents, tickets and datasets.
+
+Triggers append the key of every inserted, updated or deleted row to
+table_changes with a global, increasing seq. A bulk load logs a single
+reload marker (op 'R') instead, see bulk.bulk_load. get_changes_since(seq) returns
+only what changed after seq, and delta_frame keeps a whole-table DataFrame
+per process current by patching it with those rows instead of reloading it.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+from app.data.frames import compact_frame
+
+# table -> key column of every tracked table
+TRACKED_TABLES = {
+    "cyber_incidents": "incident_id",
+    "it_tickets": "ticket_id",
+    "datasets_metadata": "dataset_id",
+}
+
+# Changes kept in the log, readers further behind than this reload the whole table
+CHANGELOG_KEEP = 100_000
+
+# The log trims itself every this many changes
+CHANGELOG_PRUNE_EVERY = 1_000
+
+_lock = threading.Lock()
+_frames = {}
+_stats = {"patches": 0, "reloads": 0, "unchanged": 0, "rows_patched": 0}
+
+
+def create_change_log(conn):
+    """Create table_changes and the triggers that record every row change in it."""
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS table_changes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            table_name TEXT NOT NULL,
+            row_id INTEGER NOT NULL,
+            op TEXT NOT NULL
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_table_changes_table_seq ON table_changes (table_name, seq)")
+    for table, key in TRACKED_TABLES.items():
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_change_insert AFTER INSERT ON {table}
+            BEGIN
+                INSERT INTO table_changes (table_name, row_id, op) VALUES ('{table}', NEW.{key}, 'I');
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_change_update AFTER UPDATE ON {table}
+            BEGIN
+                INSERT INTO table_changes (table_name, row_id, op)
+                SELECT '{table}', OLD.{key}, 'D' WHERE OLD.{key} != NEW.{key};
+                INSERT INTO table_changes (table_name, row_id, op) VALUES ('{table}', NEW.{key}, 'U');
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_change_delete AFTER DELETE ON {table}
+            BEGIN
+                INSERT INTO table_changes (table_name, row_id, op) VALUES ('{table}', OLD.{key}, 'D');
+            END
+        """)
+    #trim from inside SQLite so read-only connections never have to
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS table_changes_prune AFTER INSERT ON table_changes
+        WHEN NEW.seq % {CHANGELOG_PRUNE_EVERY} = 0
+        BEGIN
+            DELETE FROM table_changes WHERE seq <= NEW.seq - {CHANGELOG_KEEP};
+        END
+    """)
+    conn.commit()
+
+
+def change_triggers(table):
+    """Names of the triggers that log table's row changes."""
+    if table not in TRACKED_TABLES:
+        return []
+    return [f"{table}_change_{event}" for event in ("insert", "update", "delete")]
+
+
+def log_reload(conn, table):
+    """Record that table changed wholesale, e.g. in a bulk load, so readers reload it instead of patching."""
+    conn.execute("INSERT INTO table_changes (table_name, row_id, op) VALUES (?, 0, 'R')", (table,))
+
+
+def has_change_log(conn):
+    """Whether the database has table_changes, i.e. is migrated far enough for delta refreshes."""
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'table_changes'"
+    ).fetchone() is not None
+
+
+def latest_change(conn):
+    """The seq of the newest change, 0 if nothing has changed yet."""
+    row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'table_changes'").fetchone()
+    return row[0] if row else 0
+
+
+def _reaches_back_to(conn, seq):
+    #seq is contiguous, so the log is complete after seq if its oldest entry is seq + 1 or older
+    oldest = conn.execute("SELECT MIN(seq) FROM table_changes").fetchone()[0]
+    return oldest is None or oldest <= seq + 1
+
+
+def _load_table(conn, table):
+    key = TRACKED_TABLES[table]
+    df = pd.read_sql_query(f"SELECT * FROM {table} ORDER BY {key} DESC", conn)
+    return compact_frame(df, table)
+
+
+def _read_transaction(conn):
+    #one read transaction so the seq and the rows come from the same commit
+    began = not conn.in_transaction
+    if began:
+        conn.execute("BEGIN")
+    return began
+
+
+def get_changes_since(conn, table, seq):
+    """Rows of table inserted, updated or deleted after change seq.
+
+    Returns (latest seq, DataFrame of the current version of every inserted or
+    updated row, list of deleted keys). A row changed several times appears
+    once. Returns None if the log no longer reaches back to seq or the table
+    was reloaded since, in which case the table has to be read in full.
+    """
+    key = TRACKED_TABLES[table]
+    began = _read_transaction(conn)
+    try:
+        latest = latest_change(conn)
+        if not _reaches_back_to(conn, seq):
+            return None
+        if conn.execute(
+            "SELECT 1 FROM table_changes WHERE table_name = ? AND seq > ? AND op = 'R' LIMIT 1", (table, seq)
+        ).fetchone() is not None:
+            return None
+        changed = pd.read_sql_query(
+            f"""SELECT t.* FROM {table} t
+                JOIN (SELECT DISTINCT row_id FROM table_changes WHERE table_name = ? AND seq > ?) c
+                  ON t.{key} = c.row_id
+                ORDER BY t.{key} DESC""",
+            conn,
+            params=(table, seq),
+        )
+        deleted = [row[0] for row in conn.execute(
+            f"""SELECT DISTINCT row_id FROM table_changes c
+                WHERE table_name = ? AND seq > ?
+                  AND NOT EXISTS (SELECT 1 FROM {table} t WHERE t.{key} = c.row_id)""",
+            (table, seq),
+        )]
+    finally:
+        if began:
+            conn.rollback()
+    return latest, compact_frame(changed, table), deleted
+
+
+def _align_categories(frame, changed):
+    """Give changed's categorical columns frame's categories, adding any values frame hasn't seen."""
+    for column in frame.select_dtypes(include="category").columns:
+        if column not in changed:
+            continue
+        known = frame[column].cat.categories
+        values = changed[column].astype(object)
+        unseen = pd.Index(values.dropna().unique()).difference(known)
+        if len(unseen):
+            frame[column] = frame[column].cat.add_categories(unseen)
+        changed[column] = values.astype(frame[column].dtype)
+    return frame, changed
+
+
+def _positions(keys, wanted):
+    """Positions of the wanted keys in keys (sorted descending), -1 for keys that aren't there."""
+    if not len(keys):
+        return np.full(len(wanted), -1)
+    ascending = keys[::-1]
+    found = np.searchsorted(ascending, wanted)
+    hit = (found < len(ascending)) & (ascending[np.minimum(found, len(ascending) - 1)] == wanted)
+    return np.where(hit, len(keys) - 1 - found, -1)
+
+
+def apply_changes(frame, key, changed, deleted):
+    """A copy of frame, sorted by key descending, with changed rows replaced or added and deleted rows removed.
+
+    frame must already be sorted by key descending, as delta_frame keeps it.
+    Updated rows are written over their old position, so only new keys and
+    deletes change the shape of the frame.
+    """
+    frame, changed = _align_categories(frame.copy(deep=False), changed.copy(deep=False))
+    #columns are downcast per load, so both sides can need a wider common type (e.g. ints gaining a null)
+    for column in changed.columns:
+        if column in frame and changed[column].dtype != frame[column].dtype:
+            common = pd.concat([frame[column].iloc[:0], changed[column].iloc[:0]]).dtype
+            if frame[column].dtype != common:
+                frame[column] = frame[column].astype(common)
+            changed[column] = changed[column].astype(common)
+
+    keys = frame[key].to_numpy()
+    positions = _positions(keys, changed[key].to_numpy())
+    updated = positions >= 0
+    if updated.any():
+        rows = positions[updated]
+        for column in changed.columns:
+            frame.iloc[rows, frame.columns.get_loc(column)] = changed[column].array[updated]
+    if deleted:
+        gone = _positions(keys, np.asarray(deleted, dtype=keys.dtype))
+        frame = frame.drop(frame.index[gone[gone >= 0]])
+
+    inserted = changed[~updated]
+    if len(inserted):
+        frame = pd.concat([inserted, frame], ignore_index=True)
+        if not frame[key].is_monotonic_decreasing:
+            #new keys normally go on top, anything else (e.g. an upsert with an old id) needs a sort
+            frame = frame.sort_values(key, ascending=False, ignore_index=True)
+    return frame.reset_index(drop=True)
+
+
+def delta_frame(conn, table):
+    """The whole table as a compact DataFrame, patched with only the rows changed since the last call.
+
+    The frame is kept per process and database and shared by every session,
+    so callers get a shallow copy and must not modify it in place. The first
+    call, and any call that has fallen behind the change log, reads the
+    table in full.
+    """
+    row = conn.execute("PRAGMA database_list").fetchone()
+    if not row[2] or not has_change_log(conn):
+        return _load_table(conn, table)
+
+    key = TRACKED_TABLES[table]
+    cache_key = (row[2], table)
+    with _lock:
+        entry = _frames.get(cache_key)
+        changes = get_changes_since(conn, table, entry[0]) if entry is not None else None
+        if changes is None:
+            began = _read_transaction(conn)
+            try:
+                seq = latest_change(conn)
+                frame = _load_table(conn, table)
+            finally:
+                if began:
+                    conn.rollback()
+            _stats["reloads"] += 1
+        else:
+            seq, changed, deleted = changes
+            frame = entry[1]
+            if len(changed) or deleted:
+                frame = apply_changes(frame, key, changed, deleted)
+                _stats["patches"] += 1
+                _stats["rows_patched"] += len(changed) + len(deleted)
+            else:
+                _stats["unchanged"] += 1
+        _frames[cache_key] = (seq, frame)
+    return frame.copy(deep=False)
+
+
+def clear_delta_frames():
+    """Forget every kept frame so the next delta_frame call reads its table in full."""
+    with _lock:
+        _frames.clear()
+
+
+def delta_stats():
+    """Return how often delta_frame patched, reloaded or found nothing to do."""
+    with _lock:
+        stats = dict(_stats)
+        stats["frames"] = len(_frames)
+    return stats
@@ -1,8 +1,16 @@
-import pandas as pd
 from pathlib import Path
-from app.data.db import connect_database
+from app.data.db import connect_database, retry_on_busy
+from app.data.cache import cached_query, bump_table_version
+from app.services.instrumentation import timed
+from app.data.ingest import ingest_csv, ingest_csv_incremental, format_ingest_stats, CHUNK_SIZE
+from app.data.changes import delta_frame
+from app.data.pagination import fetch_page, count_rows
 
-def load_datasets_metadata_to_sql(conn, csv_path, table_name="datasets_metadata"):
+DATASET_FILTERS = ("uploaded_by",)
+
+@timed(trace=False)
+def load_datasets_metadata_to_sql(conn, csv_path, table_name="datasets_metadata", chunksize=CHUNK_SIZE,
+                                  incremental=False, bulk=False):
     """Load dataset metadata CSV into the SQLite table."""
     
     csv_path = Path(csv_path)
@@ -10,29 +18,49 @@ def load_datasets_metadata_to_sql(conn, csv_path, table_name="datasets_metadata"
     if not csv_path.exists():
         print(f"CSV file not found: {csv_path}")
         return 0
-        
-    df = pd.read_csv(csv_path)
-
-    # Drop dataset_id if present, since it's autoincrement
-    if "dataset_id" in df.columns:
-        df = df.drop(columns=["dataset_id"])
 
-    df.to_sql(name=table_name, con=conn, if_exists='append', index=False)
-    row_count = len(df)
-    print(f"Successfully loaded {row_count} rows into '{table_name}'.")
-    return row_count
+    #stream the csv in chunks, dataset_id is autoincrement so a plain load leaves it out
+    options = dict(
+        columns=["name", "rows", "columns", "uploaded_by", "upload_date"],
+        dtypes={"rows": "Int64", "columns": "Int64"},
+        date_columns={"upload_date": ("%Y-%m-%d", "%Y-%m-%d")},
+        chunksize=chunksize,
+        #big loads skip the per-row derived-table triggers and rebuild those tables once
+        bulk=bulk,
+    )
+    if incremental:
+        #only read what was appended since the last run and upsert on the export's dataset_id
+        stats = ingest_csv_incremental(conn, csv_path, table_name, source_key="dataset_id", **options)
+    else:
+        stats = ingest_csv(conn, csv_path, table_name, **options)
+    bump_table_version(table_name)
+    print(f"Successfully loaded {format_ingest_stats(stats)}.")
+    return stats["rows"]
 
 
+@timed
 def get_all_datasets(conn):
-    """Get all datasets as DataFrame."""
+    """Get all datasets as a DataFrame with compact dtypes, see frames.compact_frame.
 
-    df = pd.read_sql_query(
-        "SELECT * FROM datasets_metadata ORDER BY dataset_id DESC",
-        conn
-    )
-    return df
+    Only rows changed since the previous call are read, see changes.delta_frame.
+    """
+    return delta_frame(conn, "datasets_metadata")
 
-def insert_dataset(conn, name, rows, columns, uploaded_by, upload_date):
+@cached_query("datasets_metadata")
+def get_datasets_page(conn, limit=50, after_id=None, before_id=None, uploaded_by=None):
+    """Get one page of datasets, newest first, using keyset pagination on dataset_id."""
+    filters = {"uploaded_by": uploaded_by}
+    return fetch_page(conn, "datasets_metadata", "dataset_id", DATASET_FILTERS,
+                      limit=limit, after=after_id, before=before_id, filters=filters)
+
+@cached_query("datasets_metadata")
+def count_datasets(conn, uploaded_by=None):
+    """Count datasets matching the optional filters."""
+    return count_rows(conn, "datasets_metadata", DATASET_FILTERS, {"uploaded_by": uploaded_by})
+
+@timed
+@retry_on_busy
+def insert_dataset(conn, name, rows, columns, uploaded_by, upload_date, commit=True):
     """Insert a new dataset into datasets metadata and return its row dataset_id."""
 
     cursor = conn.cursor()
@@ -41,12 +69,16 @@ def insert_dataset(conn, name, rows, columns, uploaded_by, upload_date):
         (name, rows, columns, uploaded_by, upload_date)
         VALUES (?, ?, ?, ?, ?)
     """, (name, rows, columns, uploaded_by, upload_date))
-    conn.commit()
+    if commit:
+        conn.commit()
+        bump_table_version("datasets_metadata")
     dataset_id = cursor.lastrowid
 
     return cursor.lastrowid
 
-def update_dataset(conn, dataset_id, **kwargs):
+@timed
+@retry_on_busy
+def update_dataset(conn, dataset_id, commit=True, **kwargs):
     """Update a dataset record by dataset_id. Accepts column=value pairs."""
     if not kwargs:
         return 0
@@ -57,17 +89,78 @@ def update_dataset(conn, dataset_id, **kwargs):
     
     cursor = conn.cursor()
     cursor.execute(f"UPDATE datasets_metadata SET {columns} WHERE dataset_id = ?", values)
-    conn.commit()
+    if commit:
+        conn.commit()
+        bump_table_version("datasets_metadata")
     return cursor.rowcount
 
-def delete_dataset(conn, dataset_id):
+@timed
+@retry_on_busy
+def delete_dataset(conn, dataset_id, commit=True):
     """Delete dataset by name."""
 
     cursor = conn.cursor()
     cursor.execute(
         """DELETE FROM datasets_metadata WHERE dataset_id = ?""", (dataset_id,)
     )
-    conn.commit()
+    if commit:
+        conn.commit()
+        bump_table_version("datasets_metadata")
+
+    return cursor.rowcount
+
+@timed(trace=False)
+@retry_on_busy
+def insert_datasets_many(conn, datasets, commit=True):
+    """Insert many datasets in one transaction and return the number inserted.
+
+    datasets is an iterable of (name, rows, columns, uploaded_by, upload_date).
+    """
+
+    cursor = conn.cursor()
+    cursor.executemany("""
+        INSERT INTO datasets_metadata  
+        (name, rows, columns, uploaded_by, upload_date)
+        VALUES (?, ?, ?, ?, ?)
+    """, datasets)
+    if commit:
+        conn.commit()
+        bump_table_version("datasets_metadata")
 
     return cursor.rowcount
 
+@timed(trace=False)
+@retry_on_busy
+def update_datasets_many(conn, dataset_ids, commit=True, **kwargs):
+    """Apply the same column=value changes to many datasets in one transaction."""
+    if not kwargs:
+        return 0
+
+    columns = ", ".join([f"{k} = ?" for k in kwargs])
+    values = list(kwargs.values())
+
+    cursor = conn.cursor()
+    cursor.executemany(
+        f"UPDATE datasets_metadata SET {columns} WHERE dataset_id = ?",
+        [values + [int(dataset_id)] for dataset_id in dataset_ids]
+    )
+    if commit:
+        conn.commit()
+        bump_table_version("datasets_metadata")
+    return cursor.rowcount
+
+@timed(trace=False)
+@retry_on_busy
+def delete_datasets_many(conn, dataset_ids, commit=True):
+    """Delete many datasets in one transaction and return the number deleted."""
+
+    cursor = conn.cursor()
+    cursor.executemany(
+        """DELETE FROM datasets_metadata WHERE dataset_id = ?""",
+        [(int(dataset_id),) for dataset_id in dataset_ids]
+    )
+    if commit:
+        conn.commit()
+        bump_table_version("datasets_metadata")
+
+    return cursor.rowcount
@@ -1,17 +1,324 @@
+import functools
+import os
+import random
 import sqlite3
+import threading
+import time
+from contextlib import contextmanager
 from pathlib import Path
 
-# Define path relative to this file's directory
-DB_PATH = Path(__file__).parent.parent.parent / "DATA" / "intelligence_platform.db"
+from app.services.instrumentation import instrument_connection
 
-# Create DATA folder if it doesn't exist
-DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+# Define path relative to this file's directory, set APP_DB_PATH to use another database file
+DB_PATH = Path(os.environ.get("APP_DB_PATH") or Path(__file__).parent.parent.parent / "DATA" / "intelligence_platform.db")
 
+# Pragmas applied to every connection we hand out
+BUSY_TIMEOUT_MS = 5000
+PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": BUSY_TIMEOUT_MS,
+    "mmap_size": 256 * 1024 * 1024,
+    "cache_size": -64 * 1024,  # negative means KiB, so 64 MiB
+    "temp_store": "MEMORY",
+}
 
-def connect_database(db_path=DB_PATH):
-    """Connect to SQLite database."""
-    return sqlite3.connect(str(db_path))
+# Read-only connections can't change the journal mode or durability, and refuse any write
+READ_ONLY_PRAGMAS = {
+    "query_only": "ON",
+    "busy_timeout": BUSY_TIMEOUT_MS,
+    "mmap_size": PRAGMAS["mmap_size"],
+    "cache_size": PRAGMAS["cache_size"],
+    "temp_store": "MEMORY",
+}
 
-Path("DATA/__init__.py").touch()
-Path("app/data/__init__.py").touch()
-Path("app/services/__init__.py").touch()
\ No newline at end of file
+# Writes that still hit SQLITE_BUSY after the busy timeout are retried this many times
+BUSY_RETRIES = 5
+# Backoff before retry n is random between 0 and min(BUSY_BACKOFF_MAX, BUSY_BACKOFF * 2**n) seconds
+BUSY_BACKOFF = 0.05
+BUSY_BACKOFF_MAX = 2.0
+
+# Maximum number of open connections per database file
+POOL_SIZE = 8
+POOL_TIMEOUT = 30.0
+
+
+def configure_connection(conn, pragmas=None):
+    """Apply the tuning pragmas to an open connection."""
+    for name, value in (pragmas or PRAGMAS).items():
+        conn.execute(f"PRAGMA {name} = {value}")
+    return conn
+
+
+def _open(db_path, read_only=False, **kwargs):
+    if read_only:
+        #mode=ro makes the file itself read-only, query_only stops writes to temp tables too
+        uri = f"{Path(db_path).resolve().as_uri()}?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, timeout=BUSY_TIMEOUT_MS / 1000, **kwargs)
+        return configure_connection(conn, READ_ONLY_PRAGMAS)
+    #create the DATA folder on first connect rather than whenever this module is imported
+    Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(db_path), timeout=BUSY_TIMEOUT_MS / 1000, **kwargs)
+    return configure_connection(conn)
+
+
+def connect_database(db_path=DB_PATH, read_only=False):
+    """Connect to SQLite database, read_only=True for a connection that can't write."""
+    return _open(db_path, read_only)
+
+
+_busy_stats = {"retries": 0, "recovered": 0, "gave_up": 0}
+_busy_lock = threading.Lock()
+
+
+def is_busy(error):
+    """Whether an sqlite3 error means another connection holds the lock (SQLITE_BUSY or SQLITE_LOCKED)."""
+    if not isinstance(error, sqlite3.OperationalError):
+        return False
+    code = getattr(error, "sqlite_errorcode", None)
+    if code is not None:
+        #the low byte is the primary code, extended codes like SQLITE_BUSY_SNAPSHOT keep it
+        return (code & 0xFF) in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED)
+    message = str(error)
+    return "database is locked" in message or "database table is locked" in message
+
+
+def _count_busy(name):
+    with _busy_lock:
+        _busy_stats[name] += 1
+
+
+def call_with_busy_retry(func, *args, retries=BUSY_RETRIES, on_retry=None, **kwargs):
+    """Call func, retrying with jittered exponential backoff while it fails with SQLITE_BUSY.
+
+    on_retry runs before every retry, e.g. to roll back the failed attempt.
+    """
+    for attempt in range(retries + 1):
+        try:
+            result = func(*args, **kwargs)
+        except sqlite3.OperationalError as e:
+            if not is_busy(e) or attempt == retries:
+                if is_busy(e):
+                    _count_busy("gave_up")
+                raise
+            _count_busy("retries")
+            if on_retry is not None:
+                on_retry()
+            #full jitter, so writers that collided don't all come back at the same moment
+            time.sleep(random.uniform(0, min(BUSY_BACKOFF_MAX, BUSY_BACKOFF * 2 ** attempt)))
+            continue
+        if attempt:
+            _count_busy("recovered")
+        return result
+
+
+def retry_on_busy(func):
+    """Retry a data-layer write function (conn first) that fails with SQLITE_BUSY.
+
+    Only calls that own their transaction are retried. If the caller already
+    has one open, e.g. the group-commit writer, the error goes to the caller,
+    since replaying one statement can't replay the rest of its transaction.
+    """
+    @functools.wraps(func)
+    def wrapper(conn, *args, **kwargs):
+        if conn.in_transaction:
+            return func(conn, *args, **kwargs)
+        return call_with_busy_retry(func, conn, *args, on_retry=conn.rollback, **kwargs)
+    return wrapper
+
+
+def busy_stats():
+    """Return how many writes were retried after SQLITE_BUSY, recovered, or gave up."""
+    with _busy_lock:
+        return dict(_busy_stats)
+
+
+class ConnectionPool:
+    """Process-wide pool of tuned SQLite connections for one database file."""
+
+    def __init__(self, db_path=DB_PATH, max_size=POOL_SIZE, timeout=POOL_TIMEOUT, read_only=False):
+        self.db_path = str(db_path)
+        self.read_only = read_only
+        self.max_size = max_size
+        self.timeout = timeout
+        self._idle = []
+        self._open = 0
+        self._cond = threading.Condition()
+        self._stats = {"hits": 0, "misses": 0, "waits": 0, "wait_time": 0.0, "timeouts": 0}
+
+    def _new_connection(self):
+        conn = _open(self.db_path, self.read_only, check_same_thread=False)
+        return instrument_connection(conn)
+
+    def acquire(self, timeout=None):
+        """Check a connection out of the pool, opening a new one if there is room."""
+        timeout = self.timeout if timeout is None else timeout
+        with self._cond:
+            if self._idle:
+                self._stats["hits"] += 1
+                return self._idle.pop()
+
+            if self._open < self.max_size:
+                self._open += 1
+                self._stats["misses"] += 1
+                create = True
+            else:
+                #pool is exhausted, wait for another session to give one back
+                self._stats["waits"] += 1
+                started = time.perf_counter()
+                deadline = started + timeout
+                while not self._idle:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        self._stats["timeouts"] += 1
+                        self._stats["wait_time"] += time.perf_counter() - started
+                        raise TimeoutError(
+                            f"No free database connection after {timeout:.1f}s "
+                            f"(pool size {self.max_size})"
+                        )
+                    self._cond.wait(remaining)
+                self._stats["wait_time"] += time.perf_counter() - started
+                self._stats["hits"] += 1
+                return self._idle.pop()
+
+        if create:
+            try:
+                return self._new_connection()
+            except Exception:
+                with self._cond:
+                    self._open -= 1
+                    self._cond.notify()
+                raise
+
+    def release(self, conn):
+        """Return a connection to the pool, rolling back any unfinished transaction."""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            #connection is broken, drop it instead of pooling it
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            return
+
+        with self._cond:
+            self._idle.append(conn)
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self, timeout=None):
+        """Context manager that borrows a connection for the duration of the block."""
+        conn = self.acquire(timeout)
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def stats(self):
+        """Return pool hit/miss counts and wait times."""
+        with self._cond:
+            stats = dict(self._stats)
+            stats["open"] = self._open
+            stats["idle"] = len(self._idle)
+            stats["in_use"] = self._open - len(self._idle)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        stats["avg_wait_ms"] = stats["wait_time"] * 1000 / stats["waits"] if stats["waits"] else 0.0
+        return stats
+
+    def close_all(self):
+        """Close every idle connection. Connections still checked out are left alone."""
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+        for conn in idle:
+            conn.close()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+_local = threading.local()
+
+
+def get_pool(db_path=DB_PATH, read_only=False):
+    """Return the shared pool for a database file, creating it on first use.
+
+    read_only=True gives the pool of read-only connections the dashboards read through.
+    """
+    if read_only:
+        #the read-write pool migrates the schema and creates the WAL files readers need
+        get_pool(db_path)
+    key = (str(Path(db_path).resolve()), read_only)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = ConnectionPool(db_path, read_only=read_only)
+            if not read_only:
+                #bring the schema up to date once per process before handing out connections
+                from app.data.migrations import migrate
+                with pool.connection() as conn:
+                    migrate(conn)
+        return pool
+
+
+class _Lease:
+    """Thread-local holder that gives its connection back when the thread goes away."""
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.conn = pool.acquire()
+
+    def __del__(self):
+        try:
+            self.pool.release(self.conn)
+        except Exception:
+            pass
+
+
+def _leased(pool):
+    leases = getattr(_local, "leases", None)
+    if leases is None:
+        leases = _local.leases = {}
+
+    key = (pool.db_path, pool.read_only)
+    lease = leases.get(key)
+    if lease is not None and not _is_open(lease.conn):
+        #somebody closed the leased connection, give its slot back before leasing a fresh one
+        del leases[key]
+        lease = None
+    if lease is None:
+        lease = leases[key] = _Lease(pool)
+    return lease.conn
+
+
+def _is_open(conn):
+    try:
+        conn.in_transaction
+    except sqlite3.ProgrammingError:
+        return False
+    return True
+
+
+def get_connection(db_path=DB_PATH):
+    """Get the pooled read-write connection bound to the current thread.
+
+    Every rerun of a page on the same script thread reuses the same connection,
+    and it goes back to the pool automatically when the thread finishes.
+    """
+    return _leased(get_pool(db_path))
+
+
+def get_read_connection(db_path=DB_PATH):
+    """Get the pooled read-only connection bound to the current thread.
+
+    Dashboards read through this one, so a long load or a burst of writes
+    never has them competing for the write lock. Writes go through
+    writer.get_writer() instead.
+    """
+    return _leased(get_pool(db_path, read_only=True))
+
+
+def pool_stats(db_path=DB_PATH, read_only=False):
+    """Return hit/miss and wait-time stats for the shared pool."""
+    return get_pool(db_path, read_only).stats()
@@ -0,0 +1,122 @@
+"""Compact dtypes for the DataFrames the data layer hands to the pages.
+
+To compare memory use against the default dtypes, run from the project root:
+    python -m app.data.frames --report
+"""
+import argparse
+
+import pandas as pd
+
+SEVERITY_ORDER = ["Low", "Medium", "High", "Critical"]
+PRIORITY_ORDER = ["Low", "Medium", "High", "Critical"]
+
+# table -> (ordered categoricals, plain categoricals, datetime columns)
+FRAME_TYPES = {
+    "cyber_incidents": ({"severity": SEVERITY_ORDER}, ("category", "status"), ("timestamp",)),
+    "it_tickets": ({"priority": PRIORITY_ORDER}, ("status", "assigned_to"), ("created_at",)),
+    "datasets_metadata": ({}, ("uploaded_by",), ("upload_date",)),
+    "users": ({}, ("role",), ("created_at",)),
+}
+
+# Key column of each table, left as int64 so ids inserted after the load still fit
+KEY_COLUMNS = {
+    "cyber_incidents": "incident_id",
+    "it_tickets": "ticket_id",
+    "datasets_metadata": "dataset_id",
+    "users": "id",
+}
+
+
+def _ordered_category(series, order):
+    #values outside the known order are kept, sorted after it, rather than turned into NaN
+    extra = sorted(set(series.dropna().unique()) - set(order))
+    return series.astype(pd.CategoricalDtype(list(order) + extra, ordered=True))
+
+
+def compact_frame(df, table):
+    """Convert a frame read from table to compact dtypes in place and return it.
+
+    Enumerated text columns become categoricals (severity and priority ordered
+    Low to Critical), timestamps become datetime64, and numeric columns are
+    downcast to the smallest type that holds their values. The key column
+    stays int64, a delta merged in later can carry ids past the downcast range.
+    """
+    ordered, categories, datetimes = FRAME_TYPES[table]
+    for column, order in ordered.items():
+        if column in df:
+            df[column] = _ordered_category(df[column], order)
+    for column in categories:
+        if column in df:
+            df[column] = df[column].astype("category")
+    for column in datetimes:
+        if column in df:
+            df[column] = pd.to_datetime(df[column], format="ISO8601", errors="coerce")
+    key = KEY_COLUMNS.get(table)
+    for column in df.select_dtypes(include="integer").columns:
+        if column == key:
+            df[column] = df[column].astype("int64")
+        else:
+            df[column] = pd.to_numeric(df[column], downcast="integer")
+    #integer columns with NULLs arrive as float64
+    for column in df.select_dtypes(include="floating").columns:
+        df[column] = pd.to_numeric(df[column], downcast="float")
+    return df
+
+
+def frame_memory(df):
+    """Deep memory use of a frame in bytes."""
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def _report_row(table, column, rows, default_bytes, compact_bytes):
+    return {
+        "table": table,
+        "column": column,
+        "rows": rows,
+        "default_mb": default_bytes / 2 ** 20,
+        "compact_mb": compact_bytes / 2 ** 20,
+        "reduction": default_bytes / compact_bytes if compact_bytes else 0.0,
+    }
+
+
+def memory_report(conn, tables=None, by_column=False):
+    """Memory of each table loaded with default dtypes versus compact_frame.
+
+    With by_column=True there is also a row per column, which shows how much
+    of what's left is free text that no dtype can shrink.
+    """
+    rows = []
+    for table in tables or FRAME_TYPES:
+        default = pd.read_sql_query(f"SELECT * FROM {table}", conn)
+        compact = compact_frame(default.copy(), table)
+        rows.append(_report_row(table, "(all)", len(default), frame_memory(default), frame_memory(compact)))
+        if by_column:
+            default_usage = default.memory_usage(index=False, deep=True)
+            compact_usage = compact.memory_usage(index=False, deep=True)
+            for column in default.columns:
+                rows.append(_report_row(table, column, len(default), default_usage[column], compact_usage[column]))
+    return pd.DataFrame(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare DataFrame memory with default and compact dtypes.")
+    parser.add_argument("--report", action="store_true", help="print the memory report for each table")
+    parser.add_argument("--columns", action="store_true", help="break each table down by column")
+    parser.add_argument("--db", help="database file (default: the app database)")
+    args = parser.parse_args()
+
+    if args.report:
+        from app.data.db import DB_PATH, connect_database
+        conn = connect_database(args.db or DB_PATH)
+        report = memory_report(conn, by_column=args.columns)
+        conn.close()
+        print(f"{'table':<20} {'column':<24} {'rows':>10} {'default MB':>11} {'compact MB':>11} {'reduction':>10}")
+        for row in report.itertuples(index=False):
+            print(f"{row.table:<20} {row.column:<24} {row.rows:>10} {row.default_mb:>11.2f} "
+                  f"{row.compact_mb:>11.2f} {row.reduction:>9.1f}x")
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
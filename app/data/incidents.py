@@ -1,8 +1,17 @@
 import pandas as pd
 from pathlib import Path
-from app.data.db import connect_database
-
-def insert_incident(conn, timestamp, severity, category, status, description):
+from app.data.db import connect_database, retry_on_busy
+from app.data.cache import cached_query, bump_table_version
+from app.services.instrumentation import timed
+from app.data.ingest import ingest_csv, ingest_csv_incremental, format_ingest_stats, CHUNK_SIZE, STORED_DATETIME_FORMAT
+from app.data.changes import delta_frame
+from app.data.pagination import fetch_page, count_rows
+
+INCIDENT_FILTERS = ("severity", "category", "status")
+
+@timed
+@retry_on_busy
+def insert_incident(conn, timestamp, severity, category, status, description, commit=True):
     """Insert a new incident into cyber_incidents and return its row incident_id."""
     
     cursor = conn.cursor()
@@ -11,11 +20,15 @@ def insert_incident(conn, timestamp, severity, category, status, description):
         (timestamp, severity, category, status, description)
         VALUES (?, ?, ?, ?, ?)
     """, (timestamp, severity, category, status, description))
-    conn.commit()
+    if commit:
+        conn.commit()
+        bump_table_version("cyber_incidents")
 
     return cursor.lastrowid
 
-def update_incident_status(conn, incident_id, new_status):
+@timed
+@retry_on_busy
+def update_incident_status(conn, incident_id, new_status, commit=True):
     """Update the status of an incident and returns the number of rows updated."""
 
     cursor = conn.cursor()
@@ -23,31 +36,104 @@ def update_incident_status(conn, incident_id, new_status):
         """UPDATE cyber_incidents SET status = ? WHERE incident_id = ?""",
         (new_status, incident_id)
     )
-    conn.commit()
+    if commit:
+        conn.commit()
+        bump_table_version("cyber_incidents")
 
     return cursor.rowcount
 
-def delete_incident(conn, incident_id):
+@timed
+@retry_on_busy
+def delete_incident(conn, incident_id, commit=True):
     """Delete an incident by its incident_id and returning the number of rows deleted."""
 
     cursor = conn.cursor()
     cursor.execute(
         """DELETE FROM cyber_incidents WHERE incident_id = ?""", (incident_id,)
     )
-    conn.commit()
+    if commit:
+        conn.commit()
+        bump_table_version("cyber_incidents")
 
     return cursor.rowcount
 
-def get_all_incidents(conn):
-    """Get all incidents as DataFrame."""
+@timed(trace=False)
+@retry_on_busy
+def insert_incidents_many(conn, incidents, commit=True):
+    """Insert many incidents in one transaction and return the number inserted.
 
-    df = pd.read_sql_query(
-        "SELECT * FROM cyber_incidents ORDER BY incident_id DESC",
-        conn
+    incidents is an iterable of (timestamp, severity, category, status, description).
+    Pass commit=False to leave the transaction open, e.g. for the group-commit writer.
+    """
+    cursor = conn.cursor()
+    cursor.executemany("""
+        INSERT INTO cyber_incidents 
+        (timestamp, severity, category, status, description)
+        VALUES (?, ?, ?, ?, ?)
+    """, incidents)
+    if commit:
+        conn.commit()
+        bump_table_version("cyber_incidents")
+
+    return cursor.rowcount
+
+@timed(trace=False)
+@retry_on_busy
+def update_incident_status_many(conn, incident_ids, new_status, commit=True):
+    """Set the status of many incidents in one transaction and return the number updated."""
+
+    cursor = conn.cursor()
+    cursor.executemany(
+        """UPDATE cyber_incidents SET status = ? WHERE incident_id = ?""",
+        [(new_status, int(incident_id)) for incident_id in incident_ids]
     )
-    return df
+    if commit:
+        conn.commit()
+        bump_table_version("cyber_incidents")
+
+    return cursor.rowcount
+
+@timed(trace=False)
+@retry_on_busy
+def delete_incidents_many(conn, incident_ids, commit=True):
+    """Delete many incidents in one transaction and return the number deleted."""
+
+    cursor = conn.cursor()
+    cursor.executemany(
+        """DELETE FROM cyber_incidents WHERE incident_id = ?""",
+        [(int(incident_id),) for incident_id in incident_ids]
+    )
+    if commit:
+        conn.commit()
+        bump_table_version("cyber_incidents")
 
-def load_incident_data_to_sql(conn, csv_path, table_name="cyber_incidents"):
+    return cursor.rowcount
+
+@timed
+def get_all_incidents(conn):
+    """Get all incidents as a DataFrame with compact dtypes, see frames.compact_frame.
+
+    Only rows changed since the previous call are read, see changes.delta_frame.
+    """
+    return delta_frame(conn, "cyber_incidents")
+
+@cached_query("cyber_incidents")
+def get_incidents_page(conn, limit=50, after_id=None, before_id=None,
+                       severity=None, category=None, status=None):
+    """Get one page of incidents, newest first, using keyset pagination on incident_id."""
+    filters = {"severity": severity, "category": category, "status": status}
+    return fetch_page(conn, "cyber_incidents", "incident_id", INCIDENT_FILTERS,
+                      limit=limit, after=after_id, before=before_id, filters=filters)
+
+@cached_query("cyber_incidents")
+def count_incidents(conn, severity=None, category=None, status=None):
+    """Count incidents matching the optional filters."""
+    filters = {"severity": severity, "category": category, "status": status}
+    return count_rows(conn, "cyber_incidents", INCIDENT_FILTERS, filters)
+
+@timed(trace=False)
+def load_incident_data_to_sql(conn, csv_path, table_name="cyber_incidents", chunksize=CHUNK_SIZE,
+                              incremental=False, bulk=False):
     """Loading sample data from cyberincidents csv to sql database."""
 
     csv_path = Path(csv_path)
@@ -55,20 +141,25 @@ def load_incident_data_to_sql(conn, csv_path, table_name="cyber_incidents"):
     if not csv_path.exists():
         print(f"⚠️ CSV file not found: {csv_path}")
         return 0
-    
-    #Reading csv using pandas
-    df = pd.read_csv(csv_path)
-    
-    # Drop incident_id if present, since it's autoincrement
-    if "incident_id" in df.columns:
-        df = df.drop(columns=["incident_id"])
-
-    #Insert data into cyber incidents table
-    df.to_sql(name=table_name, con=conn, if_exists='append', index=False)
-    row_count = len(df)
-    print(f"✅ Successfully loaded {row_count} rows into '{table_name}'.")
-    return row_count
 
+    #stream the csv in chunks, incident_id is autoincrement so a plain load leaves it out
+    options = dict(
+        columns=["timestamp", "severity", "category", "status", "description"],
+        date_columns={"timestamp": ("%Y-%m-%d %H:%M:%S.%f", STORED_DATETIME_FORMAT)},
+        chunksize=chunksize,
+        #big loads skip the per-row derived-table triggers and rebuild those tables once
+        bulk=bulk,
+    )
+    if incremental:
+        #only read what was appended since the last run and upsert on the export's incident_id
+        stats = ingest_csv_incremental(conn, csv_path, table_name, source_key="incident_id", **options)
+    else:
+        stats = ingest_csv(conn, csv_path, table_name, **options)
+    bump_table_version(table_name)
+    print(f"✅ Successfully loaded {format_ingest_stats(stats)}.")
+    return stats["rows"]
+
+@cached_query("cyber_incidents")
 def get_incidents_by_type_count(conn):
     """Get count of incidents by category."""
     df = pd.read_sql_query(
@@ -77,6 +168,7 @@ def get_incidents_by_type_count(conn):
     )
     return df
 
+@cached_query("cyber_incidents")
 def get_high_severity_by_status(conn):
     """Get high severity incidents by status."""
     df = pd.read_sql_query(
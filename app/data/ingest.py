@@ -0,0 +1,345 @@
+import contextlib
+import csv
+import hashlib
+import io
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from app.data.bulk import bulk_load
+from app.services.instrumentation import timed
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+# Rows read from the CSV at a time, and rows written per transaction
+CHUNK_SIZE = 50_000
+COMMIT_EVERY = 500_000
+
+# Bytes hashed around a checkpoint to check the file wasn't rewritten
+TAIL_WINDOW = 4096
+
+# Format timestamps are stored in, same as the dashboards write
+STORED_DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Pragmas used while a bulk load is running
+BULK_PRAGMAS = {
+    "synchronous": "OFF",
+    "cache_size": -256 * 1024,
+    "temp_store": "MEMORY",
+}
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process in MB, or None if unknown."""
+    if resource is None:
+        return None
+    #ru_maxrss is in KB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _set_pragmas(conn, pragmas):
+    previous = {}
+    for name, value in pragmas.items():
+        previous[name] = conn.execute(f"PRAGMA {name}").fetchone()[0]
+        conn.execute(f"PRAGMA {name} = {value}")
+    return previous
+
+
+def prepare_chunk(chunk, columns, dtypes=None, date_columns=None):
+    """Cast one CSV chunk to the table's columns and return it as rows of Python values.
+
+    date_columns maps column name to (input format, stored format). Values that
+    don't match the format become NULL. Returns (rows, bad_dates).
+    """
+    bad_dates = 0
+    for column, (in_format, out_format) in (date_columns or {}).items():
+        raw = chunk[column]
+        parsed = pd.to_datetime(raw, format=in_format, errors="coerce")
+        bad_dates += int((parsed.isna() & raw.notna()).sum())
+        chunk[column] = parsed.dt.strftime(out_format)
+
+    if dtypes:
+        chunk = chunk.astype(dtypes)
+
+    chunk = chunk[list(columns)].astype(object)
+    chunk = chunk.where(chunk.notna(), None)
+    return list(chunk.itertuples(index=False, name=None)), bad_dates
+
+
+def _insert_query(table, columns, upsert):
+    placeholders = ", ".join("?" for _ in columns)
+    query = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})"
+    if upsert:
+        #only touch rows whose values actually changed, so re-imports are no-ops
+        updated = [c for c in columns if c != "source_key"]
+        assignments = ", ".join(f"{c} = excluded.{c}" for c in updated)
+        changed = " OR ".join(f"{c} IS NOT excluded.{c}" for c in updated)
+        query += (
+            " ON CONFLICT(source_key) WHERE source_key IS NOT NULL"
+            f" DO UPDATE SET {assignments} WHERE {changed}"
+        )
+    return query
+
+
+def _add_source_key(chunk, source_key, columns):
+    """Fill the source_key column from the CSV's id column, or from a hash of the row."""
+    if source_key in chunk.columns:
+        chunk["source_key"] = chunk[source_key]
+    else:
+        #no id in the export, fall back to a natural key over the row's values
+        joined = chunk[columns].fillna("").agg("\x1f".join, axis=1)
+        chunk["source_key"] = [hashlib.sha1(v.encode("utf-8")).hexdigest() for v in joined]
+    return chunk
+
+
+def _load_chunks(conn, reader, table, columns, dtypes, date_columns, commit_every,
+                 source_key=None, before_commit=None, bulk=False):
+    """Insert every chunk from reader, committing every commit_every rows.
+
+    With bulk set the whole load is one transaction run under bulk.bulk_load.
+    """
+    target_columns = columns + ["source_key"] if source_key else columns
+    query = _insert_query(table, target_columns, upsert=bool(source_key))
+
+    started = time.perf_counter()
+    previous = _set_pragmas(conn, BULK_PRAGMAS)
+    total = 0
+    changed = 0
+    bad_dates = 0
+    pending = 0
+    cursor = conn.cursor()
+    try:
+        with bulk_load(conn, table) if bulk else contextlib.nullcontext():
+            for chunk in reader:
+                missing = [c for c in columns if c not in chunk.columns]
+                for column in missing:
+                    chunk[column] = None
+                if source_key:
+                    chunk = _add_source_key(chunk, source_key, columns)
+                rows, bad = prepare_chunk(chunk, target_columns, dtypes, date_columns)
+                cursor.executemany(query, rows)
+                changed += max(cursor.rowcount, 0)
+                total += len(rows)
+                pending += len(rows)
+                bad_dates += bad
+                if pending >= commit_every and not bulk:
+                    conn.commit()
+                    pending = 0
+            if before_commit:
+                before_commit(cursor, total)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        _set_pragmas(conn, previous)
+
+    elapsed = time.perf_counter() - started
+    return {
+        "table": table,
+        "rows": total,
+        "changed": changed,
+        "bad_dates": bad_dates,
+        "elapsed": elapsed,
+        "rows_per_sec": total / elapsed if elapsed else 0.0,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+@timed(trace=False)
+def ingest_csv(conn, csv_path, table, columns, dtypes=None, date_columns=None,
+               chunksize=CHUNK_SIZE, commit_every=COMMIT_EVERY, source_key=None, bulk=False):
+    """Stream a CSV into a table in bounded chunks.
+
+    Only chunksize rows are held in memory at once, so memory stays flat no
+    matter how big the file is. Rows are inserted with executemany and
+    committed every commit_every rows. If source_key names the CSV's id
+    column, rows are upserted on it instead of appended. bulk=True loads the
+    whole file in one transaction with the derived-table triggers dropped and
+    rebuilds those tables once at the end, see bulk.bulk_load. Returns a stats
+    dict with rows, elapsed seconds, rows/sec and peak RSS.
+    """
+    columns = list(columns)
+    wanted = set(columns) | ({source_key} if source_key else set())
+
+    #read everything as text so dtypes are only cast once, by us
+    reader = pd.read_csv(
+        Path(csv_path),
+        usecols=lambda name: name in wanted,
+        dtype=str,
+        keep_default_na=True,
+        chunksize=chunksize,
+    )
+    return _load_chunks(conn, reader, table, columns, dtypes, date_columns,
+                        commit_every, source_key, bulk=bulk)
+
+
+class _BoundedReader(io.RawIOBase):
+    """Raw file reader that stops after a fixed number of bytes."""
+
+    def __init__(self, f, remaining):
+        self.f = f
+        self.remaining = remaining
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if self.remaining <= 0:
+            return 0
+        view = memoryview(buffer)[:self.remaining]
+        n = self.f.readinto(view)
+        self.remaining -= n
+        return n
+
+
+def _hash_range(f, start, end):
+    f.seek(start)
+    return hashlib.sha256(f.read(max(0, end - start))).hexdigest()
+
+
+def _last_newline(f, size):
+    """Offset just past the last complete line, so a half-written line is left for next time."""
+    pos = size
+    while pos > 0:
+        step = min(64 * 1024, pos)
+        f.seek(pos - step)
+        block = f.read(step)
+        index = block.rfind(b"\n")
+        if index != -1:
+            return pos - step + index + 1
+        pos -= step
+    return 0
+
+
+def get_checkpoint(conn, source):
+    """Return the stored checkpoint for a source as a dict, or None."""
+    cursor = conn.cursor()
+    cursor.execute(
+        """SELECT file_id, file_size, byte_offset, head_hash, tail_hash, rows_loaded
+           FROM ingest_checkpoints WHERE source = ?""",
+        (source,),
+    )
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    keys = ("file_id", "file_size", "byte_offset", "head_hash", "tail_hash", "rows_loaded")
+    return dict(zip(keys, row))
+
+
+def _check_keyed(conn, table):
+    """Refuse an incremental load onto rows the full path loaded without a source_key."""
+    cursor = conn.cursor()
+    cursor.execute("SELECT 1 FROM ingest_checkpoints WHERE table_name = ? LIMIT 1", (table,))
+    if cursor.fetchone() is not None:
+        #incremental loads have run here before, unkeyed rows since then were added from the dashboards
+        return
+    cursor.execute(f"SELECT COUNT(*) FROM {table} WHERE source_key IS NULL")
+    unkeyed = cursor.fetchone()[0]
+    if unkeyed:
+        #their export ids were dropped on the way in, upserting on source_key would insert all of them again
+        raise ValueError(
+            f"'{table}' has {unkeyed} rows without a source_key, loaded without incremental mode. "
+            "Load incrementally into an empty table, or keep using full loads for this one."
+        )
+
+
+@timed(trace=False)
+def ingest_csv_incremental(conn, csv_path, table, columns, source_key, dtypes=None,
+                           date_columns=None, chunksize=CHUNK_SIZE, commit_every=COMMIT_EVERY,
+                           bulk=False):
+    """Load only the part of a CSV that is new since the last run.
+
+    A checkpoint in ingest_checkpoints records how far into the file we got
+    plus hashes of the header and of the bytes just before that offset. If
+    both still match, the file was only appended to and reading resumes from
+    the offset. Otherwise the whole file is read again. Rows are upserted on
+    source_key either way, so re-importing the same data changes nothing.
+    bulk works as for ingest_csv.
+
+    Raises ValueError on the first incremental load into a table that already
+    has rows without a source_key, since those would all be inserted again.
+    """
+    csv_path = Path(csv_path)
+    source = f"{csv_path.resolve()}|{table}"
+    st = csv_path.stat()
+    file_id = f"{st.st_dev}:{st.st_ino}"
+    columns = list(columns)
+    _check_keyed(conn, table)
+
+    with open(csv_path, "rb") as f:
+        header_line = f.readline()
+        header_end = f.tell()
+        header = next(csv.reader([header_line.decode("utf-8-sig")]))
+
+        start = header_end
+        checkpoint = get_checkpoint(conn, source)
+        if checkpoint and header_end <= checkpoint["byte_offset"] <= st.st_size:
+            offset = checkpoint["byte_offset"]
+            head_hash = _hash_range(f, 0, min(offset, header_end + TAIL_WINDOW))
+            tail_hash = _hash_range(f, max(header_end, offset - TAIL_WINDOW), offset)
+            if head_hash == checkpoint["head_hash"] and tail_hash == checkpoint["tail_hash"]:
+                start = offset
+        resumed = start != header_end
+        rows_before = checkpoint["rows_loaded"] if checkpoint and resumed else 0
+
+        end = max(header_end, _last_newline(f, st.st_size))
+        new_head_hash = _hash_range(f, 0, min(end, header_end + TAIL_WINDOW))
+        new_tail_hash = _hash_range(f, max(header_end, end - TAIL_WINDOW), end)
+
+        def save_checkpoint(cursor, loaded):
+            cursor.execute(
+                """INSERT INTO ingest_checkpoints
+                   (source, table_name, file_id, file_size, byte_offset, head_hash,
+                    tail_hash, rows_loaded, updated_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                   ON CONFLICT(source) DO UPDATE SET
+                       file_id = excluded.file_id, file_size = excluded.file_size,
+                       byte_offset = excluded.byte_offset, head_hash = excluded.head_hash,
+                       tail_hash = excluded.tail_hash, rows_loaded = excluded.rows_loaded,
+                       updated_at = excluded.updated_at""",
+                (source, table, file_id, st.st_size, end, new_head_hash, new_tail_hash,
+                 rows_before + loaded),
+            )
+
+        f.seek(start)
+        wanted = set(columns) | {source_key}
+        if start >= end:
+            reader = []
+        else:
+            text = io.TextIOWrapper(
+                io.BufferedReader(_BoundedReader(f, end - start)), encoding="utf-8"
+            )
+            reader = pd.read_csv(
+                text,
+                header=None,
+                names=header,
+                usecols=lambda name: name in wanted,
+                dtype=str,
+                keep_default_na=True,
+                chunksize=chunksize,
+            )
+        stats = _load_chunks(conn, reader, table, columns, dtypes, date_columns,
+                             commit_every, source_key, before_commit=save_checkpoint, bulk=bulk)
+
+    stats["resumed_from"] = start if resumed else 0
+    return stats
+
+
+def format_ingest_stats(stats):
+    """One-line summary of an ingest_csv result."""
+    line = f"{stats['rows']} rows into '{stats['table']}' in {stats['elapsed']:.2f}s ({stats['rows_per_sec']:,.0f} rows/sec"
+    if stats["peak_rss_mb"] is not None:
+        line += f", peak RSS {stats['peak_rss_mb']:.0f} MB"
+    line += ")"
+    if stats["changed"] != stats["rows"]:
+        line += f", {stats['changed']} new or changed"
+    if stats.get("resumed_from"):
+        line += f", resumed at byte {stats['resumed_from']}"
+    if stats["bad_dates"]:
+        line += f", {stats['bad_dates']} unparseable dates stored as NULL"
+    return line
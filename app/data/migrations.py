@@ -0,0 +1,143 @@
+import time
+
+from app.data.schema import (
+    create_users_table,
+    create_cyber_incidents_table,
+    create_datasets_metadata_table,
+    create_it_tickets_table,
+    create_table_versions,
+)
+from app.data.rollups import backfill_rollups, create_rollup_tables
+from app.data.search import create_search_tables, rebuild_search_indexes
+from app.data.snapshots import create_rewrite_counters
+from app.data.sla import backfill_sla_sketches, create_sla_sketches
+from app.data.changes import create_change_log
+from app.data.revocations import create_revocation_tables
+
+
+def _base_tables(conn):
+    create_users_table(conn)
+    create_cyber_incidents_table(conn)
+    create_datasets_metadata_table(conn)
+    create_it_tickets_table(conn)
+
+
+def _dashboard_indexes(conn):
+    cursor = conn.cursor()
+    #filters, group-bys and time ranges used by the cyber dashboard
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_incidents_severity_status ON cyber_incidents (severity, status)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_incidents_category_timestamp ON cyber_incidents (category, timestamp)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_incidents_status ON cyber_incidents (status)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_incidents_timestamp ON cyber_incidents (timestamp)")
+
+    #it operations dashboard
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_tickets_priority ON it_tickets (priority)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_tickets_status_assigned ON it_tickets (status, assigned_to)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_tickets_assigned_to ON it_tickets (assigned_to)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_tickets_created_at ON it_tickets (created_at)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_tickets_resolution_time ON it_tickets (resolution_time_hours)")
+
+    #data science dashboard
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_datasets_uploaded_by ON datasets_metadata (uploaded_by)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_datasets_rows ON datasets_metadata (rows)")
+
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_users_role ON users (role)")
+    conn.commit()
+
+
+def _has_column(conn, table, column):
+    return any(row[1] == column for row in conn.execute(f"PRAGMA table_info({table})"))
+
+
+def _incremental_ingest(conn):
+    cursor = conn.cursor()
+    #source_key holds the id from the export (or a hash of the row) so imports can upsert
+    for table in ("cyber_incidents", "it_tickets", "datasets_metadata"):
+        if not _has_column(conn, table, "source_key"):
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN source_key TEXT")
+        cursor.execute(
+            f"CREATE UNIQUE INDEX IF NOT EXISTS idx_{table}_source_key "
+            f"ON {table} (source_key) WHERE source_key IS NOT NULL"
+        )
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS ingest_checkpoints (
+            source TEXT PRIMARY KEY,
+            table_name TEXT NOT NULL,
+            file_id TEXT,
+            file_size INTEGER,
+            byte_offset INTEGER NOT NULL,
+            head_hash TEXT,
+            tail_hash TEXT,
+            rows_loaded INTEGER DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.commit()
+
+
+def _trend_rollups(conn):
+    create_rollup_tables(conn)
+    #the triggers only see rows written from now on
+    backfill_rollups(conn)
+
+
+def _description_search(conn):
+    create_search_tables(conn)
+    rebuild_search_indexes(conn)
+
+
+def _resolution_sketches(conn):
+    if create_sla_sketches(conn):
+        backfill_sla_sketches(conn)
+
+
+# Ordered list of (version, description, function). Append new migrations to
+# the end and never edit one that has shipped. Each must be safe to re-run.
+MIGRATIONS = [
+    (1, "base tables", _base_tables),
+    (2, "table version counters", create_table_versions),
+    (3, "dashboard indexes", _dashboard_indexes),
+    (4, "incremental ingest", _incremental_ingest),
+    (5, "time-bucket rollups", _trend_rollups),
+    (6, "description search", _description_search),
+    (7, "snapshot rewrite counters", create_rewrite_counters),
+    (8, "resolution time sketches", _resolution_sketches),
+    (9, "change tracking", create_change_log),
+    (10, "session revocations", create_revocation_tables),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(conn):
+    """Return the schema version stored in PRAGMA user_version."""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn, target=LATEST_VERSION, analyze=True):
+    """Apply every migration newer than the database's schema version.
+
+    Returns the list of versions that were applied. Nothing is dropped, so
+    running this against a live database keeps its data.
+    """
+    current = get_schema_version(conn)
+    applied = []
+
+    for version, description, apply in MIGRATIONS:
+        if version <= current or version > target:
+            continue
+        started = time.perf_counter()
+        apply(conn)
+        #user_version can't be bound as a parameter
+        conn.execute(f"PRAGMA user_version = {int(version)}")
+        conn.commit()
+        applied.append(version)
+        print(f"✅ Migration {version} ({description}) applied in {time.perf_counter() - started:.2f}s")
+
+    if applied and analyze:
+        #refresh planner statistics so the new indexes get used
+        conn.execute("ANALYZE")
+        conn.commit()
+
+    return applied
@@ -0,0 +1,71 @@
+import pandas as pd
+
+
+def build_where(filters, allowed):
+    """Turn a {column: value} dict into a WHERE clause and its parameters.
+
+    None values are skipped, lists and tuples become IN (...) and anything else
+    is an equality test. Only columns listed in allowed are accepted so the
+    column names can be put into the SQL safely.
+    """
+    clauses = []
+    params = []
+    for column, value in (filters or {}).items():
+        if value is None:
+            continue
+        if column not in allowed:
+            raise ValueError(f"Cannot filter on column '{column}'")
+        if isinstance(value, (list, tuple, set)):
+            if not value:
+                #empty selection matches nothing
+                clauses.append("0")
+                continue
+            placeholders = ", ".join("?" for _ in value)
+            clauses.append(f"{column} IN ({placeholders})")
+            params.extend(value)
+        else:
+            clauses.append(f"{column} = ?")
+            params.append(value)
+    return clauses, params
+
+
+def fetch_page(conn, table, key, allowed_filters, limit=50, after=None, before=None,
+               filters=None, columns="*"):
+    """Fetch one page of a table using keyset pagination on its primary key.
+
+    Rows come back newest first (key descending), like the get_all_* functions.
+    Pass the last key of the current page as after to get the next page, or the
+    first key as before to get the previous one. Only limit rows are read, no
+    matter how deep into the table the page is.
+    """
+    if after is not None and before is not None:
+        raise ValueError("Pass either after or before, not both")
+
+    clauses, params = build_where(filters, allowed_filters)
+    order = "DESC"
+    if after is not None:
+        clauses.append(f"{key} < ?")
+        params.append(int(after))
+    elif before is not None:
+        #walk backwards from the first row of the current page then flip the result
+        clauses.append(f"{key} > ?")
+        params.append(int(before))
+        order = "ASC"
+
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    query = f"SELECT {columns} FROM {table} {where} ORDER BY {key} {order} LIMIT ?"
+    params.append(int(limit))
+
+    df = pd.read_sql_query(query, conn, params=params)
+    if order == "ASC":
+        df = df.iloc[::-1].reset_index(drop=True)
+    return df
+
+
+def count_rows(conn, table, allowed_filters, filters=None):
+    """Count the rows matching the filters without loading them."""
+    clauses, params = build_where(filters, allowed_filters)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT COUNT(*) FROM {table} {where}", params)
+    return cursor.fetchone()[0]
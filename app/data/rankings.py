@@ -0,0 +1,114 @@
+import pandas as pd
+
+from app.data.aggregations import table_columns
+from app.data.cache import cached_query
+from app.data.sla import GAMMA, RESOLVED_STATUSES, ZERO_BUCKET, has_sketch_table
+
+#top-k and bottom-k lists answered with ORDER BY ... LIMIT inside SQLite, either
+#straight off an index or over a pre-aggregated table, so nothing is loaded in full
+
+# Largest k any ranking returns
+MAX_RANK = 1_000
+
+_RESOLVED = ", ".join(f"'{s}'" for s in RESOLVED_STATUSES)
+
+
+def _limit(k):
+    k = int(k)
+    if not 1 <= k <= MAX_RANK:
+        raise ValueError(f"k must be between 1 and {MAX_RANK}")
+    return k
+
+
+def _direction(largest):
+    return "DESC" if largest else "ASC"
+
+
+@cached_query("datasets_metadata")
+def top_datasets_by_rows(conn, k=5, largest=True):
+    """The k datasets with the most rows, or the fewest with largest=False.
+
+    Walks idx_datasets_rows from one end, ties are broken by dataset_id.
+    Datasets without a row count are left out.
+    """
+    order = _direction(largest)
+    return pd.read_sql_query(
+        f"""SELECT dataset_id, name, rows, columns, uploaded_by FROM datasets_metadata
+            WHERE rows IS NOT NULL
+            ORDER BY rows {order}, dataset_id {order} LIMIT ?""",
+        conn,
+        params=(_limit(k),),
+    )
+
+
+@cached_query("it_tickets")
+def top_staff_by_open_tickets(conn, k=10, largest=True):
+    """The k assignees with the most open tickets, or the fewest with largest=False.
+
+    Counts come from the (status, assigned_to) index, so only open tickets
+    are read. Staff with no open tickets at all don't appear.
+    """
+    order = _direction(largest)
+    return pd.read_sql_query(
+        f"""SELECT assigned_to, COUNT(*) AS count FROM it_tickets
+            WHERE status = 'Open' AND assigned_to IS NOT NULL
+            GROUP BY assigned_to
+            ORDER BY count {order}, assigned_to LIMIT ?""",
+        conn,
+        params=(_limit(k),),
+    )
+
+
+@cached_query("it_tickets")
+def top_staff_by_resolution_time(conn, k=10, largest=True, min_tickets=1):
+    """The k assignees with the slowest average resolution of resolved tickets, or fastest with largest=False.
+
+    Averages come from the per-assignee resolution sketches (see app.data.sla),
+    within 1% of the exact value, so the query never touches it_tickets.
+    Assignees with fewer than min_tickets resolved tickets are skipped.
+    """
+    order = _direction(largest)
+    if has_sketch_table(conn):
+        #every bucket stands for the middle of its range, as in sla.sketch_quantiles
+        return pd.read_sql_query(
+            f"""SELECT value AS assigned_to, SUM(count) AS count,
+                       SUM(count * CASE WHEN bucket = {ZERO_BUCKET} THEN 0
+                                        ELSE 2 * pow({GAMMA!r}, bucket) / {GAMMA + 1!r} END)
+                           / SUM(count) AS avg_resolution_hours
+                FROM ticket_sla_sketches
+                WHERE dimension = 'assigned_to' AND value != '' AND count > 0
+                GROUP BY value HAVING SUM(count) >= ?
+                ORDER BY avg_resolution_hours {order}, assigned_to LIMIT ?""",
+            conn,
+            params=(min_tickets, _limit(k)),
+        )
+
+    return pd.read_sql_query(
+        f"""SELECT assigned_to, COUNT(*) AS count, AVG(resolution_time_hours) AS avg_resolution_hours
+            FROM it_tickets
+            WHERE status IN ({_RESOLVED}) AND resolution_time_hours IS NOT NULL AND assigned_to IS NOT NULL
+            GROUP BY assigned_to HAVING COUNT(*) >= ?
+            ORDER BY avg_resolution_hours {order}, assigned_to LIMIT ?""",
+        conn,
+        params=(min_tickets, _limit(k)),
+    )
+
+
+@cached_query("cyber_incidents")
+def top_analysts_by_unresolved_incidents(conn, k=5, largest=True):
+    """The k assignees with the most unresolved incidents, or the fewest with largest=False.
+
+    Incidents only have an assignee in some exports, without the column the
+    result is empty.
+    """
+    if "assigned_to" not in table_columns(conn, "cyber_incidents"):
+        return pd.DataFrame(columns=["assigned_to", "count"])
+    order = _direction(largest)
+    return pd.read_sql_query(
+        f"""SELECT assigned_to, COUNT(*) AS count FROM cyber_incidents
+            WHERE status != 'Resolved' AND assigned_to IS NOT NULL
+            GROUP BY assigned_to
+            ORDER BY count {order}, assigned_to LIMIT ?""",
+        conn,
+        params=(_limit(k),),
+    )
@@ -0,0 +1,92 @@
+"""Revoked session tokens, kept in the database so they survive restarts.
+
+revoked_tokens holds single tokens by id (logout), revoked_users a time
+before which every token of a user is void (role change, deletion). Rows are
+dropped once the tokens they cover would have expired anyway.
+"""
+import time
+
+from app.data.cache import bump_table_version, cached_query
+from app.data.db import retry_on_busy
+from app.services.instrumentation import timed
+
+REVOCATION_TABLES = ("revoked_tokens", "revoked_users")
+
+
+def create_revocation_tables(conn):
+    """Create the revocation tables and the version counters that invalidate cached reads of them."""
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS revoked_tokens (
+            token_id TEXT PRIMARY KEY,
+            expires_at REAL NOT NULL
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS revoked_users (
+            username TEXT PRIMARY KEY,
+            issued_before REAL NOT NULL,
+            expires_at REAL NOT NULL
+        )
+    """)
+    #the table_versions counters tell other processes a token was revoked
+    for table in REVOCATION_TABLES:
+        cursor.execute("INSERT OR IGNORE INTO table_versions (table_name, version) VALUES (?, 0)", (table,))
+        for event in ("INSERT", "UPDATE", "DELETE"):
+            cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS {table}_version_{event.lower()}
+                AFTER {event} ON {table}
+                BEGIN
+                    UPDATE table_versions SET version = version + 1 WHERE table_name = '{table}';
+                END
+            """)
+    conn.commit()
+
+
+def _purge(cursor, now):
+    cursor.execute("DELETE FROM revoked_tokens WHERE expires_at <= ?", (now,))
+    cursor.execute("DELETE FROM revoked_users WHERE expires_at <= ?", (now,))
+
+
+@timed
+@retry_on_busy
+def insert_revoked_token(conn, token_id, expires_at, commit=True):
+    """Revoke one token until it expires."""
+    cursor = conn.cursor()
+    _purge(cursor, time.time())
+    cursor.execute(
+        "INSERT OR REPLACE INTO revoked_tokens (token_id, expires_at) VALUES (?, ?)",
+        (token_id, expires_at)
+    )
+    if commit:
+        conn.commit()
+        bump_table_version(*REVOCATION_TABLES)
+
+
+@timed
+@retry_on_busy
+def insert_user_revocation(conn, username, issued_before, expires_at, commit=True):
+    """Revoke every token issued to a user up to issued_before, remembered until expires_at."""
+    cursor = conn.cursor()
+    _purge(cursor, time.time())
+    cursor.execute(
+        """INSERT INTO revoked_users (username, issued_before, expires_at) VALUES (?, ?, ?)
+           ON CONFLICT(username) DO UPDATE SET
+               issued_before = MAX(issued_before, excluded.issued_before),
+               expires_at = MAX(expires_at, excluded.expires_at)""",
+        (username, issued_before, expires_at)
+    )
+    if commit:
+        conn.commit()
+        bump_table_version(*REVOCATION_TABLES)
+
+
+@cached_query(*REVOCATION_TABLES)
+def get_revocations(conn):
+    """Return (revoked token ids, username -> issued_before) for every revocation still in force."""
+    now = time.time()
+    cursor = conn.cursor()
+    cursor.execute("SELECT token_id FROM revoked_tokens WHERE expires_at > ?", (now,))
+    tokens = frozenset(row[0] for row in cursor.fetchall())
+    cursor.execute("SELECT username, issued_before FROM revoked_users WHERE expires_at > ?", (now,))
+    return tokens, dict(cursor.fetchall())
@@ -0,0 +1,174 @@
+"""Time-bucket rollups of incident and ticket counts.
+
+Triggers on the base tables keep the rollups current on every insert,
+update and delete, except during a bulk load, see bulk.bulk_load. To
+rebuild them from scratch, run from the project root:
+    python -m app.data.rollups --backfill
+"""
+import argparse
+import time
+
+import pandas as pd
+
+from app.data.cache import cached_query
+
+# SQL for the start of each bucket, given a timestamp expression
+BUCKETS = {
+    "hour": "strftime('%Y-%m-%d %H:00:00', {ts})",
+    "day": "date({ts})",
+    #weeks start on Monday: jump to the coming Sunday then back six days
+    "week": "date({ts}, 'weekday 0', '-6 days')",
+}
+
+# rollup table -> (base table, timestamp column, dimension columns)
+ROLLUPS = {
+    "incident_rollups": ("cyber_incidents", "timestamp", ("category", "severity", "status")),
+    "ticket_rollups": ("it_tickets", "created_at", ("priority", "status")),
+}
+
+
+def _bucket_rows(row, ts_column, dims):
+    """SELECT producing one (bucket_size, bucket, dims...) row per bucket size for NEW or OLD."""
+    dim_values = ", ".join(f"COALESCE({row}.{d}, '')" for d in dims)
+    selects = [
+        f"SELECT '{size}', {expr.format(ts=f'{row}.{ts_column}')}, {dim_values}"
+        for size, expr in BUCKETS.items()
+    ]
+    return " UNION ALL ".join(selects)
+
+
+def _apply_sql(rollup, ts_column, dims, row, delta):
+    columns = ", ".join(("bucket_size", "bucket") + dims)
+    return f"""
+        INSERT INTO {rollup} ({columns}, count)
+        SELECT *, {delta} FROM ({_bucket_rows(row, ts_column, dims)}) WHERE {row}.{ts_column} IS NOT NULL
+        ON CONFLICT({columns}) DO UPDATE SET count = count + ({delta});
+    """
+
+
+def create_rollup_tables(conn):
+    """Create the rollup tables and the triggers that keep them current."""
+    cursor = conn.cursor()
+    for rollup, (table, ts_column, dims) in ROLLUPS.items():
+        dim_defs = ", ".join(f"{d} TEXT NOT NULL" for d in dims)
+        key = ", ".join(("bucket_size", "bucket") + dims)
+        cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {rollup} (
+                bucket_size TEXT NOT NULL,
+                bucket TEXT NOT NULL,
+                {dim_defs},
+                count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY ({key})
+            ) WITHOUT ROWID
+        """)
+
+        watched = ", ".join((ts_column,) + dims)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {rollup}_insert AFTER INSERT ON {table}
+            BEGIN {_apply_sql(rollup, ts_column, dims, "NEW", 1)} END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {rollup}_delete AFTER DELETE ON {table}
+            BEGIN {_apply_sql(rollup, ts_column, dims, "OLD", -1)} END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {rollup}_update AFTER UPDATE OF {watched} ON {table}
+            BEGIN
+                {_apply_sql(rollup, ts_column, dims, "OLD", -1)}
+                {_apply_sql(rollup, ts_column, dims, "NEW", 1)}
+            END
+        """)
+    conn.commit()
+
+
+def rollup_triggers(table):
+    """Names of the triggers that keep table's rollups current."""
+    return [f"{rollup}_{event}" for rollup, (base, _, _) in ROLLUPS.items() if base == table
+            for event in ("insert", "delete", "update")]
+
+
+def backfill_rollups(conn, tables=None, commit=True):
+    """Rebuild every rollup, or those of the given base tables, from its base table. Returns rows written per rollup."""
+    written = {}
+    cursor = conn.cursor()
+    for rollup, (table, ts_column, dims) in ROLLUPS.items():
+        if tables is not None and table not in tables:
+            continue
+        cursor.execute(f"DELETE FROM {rollup}")
+        dim_values = ", ".join(f"COALESCE({d}, '')" for d in dims)
+        columns = ", ".join(("bucket_size", "bucket") + dims)
+        total = 0
+        for size, expr in BUCKETS.items():
+            bucket = expr.format(ts=ts_column)
+            cursor.execute(f"""
+                INSERT INTO {rollup} ({columns}, count)
+                SELECT '{size}', {bucket}, {dim_values}, COUNT(*)
+                FROM {table} WHERE {ts_column} IS NOT NULL
+                GROUP BY 2, {", ".join(str(i + 3) for i in range(len(dims)))}
+            """)
+            total += cursor.rowcount
+        written[rollup] = total
+    if commit:
+        conn.commit()
+    return written
+
+
+def _trend(conn, rollup, bucket, by, since, until, allowed):
+    if bucket not in BUCKETS:
+        raise ValueError(f"bucket must be one of {', '.join(BUCKETS)}")
+    if by is not None and by not in allowed:
+        raise ValueError(f"Cannot group {rollup} by '{by}'")
+
+    #deleted rows can leave buckets at zero rather than removing them
+    clauses = ["bucket_size = ?", "count != 0"]
+    params = [bucket]
+    if since is not None:
+        clauses.append("bucket >= ?")
+        params.append(str(since))
+    if until is not None:
+        clauses.append("bucket < ?")
+        params.append(str(until))
+
+    group = f"bucket, {by}" if by else "bucket"
+    return pd.read_sql_query(
+        f"""SELECT {group}, SUM(count) AS count FROM {rollup}
+            WHERE {' AND '.join(clauses)}
+            GROUP BY {group} ORDER BY bucket""",
+        conn,
+        params=params,
+        parse_dates=["bucket"],
+    )
+
+
+@cached_query("cyber_incidents")
+def get_incident_trend(conn, bucket="day", by=None, since=None, until=None):
+    """Incident counts per time bucket, optionally split by category, severity or status."""
+    return _trend(conn, "incident_rollups", bucket, by, since, until, ROLLUPS["incident_rollups"][2])
+
+
+@cached_query("it_tickets")
+def get_ticket_trend(conn, bucket="day", by=None, since=None, until=None):
+    """Ticket counts per time bucket, optionally split by priority or status."""
+    return _trend(conn, "ticket_rollups", bucket, by, since, until, ROLLUPS["ticket_rollups"][2])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the incident and ticket rollup tables.")
+    parser.add_argument("--backfill", action="store_true", help="rebuild all rollups from the base tables")
+    args = parser.parse_args()
+
+    if args.backfill:
+        from app.data.db import connect_database
+        conn = connect_database()
+        started = time.perf_counter()
+        written = backfill_rollups(conn)
+        conn.close()
+        for rollup, rows in written.items():
+            print(f"✅ Rebuilt {rollup}: {rows} rows")
+        print(f"Backfill finished in {time.perf_counter() - started:.2f}s")
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
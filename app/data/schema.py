@@ -65,20 +65,48 @@ def create_it_tickets_table(conn):
     conn.commit()
     print("✅ IT Tickets table created successfully!")
 
-def create_all_tables(conn):
-    """Create all tables."""
-    # Drop tables if they exist to ensure clean slate
+def create_table_versions(conn):
+    """Create the table_versions change counters and the triggers that bump them."""
     cursor = conn.cursor()
-    cursor.execute("DROP TABLE IF EXISTS users")
-    cursor.execute("DROP TABLE IF EXISTS cyber_incidents")
-    cursor.execute("DROP TABLE IF EXISTS datasets_metadata")
-    cursor.execute("DROP TABLE IF EXISTS it_tickets")
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS table_versions (
+            table_name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    for table in ("users", "cyber_incidents", "datasets_metadata", "it_tickets"):
+        cursor.execute(
+            "INSERT OR IGNORE INTO table_versions (table_name, version) VALUES (?, 0)", (table,)
+        )
+        for event in ("INSERT", "UPDATE", "DELETE"):
+            cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS {table}_version_{event.lower()}
+                AFTER {event} ON {table}
+                BEGIN
+                    UPDATE table_versions SET version = version + 1 WHERE table_name = '{table}';
+                END
+            """)
     conn.commit()
-    
-    create_users_table(conn)
-    create_cyber_incidents_table(conn)
-    create_datasets_metadata_table(conn)
-    create_it_tickets_table(conn)
+    print("✅ Table version counters created successfully!")
+
+def create_all_tables(conn, drop_existing=False):
+    """Create all tables.
+
+    Existing tables and their data are kept unless drop_existing is True.
+    """
+    if drop_existing:
+        cursor = conn.cursor()
+        cursor.execute("DROP TABLE IF EXISTS users")
+        cursor.execute("DROP TABLE IF EXISTS cyber_incidents")
+        cursor.execute("DROP TABLE IF EXISTS datasets_metadata")
+        cursor.execute("DROP TABLE IF EXISTS it_tickets")
+        cursor.execute("DROP TABLE IF EXISTS table_versions")
+        cursor.execute("PRAGMA user_version = 0")
+        conn.commit()
+
+    #imported here because migrations builds on the functions in this module
+    from app.data.migrations import migrate
+    migrate(conn)
 
 
 #titles and names are unique as they are used are used in many crud operations
\ No newline at end of file
@@ -0,0 +1,186 @@
+"""Full-text search over incident and ticket descriptions.
+
+FTS5 indexes mirror the description columns and are kept in sync by
+triggers, or rebuilt once after a bulk load, see bulk.bulk_load. To rebuild them from the base tables, run from the project root:
+    python -m app.data.search --rebuild
+"""
+import argparse
+import re
+import time
+
+import pandas as pd
+
+from app.data.cache import cached_query
+from app.data.pagination import build_where
+
+# index -> (base table, primary key, timestamp column)
+SEARCH_INDEXES = {
+    "incidents_fts": ("cyber_incidents", "incident_id", "timestamp"),
+    "tickets_fts": ("it_tickets", "ticket_id", "created_at"),
+}
+
+INCIDENT_SEARCH_FILTERS = ("severity", "category", "status")
+TICKET_SEARCH_FILTERS = ("priority", "status", "assigned_to")
+
+SEARCH_LIMIT = 50
+
+# Above this many matches bm25 ranking gets slow (it scores every match) and
+# tells the matches apart poorly, so results come back newest first instead
+RANK_MAX_MATCHES = 50_000
+
+# Tokens of context either side of the match in a snippet
+SNIPPET_TOKENS = 12
+
+
+def create_search_tables(conn):
+    """Create the FTS5 indexes and the triggers that keep them in sync."""
+    cursor = conn.cursor()
+    for index, (table, key, _) in SEARCH_INDEXES.items():
+        #external content: the index stores tokens only and reads text back from the base table
+        cursor.execute(f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS {index} USING fts5(
+                description, content='{table}', content_rowid='{key}',
+                tokenize='unicode61 remove_diacritics 2'
+            )
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {index}_insert AFTER INSERT ON {table}
+            BEGIN
+                INSERT INTO {index} (rowid, description) VALUES (NEW.{key}, NEW.description);
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {index}_delete AFTER DELETE ON {table}
+            BEGIN
+                INSERT INTO {index} ({index}, rowid, description) VALUES ('delete', OLD.{key}, OLD.description);
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {index}_update AFTER UPDATE OF description ON {table}
+            BEGIN
+                INSERT INTO {index} ({index}, rowid, description) VALUES ('delete', OLD.{key}, OLD.description);
+                INSERT INTO {index} (rowid, description) VALUES (NEW.{key}, NEW.description);
+            END
+        """)
+    conn.commit()
+
+
+def search_triggers(table):
+    """Names of the triggers that keep table's search index in sync."""
+    return [f"{index}_{event}" for index, (base, _, _) in SEARCH_INDEXES.items() if base == table
+            for event in ("insert", "delete", "update")]
+
+
+def rebuild_search_indexes(conn, tables=None, commit=True):
+    """Rebuild every search index, or those of the given base tables, and merge its segments."""
+    cursor = conn.cursor()
+    for index, (table, _, _) in SEARCH_INDEXES.items():
+        if tables is not None and table not in tables:
+            continue
+        cursor.execute(f"INSERT INTO {index} ({index}) VALUES ('rebuild')")
+        cursor.execute(f"INSERT INTO {index} ({index}) VALUES ('optimize')")
+    if commit:
+        conn.commit()
+
+
+def build_match(query):
+    """Turn what the user typed into an FTS5 MATCH expression, or None if it is empty.
+
+    Every word must appear. Words are quoted so IPs, hashes and domains match
+    as phrases instead of being read as FTS syntax, and a trailing * keeps its
+    prefix meaning: 'phish*' finds phishing and phished.
+    """
+    terms = []
+    for word in (query or "").split():
+        prefix = word.endswith("*")
+        word = word.rstrip("*").strip('"').replace('"', '""')
+        #a word made only of punctuation has no tokens and would match nothing
+        if not re.search(r"\w", word):
+            continue
+        terms.append(f'"{word}"*' if prefix else f'"{word}"')
+    return " ".join(terms) or None
+
+
+def _search(conn, index, query, allowed, filters, since, until, limit):
+    table, key, ts_column = SEARCH_INDEXES[index]
+    match = build_match(query)
+    if match is None:
+        return pd.DataFrame()
+
+    clauses, params = build_where(filters, allowed)
+    clauses = [f"{index} MATCH ?"] + clauses
+    params = [match] + params
+    if since is not None:
+        clauses.append(f"t.{ts_column} >= ?")
+        params.append(str(since))
+    if until is not None:
+        clauses.append(f"t.{ts_column} < ?")
+        params.append(str(until))
+
+    #counting matches only reads the index's doclists, a few ms even for common words
+    matches = conn.execute(f"SELECT COUNT(*) FROM {index} WHERE {index} MATCH ?", (match,)).fetchone()[0]
+    by_rank = matches <= RANK_MAX_MATCHES
+    order = f"{index}.rank" if by_rank else f"{index}.rowid DESC"
+
+    #pick the top rows first so snippets are only built for the ones returned,
+    #rank is fts5's bm25 score, lower for better matches
+    return pd.read_sql_query(
+        f"""WITH top AS (
+                SELECT {index}.rowid AS id
+                FROM {index} JOIN {table} t ON t.{key} = {index}.rowid
+                WHERE {' AND '.join(clauses)}
+                ORDER BY {order} LIMIT ?
+            )
+            SELECT t.*,
+                   snippet({index}, 0, '**', '**', '…', {SNIPPET_TOKENS}) AS snippet,
+                   {index}.rank AS rank
+            FROM top
+            JOIN {index} ON {index}.rowid = top.id
+            JOIN {table} t ON t.{key} = top.id
+            WHERE {index} MATCH ?
+            ORDER BY {"rank" if by_rank else f"t.{key} DESC"}""",
+        conn,
+        params=params + [int(limit), match],
+    )
+
+
+@cached_query("cyber_incidents")
+def search_incidents(conn, query, limit=SEARCH_LIMIT, severity=None, category=None, status=None,
+                     since=None, until=None):
+    """Search incident descriptions, best matches first, with a highlighted snippet.
+
+    Queries matching more than RANK_MAX_MATCHES rows come back newest first.
+    """
+    filters = {"severity": severity, "category": category, "status": status}
+    return _search(conn, "incidents_fts", query, INCIDENT_SEARCH_FILTERS, filters, since, until, limit)
+
+
+@cached_query("it_tickets")
+def search_tickets(conn, query, limit=SEARCH_LIMIT, priority=None, status=None, assigned_to=None,
+                   since=None, until=None):
+    """Search ticket descriptions, best matches first, with a highlighted snippet.
+
+    Queries matching more than RANK_MAX_MATCHES rows come back newest first.
+    """
+    filters = {"priority": priority, "status": status, "assigned_to": assigned_to}
+    return _search(conn, "tickets_fts", query, TICKET_SEARCH_FILTERS, filters, since, until, limit)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the incident and ticket search indexes.")
+    parser.add_argument("--rebuild", action="store_true", help="rebuild the indexes from the base tables")
+    args = parser.parse_args()
+
+    if args.rebuild:
+        from app.data.db import connect_database
+        conn = connect_database()
+        started = time.perf_counter()
+        rebuild_search_indexes(conn)
+        conn.close()
+        print(f"✅ Rebuilt {', '.join(SEARCH_INDEXES)} in {time.perf_counter() - started:.2f}s")
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
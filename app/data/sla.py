@@ -0,0 +1,259 @@
+"""Resolution time percentiles of resolved tickets from mergeable quantile sketches.
+
+Each group (all tickets, each priority, assignee and creation month) keeps a
+log-bucketed histogram in the style of DDSketch: bucket i counts resolution
+times in (gamma^(i-1), gamma^i], so any quantile read back from it is within
+RELATIVE_ACCURACY of the exact value. Triggers on it_tickets add and remove
+tickets as they are inserted, resolved, reopened or deleted, and merging
+groups is just adding their bucket counts. A bulk load skips the triggers
+and rebuilds the sketches once, see bulk.bulk_load. To rebuild the sketches
+from the tickets table, run from the project root:
+    python -m app.data.sla --backfill
+"""
+import argparse
+import math
+import sqlite3
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.data.cache import cached_query
+from app.data.frames import PRIORITY_ORDER
+
+# Quantiles read back are within this relative error of the exact value
+RELATIVE_ACCURACY = 0.01
+GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+LN_GAMMA = math.log(GAMMA)
+
+# Bucket for zero and negative resolution times
+ZERO_BUCKET = -(2 ** 31)
+
+# Only finished tickets have a final resolution time
+RESOLVED_STATUSES = ("Resolved", "Closed")
+
+# dimension -> SQL for the group value, given a row name (NEW, OLD or the table)
+SKETCH_DIMENSIONS = {
+    "all": "''",
+    "priority": "COALESCE({row}.priority, '')",
+    "assigned_to": "COALESCE({row}.assigned_to, '')",
+    "month": "COALESCE(substr({row}.created_at, 1, 7), '')",
+}
+
+SLA_QUANTILES = (0.5, 0.9, 0.99)
+
+_RESOLVED = ", ".join(f"'{s}'" for s in RESOLVED_STATUSES)
+
+
+def _bucket_sql(value):
+    return (f"CASE WHEN {value} <= 0 THEN {ZERO_BUCKET} "
+            f"ELSE CAST(ceil(ln({value}) / {LN_GAMMA!r}) AS INTEGER) END")
+
+
+def _apply_sql(row, delta):
+    groups = " UNION ALL ".join(
+        f"SELECT '{dimension}' AS dimension, {expr.format(row=row)} AS value"
+        for dimension, expr in SKETCH_DIMENSIONS.items()
+    )
+    return f"""
+        INSERT INTO ticket_sla_sketches (dimension, value, bucket, count)
+        SELECT dimension, value, {_bucket_sql(f"{row}.resolution_time_hours")}, {delta} FROM ({groups})
+        WHERE {row}.status IN ({_RESOLVED}) AND {row}.resolution_time_hours IS NOT NULL
+        ON CONFLICT(dimension, value, bucket) DO UPDATE SET count = count + ({delta});
+    """
+
+
+def has_math_functions(conn):
+    """Whether this SQLite build has ln() and ceil(), which the triggers need."""
+    try:
+        conn.execute("SELECT ln(1), ceil(1)")
+    except sqlite3.OperationalError:
+        return False
+    return True
+
+
+def create_sla_sketches(conn):
+    """Create the sketch table and the triggers that keep it current.
+
+    Without SQLite's math functions the triggers would break every ticket
+    write, so nothing is created and percentiles are computed from the rows.
+    """
+    if not has_math_functions(conn):
+        print("⚠️ SQLite has no math functions, SLA percentiles will be computed from the tickets table.")
+        return False
+
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS ticket_sla_sketches (
+            dimension TEXT NOT NULL,
+            value TEXT NOT NULL,
+            bucket INTEGER NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (dimension, value, bucket)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS ticket_sla_sketches_insert AFTER INSERT ON it_tickets
+        BEGIN {_apply_sql("NEW", 1)} END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS ticket_sla_sketches_delete AFTER DELETE ON it_tickets
+        BEGIN {_apply_sql("OLD", -1)} END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS ticket_sla_sketches_update
+        AFTER UPDATE OF status, resolution_time_hours, priority, assigned_to, created_at ON it_tickets
+        BEGIN
+            {_apply_sql("OLD", -1)}
+            {_apply_sql("NEW", 1)}
+        END
+    """)
+    conn.commit()
+    return True
+
+
+def has_sketch_table(conn):
+    """Whether the sketch table exists, it doesn't on SQLite builds without math functions."""
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'ticket_sla_sketches'"
+    ).fetchone() is not None
+
+
+def sketch_triggers(table):
+    """Names of the triggers that keep the sketches current, if table feeds them."""
+    if table != "it_tickets":
+        return []
+    return [f"ticket_sla_sketches_{event}" for event in ("insert", "delete", "update")]
+
+
+def backfill_sla_sketches(conn, commit=True):
+    """Rebuild every sketch from it_tickets. Returns the number of buckets written."""
+    if not has_sketch_table(conn):
+        return 0
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM ticket_sla_sketches")
+    total = 0
+    for dimension, expr in SKETCH_DIMENSIONS.items():
+        cursor.execute(f"""
+            INSERT INTO ticket_sla_sketches (dimension, value, bucket, count)
+            SELECT '{dimension}', {expr.format(row="it_tickets")}, {_bucket_sql("resolution_time_hours")}, COUNT(*)
+            FROM it_tickets
+            WHERE status IN ({_RESOLVED}) AND resolution_time_hours IS NOT NULL
+            GROUP BY 2, 3
+        """)
+        total += cursor.rowcount
+    if commit:
+        conn.commit()
+    return total
+
+
+def _sketch_rows(conn, dimension, values):
+    """(value, bucket, count) rows of the sketches for one dimension."""
+    params = [dimension]
+    where = ""
+    if values is not None:
+        where = f" AND value IN ({', '.join('?' * len(values))})"
+        params += [str(v) for v in values]
+
+    if has_sketch_table(conn):
+        #deleted or reopened tickets can leave buckets at zero rather than removing them
+        return pd.read_sql_query(
+            f"""SELECT value, bucket, count FROM ticket_sla_sketches
+                WHERE dimension = ? AND count > 0{where}""",
+            conn, params=params,
+        )
+
+    #no sketch table, bucket the resolved tickets here the same way the triggers would
+    rows = pd.read_sql_query(
+        f"""SELECT {SKETCH_DIMENSIONS[dimension].format(row="it_tickets")} AS value,
+                   resolution_time_hours AS hours
+            FROM it_tickets
+            WHERE status IN ({_RESOLVED}) AND resolution_time_hours IS NOT NULL""",
+        conn,
+    )
+    if values is not None:
+        rows = rows[rows["value"].isin(params[1:])]
+    hours = rows["hours"].to_numpy(dtype=float)
+    with np.errstate(divide="ignore"):
+        buckets = np.where(hours <= 0, ZERO_BUCKET, np.ceil(np.log(hours) / LN_GAMMA))
+    rows = rows.assign(bucket=buckets.astype(np.int64))
+    return rows.groupby(["value", "bucket"], as_index=False).size().rename(columns={"size": "count"})
+
+
+def sketch_quantiles(buckets, counts, quantiles=SLA_QUANTILES):
+    """Read quantiles back from one sketch (or several merged) given as bucket and count arrays."""
+    buckets = np.asarray(buckets, dtype=np.int64)
+    counts = np.asarray(counts, dtype=np.int64)
+    order = np.argsort(buckets, kind="stable")
+    buckets = buckets[order]
+    cumulative = np.cumsum(counts[order])
+    if not len(cumulative) or cumulative[-1] <= 0:
+        return [np.nan] * len(quantiles)
+
+    #the bucket holding the element at rank q * (n - 1), same as numpy's "lower" percentile
+    ranks = np.asarray(quantiles, dtype=float) * (cumulative[-1] - 1)
+    picked = buckets[np.searchsorted(cumulative, ranks, side="right")]
+    #the middle of the bucket in relative terms, which bounds the error either side
+    values = 2 * GAMMA ** picked.astype(float) / (GAMMA + 1)
+    return np.where(picked == ZERO_BUCKET, 0.0, values).tolist()
+
+
+def _quantile_column(q):
+    return f"p{q * 100:g}"
+
+
+@cached_query("it_tickets")
+def get_resolution_percentiles(conn, by=None, values=None, merge=False, quantiles=SLA_QUANTILES):
+    """Resolution hours percentiles of resolved tickets, overall or per priority, assignee or month.
+
+    by is None, "priority", "assigned_to" or "month" (YYYY-MM of created_at).
+    values keeps only those groups, and merge=True combines them into a
+    single row, e.g. the months of a quarter. Returns a DataFrame with the
+    group column (unless merged or by is None), count and one pNN column per
+    quantile.
+    """
+    dimension = by or "all"
+    if dimension not in SKETCH_DIMENSIONS:
+        raise ValueError(f"by must be None or one of {', '.join(d for d in SKETCH_DIMENSIONS if d != 'all')}")
+
+    rows = _sketch_rows(conn, dimension, values)
+    names = [_quantile_column(q) for q in quantiles]
+    if merge or by is None:
+        merged = rows.groupby("bucket", as_index=False)["count"].sum()
+        record = dict(zip(names, sketch_quantiles(merged["bucket"], merged["count"], quantiles)))
+        return pd.DataFrame([{"count": int(merged["count"].sum()), **record}], columns=["count"] + names)
+
+    records = []
+    for value, group in rows.groupby("value", sort=False):
+        record = dict(zip(names, sketch_quantiles(group["bucket"], group["count"], quantiles)))
+        records.append({by: value, "count": int(group["count"].sum()), **record})
+    result = pd.DataFrame(records, columns=[by, "count"] + names)
+
+    if by == "priority":
+        rank = {p: i for i, p in enumerate(PRIORITY_ORDER)}
+        result = result.sort_values(by, key=lambda s: s.map(rank).fillna(len(rank)))
+    elif by == "month":
+        result = result.sort_values(by)
+    else:
+        result = result.sort_values(["count", by], ascending=[False, True])
+    return result.reset_index(drop=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the ticket resolution time sketches.")
+    parser.add_argument("--backfill", action="store_true", help="rebuild the sketches from it_tickets")
+    args = parser.parse_args()
+
+    if args.backfill:
+        from app.data.db import connect_database
+        conn = connect_database()
+        started = time.perf_counter()
+        written = backfill_sla_sketches(conn)
+        conn.close()
+        print(f"✅ Rebuilt ticket_sla_sketches: {written} buckets in {time.perf_counter() - started:.2f}s")
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
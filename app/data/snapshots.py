@@ -0,0 +1,408 @@
+"""Memory-mapped columnar snapshots of the incident and ticket tables.
+
+Each column is stored as a .npy file, with text columns dictionary encoded
+(integer codes plus the list of distinct values), so analytics can open a
+table with np.load(mmap_mode="r") and build a DataFrame over the mapped
+arrays without reading it through SQLite or copying it. Every process and
+session shares the same pages through the OS page cache.
+
+Snapshots live next to the database in <db file>.snapshots/<table>/, one
+directory of column files per build, with CURRENT naming the live meta file.
+Column files are preallocated with spare rows, so a refresh writes only the
+rows added since and publishes a new meta file with the larger row count;
+readers of the old one never look past their own rows. Updates and deletes,
+or running out of spare rows, force a rebuild into a new directory.
+To refresh every snapshot, run from the project root:
+    python -m app.data.snapshots --refresh
+"""
+import argparse
+import json
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from app.data.frames import FRAME_TYPES, compact_frame
+from app.services.instrumentation import timed
+
+# table -> (key column, {column: kind}), kind is int, float, datetime or text.
+# Free-text descriptions are left out: they don't dictionary encode and the
+# analytics never read them.
+SNAPSHOT_COLUMNS = {
+    "cyber_incidents": ("incident_id", {
+        "incident_id": "int",
+        "timestamp": "datetime",
+        "severity": "text",
+        "category": "text",
+        "status": "text",
+    }),
+    "it_tickets": ("ticket_id", {
+        "ticket_id": "int",
+        "priority": "text",
+        "status": "text",
+        "assigned_to": "text",
+        "created_at": "datetime",
+        "resolution_time_hours": "float",
+    }),
+}
+
+# Rows read from SQLite at a time while writing a snapshot
+SNAPSHOT_CHUNK_ROWS = 200_000
+
+# Column files are sized for this many times the rows they start with
+SNAPSHOT_GROWTH = 2
+
+# Smallest column file, in rows
+SNAPSHOT_MIN_CAPACITY = 1024
+
+# Old generations kept around for readers that still have them mapped
+KEEP_GENERATIONS = 2
+
+_DTYPES = {"int": np.dtype(np.int64), "float": np.dtype(np.float64), "datetime": np.dtype("datetime64[us]")}
+
+_lock = threading.Lock()
+_open = {}
+
+
+def create_rewrite_counters(conn):
+    """Create the table_rewrites counters and the triggers that bump them.
+
+    table_versions counts every change, this only counts updates and deletes,
+    so a snapshot can tell whether rows were only appended since it was built.
+    """
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS table_rewrites (
+            table_name TEXT PRIMARY KEY,
+            rewrites INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    for table in SNAPSHOT_COLUMNS:
+        cursor.execute("INSERT OR IGNORE INTO table_rewrites (table_name, rewrites) VALUES (?, 0)", (table,))
+        for event in ("UPDATE", "DELETE"):
+            cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS {table}_rewrite_{event.lower()}
+                AFTER {event} ON {table}
+                BEGIN
+                    UPDATE table_rewrites SET rewrites = rewrites + 1 WHERE table_name = '{table}';
+                END
+            """)
+    conn.commit()
+
+
+def snapshot_dir(conn):
+    """Return the snapshot directory for conn's database, or None for in-memory databases."""
+    row = conn.execute("PRAGMA database_list").fetchone()
+    return Path(f"{row[2]}.snapshots") if row[2] else None
+
+
+def _table_state(conn, table):
+    version = conn.execute("SELECT version FROM table_versions WHERE table_name = ?", (table,)).fetchone()
+    rewrites = conn.execute("SELECT rewrites FROM table_rewrites WHERE table_name = ?", (table,)).fetchone()
+    return [version[0] if version else 0, rewrites[0] if rewrites else 0]
+
+
+def _codes_dtype(categories):
+    #the same widths pandas picks for categorical codes, so from_codes doesn't copy them
+    if categories < np.iinfo(np.int8).max:
+        return np.dtype(np.int8)
+    if categories < np.iinfo(np.int16).max:
+        return np.dtype(np.int16)
+    return np.dtype(np.int32)
+
+
+def _load_array(path):
+    try:
+        return np.load(path, mmap_mode="r")
+    except ValueError:
+        #zero rows, there is nothing to map
+        return np.load(path)
+
+
+class Snapshot:
+    """One generation of a table snapshot with every column memory-mapped."""
+
+    def __init__(self, path, meta_name="meta.json"):
+        self.path = Path(path)
+        self.meta_name = meta_name
+        self.meta = json.loads((self.path / meta_name).read_text(encoding="utf-8"))
+        #the files may hold spare rows past the end of this generation
+        rows = self.meta["rows"]
+        self.arrays = {name: _load_array(self.path / f"{name}.npy")[:rows] for name in self.meta["columns"]}
+
+    @property
+    def rows(self):
+        return self.meta["rows"]
+
+    def frame(self, columns=None):
+        """A DataFrame over the mapped arrays. Nothing is copied, so it is read-only."""
+        ordered = FRAME_TYPES[self.meta["table"]][0]
+        data = {}
+        for name in columns or self.meta["columns"]:
+            array = self.arrays[name]
+            if self.meta["columns"][name] == "text":
+                dtype = pd.CategoricalDtype(self.meta["dictionaries"][name], ordered=name in ordered)
+                data[name] = pd.Categorical.from_codes(array, dtype=dtype, validate=False)
+            else:
+                data[name] = array
+        return pd.DataFrame(data, copy=False)
+
+
+def open_snapshot(base, table):
+    """Return the current Snapshot of table under base, or None if there isn't one."""
+    current = Path(base) / table / "CURRENT"
+    try:
+        generation = current.read_text(encoding="utf-8").strip()
+    except FileNotFoundError:
+        return None
+    key = (str(base), table)
+    snapshot = _open.get(key)
+    if snapshot is None or snapshot.generation != generation:
+        directory, _, meta_name = generation.partition("/")
+        snapshot = Snapshot(current.parent / directory, meta_name or "meta.json")
+        snapshot.generation = generation
+        _open[key] = snapshot
+    return snapshot
+
+
+def _new_rows(conn, table, after):
+    key, kinds = SNAPSHOT_COLUMNS[table]
+    return pd.read_sql_query(
+        f"SELECT {', '.join(kinds)} FROM {table} WHERE {key} > ? ORDER BY {key}",
+        conn, params=(after,), chunksize=SNAPSHOT_CHUNK_ROWS,
+    )
+
+
+def _fill(conn, table, arrays, dictionaries, position, after, fixed_codes=False):
+    """Write the rows with key > after into arrays from position on.
+
+    Returns (rows written up to, max key), or None if fixed_codes is set and a
+    text column gained more values than its stored code width can hold.
+    """
+    key, kinds = SNAPSHOT_COLUMNS[table]
+    max_key = after
+    for chunk in _new_rows(conn, table, after):
+        end = position + len(chunk)
+        for name, kind in kinds.items():
+            values = chunk[name]
+            if kind == "text":
+                index = pd.Index(dictionaries[name])
+                unseen = pd.unique(values[~values.isin(index) & values.notna()])
+                dictionaries[name].extend(unseen.tolist())
+                if fixed_codes and _codes_dtype(len(dictionaries[name])) != arrays[name].dtype:
+                    return None
+                arrays[name][position:end] = pd.Index(dictionaries[name]).get_indexer(values)
+            elif kind == "datetime":
+                arrays[name][position:end] = pd.to_datetime(values, format="ISO8601", errors="coerce").to_numpy(_DTYPES[kind])
+            elif kind == "float":
+                arrays[name][position:end] = pd.to_numeric(values, errors="coerce").to_numpy(np.float64, na_value=np.nan)
+            else:
+                arrays[name][position:end] = values.to_numpy(np.int64)
+        max_key = int(chunk[key].iloc[-1])
+        position = end
+    return position, max_key
+
+
+def _publish(base, table, directory, rows, max_key, capacity, state, dictionaries):
+    """Write the meta file of a new generation in directory and make it current."""
+    key, kinds = SNAPSHOT_COLUMNS[table]
+    meta = {
+        "table": table,
+        "key": key,
+        "rows": rows,
+        "capacity": capacity,
+        "max_key": max_key,
+        "state": state,
+        "columns": kinds,
+        "dictionaries": dictionaries,
+        "built_at": time.time(),
+    }
+    meta_name = f"meta-{time.time_ns():020d}-{os.getpid()}.json"
+    (directory / meta_name).write_text(json.dumps(meta), encoding="utf-8")
+
+    #swap CURRENT atomically so readers see either the old or the new generation
+    table_dir = Path(base) / table
+    pending = table_dir / f"CURRENT.{os.getpid()}"
+    pending.write_text(f"{directory.name}/{meta_name}", encoding="utf-8")
+    os.replace(pending, table_dir / "CURRENT")
+    _drop_old_generations(table_dir, directory.name, meta_name)
+    return open_snapshot(base, table)
+
+
+def _claim(snapshot):
+    #only one process may write the spare rows after a given generation, whoever creates the claim file first
+    try:
+        os.close(os.open(snapshot.path / f"claim-{snapshot.rows}", os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+    except FileExistsError:
+        return False
+    return True
+
+
+def _append_generation(conn, base, table, previous, new_rows, state):
+    """Write only the new rows into previous's spare rows and publish them, or return None if they don't fit."""
+    capacity = previous.meta.get("capacity", previous.rows)
+    if previous.rows + new_rows > capacity or not _claim(previous):
+        return None
+
+    kinds = SNAPSHOT_COLUMNS[table][1]
+    arrays = {name: np.load(previous.path / f"{name}.npy", mmap_mode="r+") for name in kinds}
+    dictionaries = {name: list(values) for name, values in previous.meta["dictionaries"].items()}
+    filled = _fill(conn, table, arrays, dictionaries, previous.rows, previous.meta["max_key"], fixed_codes=True)
+    for array in arrays.values():
+        array.flush()
+    if filled is None:
+        #rows past previous.rows aren't part of any generation, so what was written there is harmless
+        return None
+    position, max_key = filled
+    return _publish(base, table, previous.path, position, max_key, capacity, state, dictionaries)
+
+
+def _write_generation(conn, base, table, previous, new_rows, state):
+    """Write previous's rows plus the new rows into a new directory of column files and make it current."""
+    kinds = SNAPSHOT_COLUMNS[table][1]
+    ordered = FRAME_TYPES[table][0]
+    old_rows = previous.rows if previous else 0
+    capacity = max(SNAPSHOT_MIN_CAPACITY, (old_rows + new_rows) * SNAPSHOT_GROWTH)
+    after = previous.meta["max_key"] if previous else 0
+
+    directory = Path(base) / table / f"{time.time_ns():020d}-{os.getpid()}"
+    directory.mkdir(parents=True)
+
+    dictionaries = {}
+    arrays = {}
+    for name, kind in kinds.items():
+        if kind == "text":
+            #ordered columns start from their known order, other values follow as they appear
+            dictionaries[name] = list(previous.meta["dictionaries"][name] if previous else ordered.get(name, []))
+            #codes are written wide first and narrowed once the final dictionary size is known
+            dtype = np.dtype(np.int32)
+        else:
+            dtype = _DTYPES[kind]
+        arrays[name] = np.lib.format.open_memmap(directory / f"{name}.npy", mode="w+", dtype=dtype, shape=(capacity,))
+        if old_rows:
+            arrays[name][:old_rows] = previous.arrays[name]
+
+    position, max_key = old_rows, after
+    if new_rows:
+        position, max_key = _fill(conn, table, arrays, dictionaries, old_rows, after)
+
+    for name, kind in kinds.items():
+        array = arrays.pop(name)
+        array.flush()
+        if kind == "text":
+            narrow = _codes_dtype(len(dictionaries[name]))
+            if narrow != array.dtype:
+                narrowed = array.astype(narrow)
+                #unmap the wide file before overwriting it, Windows refuses to truncate a mapped file
+                del array
+                np.save(directory / f"{name}.npy", narrowed)
+    return _publish(base, table, directory, position, max_key, capacity, state, dictionaries)
+
+
+def _drop_old_generations(table_dir, current, meta_name):
+    #directories and meta files are named by creation time, mapped files stay readable after removal on POSIX
+    directories = sorted(p.name for p in table_dir.iterdir() if p.is_dir() and p.name <= current)
+    for name in directories[:-KEEP_GENERATIONS]:
+        try:
+            shutil.rmtree(table_dir / name)
+        except OSError as e:
+            #e.g. still mapped by a reader on Windows, the next refresh tries again
+            print(f"⚠️ Could not remove old snapshot {table_dir / name}: {e}")
+    metas = sorted(p.name for p in (table_dir / current).glob("meta-*.json") if p.name <= meta_name)
+    for name in metas[:-KEEP_GENERATIONS]:
+        try:
+            (table_dir / current / name).unlink(missing_ok=True)
+        except OSError as e:
+            print(f"⚠️ Could not remove old snapshot metadata {table_dir / current / name}: {e}")
+
+
+@timed
+def refresh_snapshot(conn, table, base=None):
+    """Bring the snapshot of table up to date with the database and return it.
+
+    Appends rows added since the last refresh, or rebuilds the whole snapshot
+    if any row was updated or deleted. Returns None for in-memory databases.
+    """
+    base = base or snapshot_dir(conn)
+    if base is None:
+        return None
+    key = SNAPSHOT_COLUMNS[table][0]
+
+    with _lock:
+        current = open_snapshot(base, table)
+        #one read transaction so the counters and the rows come from the same commit
+        began = not conn.in_transaction
+        if began:
+            conn.execute("BEGIN")
+        try:
+            state = _table_state(conn, table)
+            if current is not None and current.meta["state"] == state:
+                return current
+
+            if current is not None and current.meta["state"][1] == state[1]:
+                #only inserts since the last refresh, check none landed below max_key
+                new_rows = conn.execute(f"SELECT COUNT(*) FROM {table} WHERE {key} > ?",
+                                        (current.meta["max_key"],)).fetchone()[0]
+                total = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                if total == current.rows + new_rows:
+                    appended = _append_generation(conn, base, table, current, new_rows, state)
+                    if appended is not None:
+                        return appended
+                    return _write_generation(conn, base, table, current, new_rows, state)
+
+            rows = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            return _write_generation(conn, base, table, None, rows, state)
+        finally:
+            if began:
+                conn.rollback()
+
+
+def refresh_snapshots(conn, tables=None):
+    """Refresh the snapshot of every table and return {table: Snapshot}."""
+    return {table: refresh_snapshot(conn, table) for table in tables or SNAPSHOT_COLUMNS}
+
+
+def snapshot_frame(conn, table, columns=None):
+    """Return table's snapshot columns as a read-only DataFrame over the mapped arrays.
+
+    The snapshot is refreshed first if the table changed. In-memory databases
+    have no snapshot, so their rows are read through SQLite instead.
+    """
+    snapshot = refresh_snapshot(conn, table)
+    if snapshot is not None:
+        return snapshot.frame(columns)
+    names = columns or list(SNAPSHOT_COLUMNS[table][1])
+    df = pd.read_sql_query(f"SELECT {', '.join(names)} FROM {table}", conn)
+    return compact_frame(df, table)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or refresh the memory-mapped table snapshots.")
+    parser.add_argument("--refresh", action="store_true", help="bring every snapshot up to date")
+    parser.add_argument("--rebuild", action="store_true", help="delete the snapshots and build them from scratch")
+    parser.add_argument("--db", help="database file (default: the app database)")
+    args = parser.parse_args()
+
+    if not (args.refresh or args.rebuild):
+        parser.print_help()
+        return
+
+    from app.data.db import DB_PATH, connect_database
+    conn = connect_database(args.db or DB_PATH)
+    if args.rebuild:
+        shutil.rmtree(snapshot_dir(conn), ignore_errors=True)
+    for table in SNAPSHOT_COLUMNS:
+        started = time.perf_counter()
+        snapshot = refresh_snapshot(conn, table)
+        size = sum(array.nbytes for array in snapshot.arrays.values())
+        print(f"✅ {table}: {snapshot.rows} rows, {size / 2 ** 20:.1f} MB "
+              f"in {time.perf_counter() - started:.2f}s -> {snapshot.path}")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
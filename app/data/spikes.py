@@ -0,0 +1,95 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+
+from app.data.cache import cached_query
+
+# Days of history each series' baseline is computed from
+BASELINE_DAYS = 28
+
+# Days counted as "recent" and compared against the baseline
+RECENT_DAYS = 7
+
+# How many standard errors above the baseline counts as a spike
+Z_THRESHOLD = 3.0
+
+# Ignore series with fewer recent incidents than this, however unusual
+MIN_RECENT = 3
+
+SPIKE_DIMENSIONS = ("category", "severity")
+
+SPIKE_COLUMNS = ["dimension", "value", "recent", "expected", "ratio", "z_score"]
+
+
+def _daily_matrix(conn, dimension, start, days):
+    """Daily counts from the rollup as a (series, days) array plus the series labels."""
+    daily = pd.read_sql_query(
+        f"""SELECT bucket, {dimension} AS value, SUM(count) AS count
+            FROM incident_rollups
+            WHERE bucket_size = 'day' AND bucket >= ? AND bucket < ?
+            GROUP BY bucket, {dimension}""",
+        conn,
+        params=(start.isoformat(), (start + datetime.timedelta(days=days)).isoformat()),
+    )
+    labels, series = np.unique(daily["value"].to_numpy(dtype=str), return_inverse=True)
+    day = (pd.to_datetime(daily["bucket"]) - pd.Timestamp(start)).dt.days.to_numpy()
+    matrix = np.zeros((len(labels), days))
+    #missing (series, day) pairs had no incidents and stay zero
+    np.add.at(matrix, (series, day), daily["count"].to_numpy())
+    return labels, matrix
+
+
+def _score(matrix, baseline_days, recent_days):
+    """Vectorised z-score of each row's recent mean against its baseline."""
+    baseline = matrix[:, :baseline_days]
+    recent = matrix[:, baseline_days:]
+    mean = baseline.mean(axis=1)
+    std = baseline.std(axis=1, ddof=1) if baseline_days > 1 else np.zeros(len(matrix))
+    #sparse series often have a flat baseline, fall back to Poisson noise so z stays finite
+    std = np.maximum(std, np.sqrt(np.maximum(mean, 1.0 / baseline_days)))
+    stderr = std / np.sqrt(recent_days)
+    return recent.sum(axis=1), mean * recent_days, (recent.mean(axis=1) - mean) / stderr
+
+
+@cached_query("cyber_incidents")
+def _detect_spikes(conn, as_of, dimensions, baseline_days, recent_days, z_threshold, min_recent):
+    end = datetime.date.fromisoformat(as_of) + datetime.timedelta(days=1)
+    start = end - datetime.timedelta(days=baseline_days + recent_days)
+
+    frames = []
+    for dimension in dimensions:
+        labels, matrix = _daily_matrix(conn, dimension, start, baseline_days + recent_days)
+        if not len(labels):
+            continue
+        recent, expected, z_score = _score(matrix, baseline_days, recent_days)
+        frames.append(pd.DataFrame({
+            "dimension": dimension,
+            "value": labels,
+            "recent": recent.astype(int),
+            "expected": expected,
+            "ratio": recent / np.maximum(expected, 1e-9),
+            "z_score": z_score,
+        }))
+
+    if not frames:
+        return pd.DataFrame(columns=SPIKE_COLUMNS)
+    scores = pd.concat(frames, ignore_index=True)
+    spikes = scores[(scores["z_score"] >= z_threshold) & (scores["recent"] >= min_recent)]
+    return spikes.sort_values("z_score", ascending=False).reset_index(drop=True)
+
+
+def detect_spikes(conn, dimensions=SPIKE_DIMENSIONS, baseline_days=BASELINE_DAYS, recent_days=RECENT_DAYS,
+                  z_threshold=Z_THRESHOLD, min_recent=MIN_RECENT, as_of=None):
+    """Rank every category and severity whose recent incident rate is unusually high.
+
+    Reads the daily rollup, so the cost depends on the number of series and
+    days rather than the number of incidents. as_of is the last day of the
+    recent window, today by default.
+    """
+    for dimension in dimensions:
+        if dimension not in ("category", "severity", "status"):
+            raise ValueError(f"Cannot detect spikes by '{dimension}'")
+    #pass the day explicitly so cached results roll over at midnight
+    as_of = pd.Timestamp(as_of or datetime.date.today()).date().isoformat()
+    return _detect_spikes(conn, as_of, tuple(dimensions), baseline_days, recent_days, z_threshold, min_recent)
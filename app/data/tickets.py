@@ -1,8 +1,16 @@
-import pandas as pd
 from pathlib import Path
-from app.data.db import connect_database
+from app.data.db import connect_database, retry_on_busy
+from app.data.cache import cached_query, bump_table_version
+from app.services.instrumentation import timed
+from app.data.ingest import ingest_csv, ingest_csv_incremental, format_ingest_stats, CHUNK_SIZE, STORED_DATETIME_FORMAT
+from app.data.changes import delta_frame
+from app.data.pagination import fetch_page, count_rows
 
-def insert_ticket(conn, priority, description, status, assigned_to, created_at, resolution_time_hours):
+TICKET_FILTERS = ("priority", "status", "assigned_to")
+
+@timed
+@retry_on_busy
+def insert_ticket(conn, priority, description, status, assigned_to, created_at, resolution_time_hours, commit=True):
     """Insert a new ticket into it_tickets and return its row ticket_id."""
 
     cursor = conn.cursor()
@@ -11,12 +19,16 @@ def insert_ticket(conn, priority, description, status, assigned_to, created_at,
         (priority, description, status, assigned_to, created_at, resolution_time_hours)
         VALUES (?, ?, ?, ?, ?, ?)
     """, (priority, description, status, assigned_to, created_at, resolution_time_hours))
-    conn.commit()
+    if commit:
+        conn.commit()
+        bump_table_version("it_tickets")
     new_id = cursor.lastrowid
 
     return new_id
 
-def update_ticket_status(conn, ticket_id, status):
+@timed
+@retry_on_busy
+def update_ticket_status(conn, ticket_id, status, commit=True):
     """Update ticket status and return number of rows updated."""
 
     cursor = conn.cursor()
@@ -24,33 +36,106 @@ def update_ticket_status(conn, ticket_id, status):
         """UPDATE it_tickets SET status = ? WHERE ticket_id = ?""",
         (status, ticket_id)
     )
-    conn.commit()
+    if commit:
+        conn.commit()
+        bump_table_version("it_tickets")
 
     return cursor.rowcount
 
-def delete_ticket(conn, ticket_id):
+@timed
+@retry_on_busy
+def delete_ticket(conn, ticket_id, commit=True):
     """Delete ticket by ticket_id and return number of deleted rows."""
 
     cursor = conn.cursor()
     cursor.execute(
         """DELETE FROM it_tickets WHERE ticket_id = ?""", (ticket_id,)
     )
-    conn.commit()
+    if commit:
+        conn.commit()
+        bump_table_version("it_tickets")
 
     return cursor.rowcount
 
-def get_all_tickets(conn):
-    """Get all tickets as DataFrame."""
+@timed(trace=False)
+@retry_on_busy
+def insert_tickets_many(conn, tickets, commit=True):
+    """Insert many tickets in one transaction and return the number inserted.
+
+    tickets is an iterable of (priority, description, status, assigned_to,
+    created_at, resolution_time_hours).
+    """
+
+    cursor = conn.cursor()
+    cursor.executemany("""
+        INSERT INTO it_tickets  
+        (priority, description, status, assigned_to, created_at, resolution_time_hours)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, tickets)
+    if commit:
+        conn.commit()
+        bump_table_version("it_tickets")
+
+    return cursor.rowcount
+
+@timed(trace=False)
+@retry_on_busy
+def update_ticket_status_many(conn, ticket_ids, status, commit=True):
+    """Set the status of many tickets in one transaction and return the number updated."""
+
+    cursor = conn.cursor()
+    cursor.executemany(
+        """UPDATE it_tickets SET status = ? WHERE ticket_id = ?""",
+        [(status, int(ticket_id)) for ticket_id in ticket_ids]
+    )
+    if commit:
+        conn.commit()
+        bump_table_version("it_tickets")
 
-    df = pd.read_sql_query(
-        "SELECT * FROM it_tickets ORDER BY ticket_id DESC",
-        conn
+    return cursor.rowcount
+
+@timed(trace=False)
+@retry_on_busy
+def delete_tickets_many(conn, ticket_ids, commit=True):
+    """Delete many tickets in one transaction and return the number deleted."""
+
+    cursor = conn.cursor()
+    cursor.executemany(
+        """DELETE FROM it_tickets WHERE ticket_id = ?""",
+        [(int(ticket_id),) for ticket_id in ticket_ids]
     )
+    if commit:
+        conn.commit()
+        bump_table_version("it_tickets")
+
+    return cursor.rowcount
+
+@timed
+def get_all_tickets(conn):
+    """Get all tickets as a DataFrame with compact dtypes, see frames.compact_frame.
 
-    return df
+    Only rows changed since the previous call are read, see changes.delta_frame.
+    """
+    return delta_frame(conn, "it_tickets")
 
+@cached_query("it_tickets")
+def get_tickets_page(conn, limit=50, after_id=None, before_id=None,
+                     priority=None, status=None, assigned_to=None):
+    """Get one page of tickets, newest first, using keyset pagination on ticket_id."""
+    filters = {"priority": priority, "status": status, "assigned_to": assigned_to}
+    return fetch_page(conn, "it_tickets", "ticket_id", TICKET_FILTERS,
+                      limit=limit, after=after_id, before=before_id, filters=filters)
 
-def load_it_ticket_data_to_sql(conn, csv_path, table_name="it_tickets"):
+@cached_query("it_tickets")
+def count_tickets(conn, priority=None, status=None, assigned_to=None):
+    """Count tickets matching the optional filters."""
+    filters = {"priority": priority, "status": status, "assigned_to": assigned_to}
+    return count_rows(conn, "it_tickets", TICKET_FILTERS, filters)
+
+
+@timed(trace=False)
+def load_it_ticket_data_to_sql(conn, csv_path, table_name="it_tickets", chunksize=CHUNK_SIZE,
+                               incremental=False, bulk=False):
     """Loading sample data from IT Tickets csv to sql database."""
     
     csv_path = Path(csv_path)
@@ -58,16 +143,21 @@ def load_it_ticket_data_to_sql(conn, csv_path, table_name="it_tickets"):
     if not csv_path.exists():
         print(f"⚠️ CSV file not found: {csv_path}")
         return 0
-    
-    #reading csv using pandas
-    df = pd.read_csv(csv_path)
-    
-    #drop ticket_id if present, since it's autoincrement
-    if "ticket_id" in df.columns:
-        df = df.drop(columns=["ticket_id"])
-    
-    #insert data into IT Tickets table
-    df.to_sql(name=table_name, con=conn, if_exists='append', index=False)
-    row_count = len(df)
-    print(f"✅ Successfully loaded {row_count} rows into '{table_name}'.")
-    return row_count
+
+    #stream the csv in chunks, ticket_id is autoincrement so a plain load leaves it out
+    options = dict(
+        columns=["priority", "description", "status", "assigned_to", "created_at", "resolution_time_hours"],
+        dtypes={"resolution_time_hours": "Int64"},
+        date_columns={"created_at": ("%Y-%m-%d %H:%M:%S", STORED_DATETIME_FORMAT)},
+        chunksize=chunksize,
+        #big loads skip the per-row derived-table triggers and rebuild those tables once
+        bulk=bulk,
+    )
+    if incremental:
+        #only read what was appended since the last run and upsert on the export's ticket_id
+        stats = ingest_csv_incremental(conn, csv_path, table_name, source_key="ticket_id", **options)
+    else:
+        stats = ingest_csv(conn, csv_path, table_name, **options)
+    bump_table_version(table_name)
+    print(f"✅ Successfully loaded {format_ingest_stats(stats)}.")
+    return stats["rows"]
@@ -1,11 +1,27 @@
 import pandas as pd
-from app.data.db import connect_database
+from app.data.db import connect_database, retry_on_busy
+from app.data.cache import cached_query, bump_table_version
+from app.services.instrumentation import timed
+from app.data.frames import compact_frame
+from app.data.pagination import fetch_page
+from app.data.revocations import REVOCATION_TABLES
+from app.services.session_tokens import forget_revocations, revoke_user_tokens
 
+@cached_query("users")
 def get_all_users(conn):
-    """Fetch all users as a DataFrame."""
+    """Fetch all users as a DataFrame with compact dtypes, see frames.compact_frame."""
     df = pd.read_sql_query("SELECT * FROM users ORDER BY id DESC", conn)
-    return df
+    return compact_frame(df, "users")
 
+@cached_query("users")
+def get_users_page(conn, limit=50, after_id=None, before_id=None, role=None):
+    """Fetch one page of users, newest first, without the password hashes."""
+    return fetch_page(conn, "users", "id", ("role",), limit=limit, after=after_id,
+                      before=before_id, filters={"role": role},
+                      columns="id, username, role, created_at")
+
+@timed
+@retry_on_busy
 def insert_user(conn, username, password_hash, role='user'):
     """Insert new user."""
     cursor = conn.cursor()
@@ -14,8 +30,11 @@ def insert_user(conn, username, password_hash, role='user'):
         (username, password_hash, role)
     )
     conn.commit()
+    bump_table_version("users")
     return cursor.lastrowid
 
+@timed
+@retry_on_busy
 def update_user_role(conn, username, role):
     """Update user role."""
     cursor = conn.cursor()
@@ -23,18 +42,28 @@ def update_user_role(conn, username, role):
         """UPDATE users SET role = ? WHERE username = ?""",
         (role, username)
     )
+    #tokens carry the role, so existing ones must not outlive the change
+    revoke_user_tokens(conn, username, commit=False)
     conn.commit()
+    bump_table_version("users", *REVOCATION_TABLES)
+    forget_revocations()
     return cursor.rowcount
 
+@timed
+@retry_on_busy
 def delete_user(conn, username):
     """Delete user by username."""
     cursor = conn.cursor()
     cursor.execute(
         """DELETE FROM users WHERE username = ?""", (username,)
     )
+    revoke_user_tokens(conn, username, commit=False)
     conn.commit()
+    bump_table_version("users", *REVOCATION_TABLES)
+    forget_revocations()
     return cursor.rowcount
 
+@timed
 def get_user_by_username(conn, username):
     """Retrieve user by username."""
     cursor = conn.cursor()
@@ -0,0 +1,231 @@
+import contextlib
+import queue
+import sqlite3
+import threading
+from concurrent.futures import Future
+from pathlib import Path
+
+from app.data.cache import bump_table_version
+from app.data.db import DB_PATH, BUSY_TIMEOUT_MS, call_with_busy_retry, configure_connection
+from app.services.instrumentation import instrument_connection
+
+# Most jobs folded into one commit
+GROUP_COMMIT_MAX_JOBS = 256
+
+# How long the writer lingers for more jobs while they keep arriving, in seconds, 0 commits once the queue is drained
+GROUP_COMMIT_WAIT = 0.0
+
+# Seconds write() waits for its commit before giving up, past the busy retries a batch can spend
+WRITE_TIMEOUT = 120
+
+# Busy retries before a batch fails, more than a single write gets since a bulk load can hold the lock a while
+WRITER_BUSY_RETRIES = 10
+
+_STOP = object()
+
+
+class _Job:
+    def __init__(self, func, args, kwargs, tables):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.tables = tables
+        self.future = Future()
+
+
+class GroupCommitWriter:
+    """Single writer thread that coalesces writes from every session into group commits.
+
+    Jobs are data-layer write functions that accept commit=False. The writer
+    runs a batch of them inside one transaction, each in its own savepoint so
+    a failing job doesn't undo the others, then commits once.
+
+    Meant for bulk and batched actions. A single-row write from a page is
+    faster committed directly through its @retry_on_busy function on
+    db.get_connection(), since the hop to this thread costs more than the
+    write itself.
+    """
+
+    def __init__(self, db_path=DB_PATH, max_jobs=GROUP_COMMIT_MAX_JOBS, wait=GROUP_COMMIT_WAIT):
+        self.db_path = str(db_path)
+        self.max_jobs = max_jobs
+        self.wait = wait
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._stats = {"jobs": 0, "commits": 0, "failed_jobs": 0, "failed_commits": 0, "restarts": 0}
+        self._stopped = False
+        self._thread = None
+        self._start()
+
+    def _start(self):
+        self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, func, *args, tables=(), **kwargs):
+        """Queue func(conn, *args, commit=False, **kwargs) and return a Future for its result."""
+        job = _Job(func, args, kwargs, tables)
+        with self._lock:
+            if self._stopped:
+                raise RuntimeError("writer has been stopped")
+            self._queue.put(job)
+        return job.future
+
+    def write(self, func, *args, tables=(), timeout=WRITE_TIMEOUT, **kwargs):
+        """Queue a write and wait until it has been committed. Returns func's result.
+
+        Raises concurrent.futures.TimeoutError if it isn't committed within timeout seconds.
+        """
+        return self.submit(func, *args, tables=tables, **kwargs).result(timeout=timeout)
+
+    def stop(self):
+        """Finish the queued jobs and stop the writer thread."""
+        with self._lock:
+            self._stopped = True
+            self._queue.put(_STOP)
+        self._thread.join()
+
+    def stats(self):
+        """Return job and commit counts and the average jobs per commit."""
+        with self._lock:
+            stats = dict(self._stats)
+        stats["queued"] = self._queue.qsize()
+        stats["jobs_per_commit"] = stats["jobs"] / stats["commits"] if stats["commits"] else 0.0
+        return stats
+
+    def _next_batch(self):
+        job = self._queue.get()
+        if job is _STOP:
+            return None
+        batch = [job]
+        #a lone write commits straight away, lingering only pays off while others are queued behind it
+        linger = False
+        while len(batch) < self.max_jobs:
+            try:
+                job = self._queue.get(timeout=self.wait) if linger else self._queue.get_nowait()
+            except queue.Empty:
+                if linger or len(batch) == 1 or not self.wait:
+                    break
+                linger = True
+                continue
+            if job is _STOP:
+                #put it back so the loop stops after this batch
+                self._queue.put(_STOP)
+                break
+            batch.append(job)
+        return batch
+
+    def _connect(self):
+        #autocommit mode so we control BEGIN/COMMIT ourselves
+        conn = sqlite3.connect(self.db_path, timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+        return instrument_connection(configure_connection(conn))
+
+    def _run(self):
+        conn = None
+        batch = []
+        try:
+            while True:
+                batch = self._next_batch()
+                if batch is None:
+                    break
+                try:
+                    if conn is None:
+                        conn = self._connect()
+                    self._commit_batch(conn, batch)
+                except Exception as e:
+                    #anything escaping the batch, e.g. a failed ROLLBACK, fails its jobs rather than the writer
+                    print(f"⚠️ Writer batch failed: {e}")
+                    self._fail(batch, e)
+                    with self._lock:
+                        self._stats["failed_commits"] += 1
+                    #closing rolls back whatever the batch left open, the next batch gets a fresh connection
+                    if conn is not None:
+                        with contextlib.suppress(sqlite3.Error):
+                            conn.close()
+                        conn = None
+        finally:
+            if conn is not None:
+                conn.close()
+            self._fail(batch or [], RuntimeError("writer thread stopped before the write was committed"))
+            with self._lock:
+                if not self._stopped:
+                    #the loop died without being stopped, a fresh thread picks up the queued jobs
+                    self._stats["restarts"] += 1
+                    self._start()
+                else:
+                    #don't leave anyone waiting on a job that will never run
+                    self._drain(RuntimeError("writer has been stopped"))
+
+    def _drain(self, error):
+        while True:
+            try:
+                job = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if job is not _STOP:
+                self._fail([job], error)
+
+    @staticmethod
+    def _fail(batch, error):
+        for job in batch:
+            if not job.future.done():
+                job.future.set_exception(error)
+
+    def _commit_batch(self, conn, batch):
+        results = []
+        try:
+            #take the write lock up front, waiting out a long load in another process if need be
+            call_with_busy_retry(conn.execute, "BEGIN IMMEDIATE", retries=WRITER_BUSY_RETRIES)
+        except sqlite3.Error as e:
+            for job in batch:
+                job.future.set_exception(e)
+            with self._lock:
+                self._stats["failed_commits"] += 1
+            return
+
+        for job in batch:
+            conn.execute("SAVEPOINT job")
+            try:
+                result = job.func(conn, *job.args, commit=False, **job.kwargs)
+                conn.execute("RELEASE job")
+                results.append((job, result, None))
+            except Exception as e:
+                conn.execute("ROLLBACK TO job")
+                conn.execute("RELEASE job")
+                results.append((job, None, e))
+
+        try:
+            #a busy COMMIT leaves the transaction open, so it can simply be tried again
+            call_with_busy_retry(conn.execute, "COMMIT", retries=WRITER_BUSY_RETRIES)
+        except sqlite3.Error as e:
+            conn.execute("ROLLBACK")
+            for job in batch:
+                job.future.set_exception(e)
+            with self._lock:
+                self._stats["failed_commits"] += 1
+            return
+
+        for table in {t for job in batch for t in job.tables}:
+            bump_table_version(table)
+        with self._lock:
+            self._stats["jobs"] += len(batch)
+            self._stats["commits"] += 1
+            self._stats["failed_jobs"] += sum(1 for _, _, error in results if error)
+        for job, result, error in results:
+            if error is not None:
+                job.future.set_exception(error)
+            else:
+                job.future.set_result(result)
+
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+
+def get_writer(db_path=DB_PATH):
+    """Return the shared writer for a database file, starting it on first use."""
+    key = str(Path(db_path).resolve())
+    with _writers_lock:
+        writer = _writers.get(key)
+        if writer is None:
+            writer = _writers[key] = GroupCommitWriter(db_path)
+        return writer
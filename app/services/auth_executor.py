@@ -0,0 +1,125 @@
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+
+# bcrypt releases the GIL, so threads give real parallelism for hashing
+AUTH_WORKERS = os.cpu_count() or 4
+
+# Requests allowed to wait for a worker before new ones are turned away
+AUTH_MAX_QUEUE = 64
+
+# How long a caller waits for a queue slot before giving up
+AUTH_QUEUE_TIMEOUT = 5.0
+
+# Latency samples kept per operation for the percentile metrics
+LATENCY_SAMPLES = 2048
+
+
+class AuthBusyError(Exception):
+    """Raised when the auth queue is full and the request should be retried later."""
+
+
+class AuthExecutor:
+    """Runs bcrypt work on a bounded thread pool with a queue-depth limit."""
+
+    def __init__(self, workers=AUTH_WORKERS, max_queue=AUTH_MAX_QUEUE, queue_timeout=AUTH_QUEUE_TIMEOUT):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="auth")
+        #one slot per running job plus one per queued job
+        self._slots = threading.BoundedSemaphore(workers + max_queue)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._rejected = 0
+        self._latencies = {}
+
+    def run(self, op, func, *args, timeout=None):
+        """Run func(*args) on the pool and wait for its result.
+
+        Raises AuthBusyError if no queue slot frees up within the timeout.
+        """
+        timeout = self.queue_timeout if timeout is None else timeout
+        started = time.perf_counter()
+        #release the slot we took even if resize() swaps the semaphore meanwhile
+        slots = self._slots
+        if not slots.acquire(timeout=timeout):
+            with self._lock:
+                self._rejected += 1
+            raise AuthBusyError("Too many authentication requests in progress.")
+
+        try:
+            #submitting under the lock means resize() never shuts down a pool we are about to use
+            with self._lock:
+                self._in_flight += 1
+                future = self._pool.submit(func, *args)
+            return future.result()
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+            slots.release()
+            self.record(op, time.perf_counter() - started)
+
+    def resize(self, workers):
+        """Replace the pool with one of workers threads. Jobs already running finish on the old one."""
+        with self._lock:
+            old = self._pool
+            self.workers = workers
+            self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="auth")
+            self._slots = threading.BoundedSemaphore(workers + self.max_queue)
+        old.shutdown(wait=True)
+
+    def record(self, op, seconds):
+        """Record one latency sample for an operation."""
+        with self._lock:
+            samples = self._latencies.get(op)
+            if samples is None:
+                samples = self._latencies[op] = deque(maxlen=LATENCY_SAMPLES)
+            samples.append(seconds)
+
+    def stats(self):
+        """Return queue depth, rejections and p50/p95 latency in ms per operation."""
+        with self._lock:
+            latencies = {op: sorted(samples) for op, samples in self._latencies.items()}
+            stats = {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "in_flight": self._in_flight,
+                "rejected": self._rejected,
+            }
+        for op, samples in latencies.items():
+            stats[op] = {
+                "count": len(samples),
+                "p50_ms": _percentile(samples, 50) * 1000,
+                "p95_ms": _percentile(samples, 95) * 1000,
+            }
+        return stats
+
+
+def _percentile(sorted_samples, pct):
+    if not sorted_samples:
+        return 0.0
+    index = min(len(sorted_samples) - 1, int(round(pct / 100 * (len(sorted_samples) - 1))))
+    return sorted_samples[index]
+
+
+auth_executor = AuthExecutor()
+
+
+def check_password(password_bytes, hash_bytes, timeout=None):
+    """bcrypt.checkpw on the auth pool."""
+    return auth_executor.run("checkpw", bcrypt.checkpw, password_bytes, hash_bytes, timeout=timeout)
+
+
+def hash_password(password_bytes, salt=None, timeout=None):
+    """bcrypt.hashpw on the auth pool, with a fresh salt unless one is given."""
+    return auth_executor.run("hashpw", bcrypt.hashpw, password_bytes, salt or bcrypt.gensalt(), timeout=timeout)
+
+
+def auth_stats():
+    """Return the shared auth executor's stats."""
+    return auth_executor.stats()
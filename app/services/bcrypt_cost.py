@@ -0,0 +1,170 @@
+"""Pick the bcrypt cost factor for this machine and report what the users table uses.
+
+Run from the project root:
+    python -m app.services.bcrypt_cost --calibrate
+    python -m app.services.bcrypt_cost --report
+"""
+import argparse
+import math
+import os
+import threading
+import time
+
+import bcrypt
+
+# How long one password hash should take on this machine, in ms
+BCRYPT_TARGET_MS = float(os.environ.get("BCRYPT_TARGET_MS", 250))
+
+# Never go outside this range whatever the measurement says
+MIN_COST = 10
+MAX_COST = 16
+
+# Cost used until calibration has finished, bcrypt's own default
+DEFAULT_COST = 12
+
+_lock = threading.Lock()
+_target_cost = None
+_calibration = None
+
+
+def measure_hash_ms(cost, samples=2):
+    """Best-of-samples time for one bcrypt hash at the given cost, in ms."""
+    salt = bcrypt.gensalt(cost)
+    best = None
+    for _ in range(samples):
+        started = time.perf_counter()
+        bcrypt.hashpw(b"calibration-password", salt)
+        elapsed = (time.perf_counter() - started) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def calibrate_cost(target_ms=BCRYPT_TARGET_MS, min_cost=MIN_COST, max_cost=MAX_COST):
+    """Return the cost whose hash time on this machine is closest to target_ms.
+
+    Each extra cost step doubles the work, so one measurement at min_cost is
+    enough to predict the rest.
+    """
+    base_ms = measure_hash_ms(min_cost)
+    best_cost = min_cost
+    best_error = None
+    for cost in range(min_cost, max_cost + 1):
+        predicted = base_ms * 2 ** (cost - min_cost)
+        #compare on a log scale since cost steps are exponential
+        error = abs(math.log2(predicted / target_ms))
+        if best_error is None or error < best_error:
+            best_cost, best_error = cost, error
+    return best_cost
+
+
+def _calibrate(target_ms):
+    global _target_cost
+    try:
+        cost = calibrate_cost(target_ms)
+    except Exception as e:
+        print(f"⚠️ bcrypt calibration failed, using cost {DEFAULT_COST}: {e}")
+        cost = DEFAULT_COST
+    with _lock:
+        _target_cost = cost
+
+
+def start_calibration(target_ms=BCRYPT_TARGET_MS):
+    """Calibrate on a background thread, unless BCRYPT_COST is set or it has already started."""
+    global _calibration
+    if os.environ.get("BCRYPT_COST"):
+        return
+    with _lock:
+        if _calibration is not None:
+            return
+        _calibration = threading.Thread(target=_calibrate, args=(target_ms,), name="bcrypt-calibration", daemon=True)
+        _calibration.start()
+
+
+def is_calibrated():
+    """Whether get_target_cost returns its final value rather than DEFAULT_COST."""
+    return bool(os.environ.get("BCRYPT_COST")) or _target_cost is not None
+
+
+def get_target_cost(wait=False):
+    """The cost new and rehashed passwords use. Set BCRYPT_COST to skip calibration.
+
+    The first call starts calibration in the background and DEFAULT_COST is
+    used until it finishes, so no login waits for it. wait=True blocks until
+    the calibrated cost is known.
+    """
+    configured = os.environ.get("BCRYPT_COST")
+    if configured:
+        return int(configured)
+    start_calibration()
+    if wait:
+        _calibration.join()
+    with _lock:
+        return DEFAULT_COST if _target_cost is None else _target_cost
+
+
+def new_salt():
+    """A fresh salt at the target cost."""
+    return bcrypt.gensalt(get_target_cost())
+
+
+def get_hash_cost(password_hash):
+    """Cost factor of a bcrypt hash like $2b$12$..., or None if it isn't one."""
+    parts = password_hash.split("$")
+    if len(parts) < 4 or not parts[2].isdigit():
+        return None
+    return int(parts[2])
+
+
+def needs_rehash(password_hash):
+    """True if a hash was made with a cost other than the target.
+
+    Always False while calibration is still running, so hashes aren't moved
+    to DEFAULT_COST only to be moved again once the real target is known.
+    """
+    cost = get_hash_cost(password_hash)
+    target = get_target_cost()
+    return cost is not None and is_calibrated() and cost != target
+
+
+def cost_distribution(conn):
+    """Number of users per bcrypt cost factor."""
+    import pandas as pd
+    #hashes look like $2b$12$..., so the cost is characters 5-6
+    return pd.read_sql_query(
+        """SELECT CASE WHEN password_hash GLOB '$2?$[0-9][0-9]$*'
+                       THEN CAST(substr(password_hash, 5, 2) AS INTEGER) END AS cost,
+                  COUNT(*) AS users
+           FROM users GROUP BY cost ORDER BY cost""",
+        conn,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calibrate", action="store_true", help="measure this machine and print the chosen cost")
+    parser.add_argument("--report", action="store_true", help="show the cost distribution in the users table")
+    parser.add_argument("--target-ms", type=float, default=BCRYPT_TARGET_MS)
+    args = parser.parse_args()
+
+    target = None
+    if args.calibrate or not args.report:
+        target = calibrate_cost(args.target_ms)
+        print(f"Target {args.target_ms:.0f} ms -> cost {target} (~{measure_hash_ms(target, samples=1):.0f} ms per hash)")
+        print(f"   Set BCRYPT_COST={target} to skip calibration when the app starts")
+
+    if args.report:
+        import pandas as pd
+        from app.data.db import connect_database
+        conn = connect_database()
+        distribution = cost_distribution(conn)
+        conn.close()
+        target = target or get_target_cost(wait=True)
+        print(f"{'cost':>6} {'users':>8}")
+        for row in distribution.itertuples(index=False):
+            label = "n/a" if pd.isna(row.cost) else int(row.cost)
+            marker = "  <- target" if label == target else ""
+            print(f"{label:>6} {row.users:>8}{marker}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+import contextlib
+import functools
+import json
+import os
+import re
+import threading
+import time
+from collections import deque
+
+# Set APP_INSTRUMENTATION=0 to turn off query and render timing
+INSTRUMENTATION_ENABLED = os.environ.get("APP_INSTRUMENTATION", "1") != "0"
+
+# Latency samples kept per query, function and page section for percentiles
+SAMPLES_KEPT = 500
+
+# Distinct SQL texts tracked, later ones are counted under OTHER_QUERIES
+MAX_QUERIES = 500
+OTHER_QUERIES = "(other queries)"
+
+# Raw statements whose normalized text is remembered, so repeated SQL isn't run through the regexes again
+MAX_NORMALIZED = 2_000
+
+_WHITESPACE = re.compile(r"\s+")
+#the trace callback sees SQL with parameters filled in, put the placeholders back
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+
+def _percentile(sorted_samples, pct):
+    if not sorted_samples:
+        return 0.0
+    index = min(len(sorted_samples) - 1, int(round(pct / 100 * (len(sorted_samples) - 1))))
+    return sorted_samples[index]
+
+
+class _Series:
+    """Call count, total and recent samples of one timed thing."""
+
+    def __init__(self):
+        self.calls = 0
+        self.timed = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rows = 0
+        self.samples = deque(maxlen=SAMPLES_KEPT)
+
+    def add(self, seconds=None, rows=None):
+        self.calls += 1
+        if seconds is not None:
+            self.timed += 1
+            self.total += seconds
+            self.max = max(self.max, seconds)
+            self.samples.append(seconds)
+        if rows is not None:
+            self.rows += rows
+
+    def summary(self):
+        samples = sorted(self.samples)
+        return {
+            "calls": self.calls,
+            "rows": self.rows,
+            "total_ms": self.total * 1000,
+            "avg_ms": self.total * 1000 / self.timed if self.timed else None,
+            "p50_ms": _percentile(samples, 50) * 1000 if samples else None,
+            "p95_ms": _percentile(samples, 95) * 1000 if samples else None,
+            "max_ms": self.max * 1000 if self.timed else None,
+        }
+
+
+class _Call:
+    def __init__(self, name, traced=True):
+        self.name = name
+        self.traced = traced
+        #only the statement still running is kept, finished ones go straight into the totals
+        self.statement = None
+        self.statement_started = None
+
+
+class Recorder:
+    """Collects per-query, per-function and per-page-section timings for this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._queries = {}
+        self._functions = {}
+        self._renders = {}
+        self._normalized = {}
+        self.started_at = time.time()
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def on_statement(self, sql):
+        """sqlite3 trace callback, called as each statement starts executing."""
+        #statements run by triggers arrive as '-- TRIGGER name', their time belongs to the outer statement
+        if sql.startswith("--"):
+            return
+        stack = self._stack()
+        if stack:
+            call = stack[-1]
+            if not call.traced:
+                return
+            #a statement runs until the next one starts
+            now = time.perf_counter()
+            if call.statement is not None:
+                self._add_query(call.statement, now - call.statement_started, None)
+            call.statement, call.statement_started = sql, now
+        else:
+            #ran outside a timed function, so only its count is known
+            self._add_query(sql, None, None)
+
+    def _normalize(self, sql):
+        text = self._normalized.get(sql)
+        if text is None:
+            text = _LITERALS.sub("?", _WHITESPACE.sub(" ", sql)).strip()
+            if len(self._normalized) >= MAX_NORMALIZED:
+                self._normalized.clear()
+            self._normalized[sql] = text
+        return text
+
+    def _add_query(self, sql, seconds, rows):
+        text = self._normalize(sql)
+        with self._lock:
+            series = self._queries.get(text)
+            if series is None:
+                if len(self._queries) >= MAX_QUERIES:
+                    text = OTHER_QUERIES
+                series = self._queries.setdefault(text, _Series())
+            series.add(seconds, rows)
+
+    def begin(self, name, trace=True):
+        stack = self._stack()
+        #a call inside an untraced one, e.g. a helper of a bulk load, isn't traced either
+        call = _Call(name, trace and (not stack or stack[-1].traced))
+        stack.append(call)
+        return call
+
+    def end(self, call, started, result):
+        ended = time.perf_counter()
+        self._stack().pop()
+        rows = _row_count(result)
+
+        #the last statement runs until the function returns
+        if call.statement is not None:
+            self._add_query(call.statement, ended - call.statement_started, rows)
+
+        with self._lock:
+            self._functions.setdefault(call.name, _Series()).add(ended - started, rows)
+
+    def add_render(self, page, section, seconds):
+        with self._lock:
+            self._renders.setdefault((page, section), _Series()).add(seconds)
+
+    def snapshot(self):
+        """Everything recorded so far as plain dicts and lists, ready for JSON."""
+        with self._lock:
+            queries = [dict(query=sql, **s.summary()) for sql, s in self._queries.items()]
+            functions = [dict(function=name, **s.summary()) for name, s in self._functions.items()]
+            renders = [dict(page=page, section=section, **s.summary())
+                       for (page, section), s in self._renders.items()]
+        return {
+            "recording_since": self.started_at,
+            "queries": sorted(queries, key=lambda q: q["max_ms"] or 0, reverse=True),
+            "functions": sorted(functions, key=lambda f: f["total_ms"], reverse=True),
+            "renders": sorted(renders, key=lambda r: (r["page"], r["section"])),
+        }
+
+    def reset(self):
+        """Forget everything recorded so far."""
+        with self._lock:
+            self._queries.clear()
+            self._functions.clear()
+            self._renders.clear()
+            self.started_at = time.time()
+
+
+def _row_count(result):
+    #DataFrames and lists are rows returned, anything else (ids, rowcounts, dicts) isn't
+    if isinstance(result, list) or hasattr(result, "shape"):
+        return len(result)
+    return None
+
+
+recorder = Recorder()
+
+
+#ids of connections with the trace callback, sqlite3 connections can't be weakly referenced
+_instrumented = set()
+
+
+def instrument_connection(conn):
+    """Report every statement run on conn to the recorder."""
+    if INSTRUMENTATION_ENABLED:
+        conn.set_trace_callback(recorder.on_statement)
+        _instrumented.add(id(conn))
+    return conn
+
+
+@contextlib.contextmanager
+def _untraced(conn):
+    #detach the callback rather than ignore it, a bulk load would still pay for one call per row and trigger
+    if id(conn) not in _instrumented:
+        yield
+        return
+    conn.set_trace_callback(None)
+    try:
+        yield
+    finally:
+        conn.set_trace_callback(recorder.on_statement)
+
+
+def timed(func=None, *, trace=True):
+    """Record the latency and rows returned of a data function, and the queries it runs.
+
+    Use @timed(trace=False) on bulk writers: executemany reports every row as
+    its own statement, so only the function as a whole is timed.
+    """
+    if func is None:
+        return functools.partial(timed, trace=trace)
+    name = f"{func.__module__.rsplit('.', 1)[-1]}.{func.__qualname__}"
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not INSTRUMENTATION_ENABLED:
+            return func(*args, **kwargs)
+        call = recorder.begin(name, trace)
+        started = time.perf_counter()
+        result = None
+        try:
+            if not trace and args and hasattr(args[0], "set_trace_callback"):
+                with _untraced(args[0]):
+                    result = func(*args, **kwargs)
+            else:
+                result = func(*args, **kwargs)
+            return result
+        finally:
+            recorder.end(call, started, result)
+    return wrapper
+
+
+class PageTimer:
+    """Splits one render of a page into named sections and records how long each took.
+
+    Call mark(name) where each section starts and finish() at the end of the
+    script. A render that stops early records its finished sections only.
+    """
+
+    def __init__(self, page):
+        self.page = page
+        self.started = time.perf_counter()
+        self.section = None
+        self.section_started = self.started
+
+    def mark(self, section):
+        """End the current section and start the next one."""
+        now = time.perf_counter()
+        if self.section is not None and INSTRUMENTATION_ENABLED:
+            recorder.add_render(self.page, self.section, now - self.section_started)
+        self.section = section
+        self.section_started = now
+
+    def finish(self):
+        """End the last section and record the whole render."""
+        self.mark(None)
+        if INSTRUMENTATION_ENABLED:
+            recorder.add_render(self.page, "(total)", self.section_started - self.started)
+
+
+def instrumentation_snapshot():
+    """Return the shared recorder's snapshot."""
+    return recorder.snapshot()
+
+
+def export_json(extra=None):
+    """The snapshot plus any extra sections, e.g. cache stats, as a JSON string."""
+    snapshot = recorder.snapshot()
+    snapshot.update(extra or {})
+    return json.dumps(snapshot, indent=2, default=str)
@@ -0,0 +1,131 @@
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import threading
+import time
+
+from app.data.db import get_connection, get_read_connection
+from app.data.revocations import (
+    REVOCATION_TABLES,
+    get_revocations,
+    insert_revoked_token,
+    insert_user_revocation,
+)
+
+# Secret used to sign tokens. Set SESSION_SECRET so tokens survive restarts and
+# work across processes; otherwise a random one is made per process.
+SESSION_SECRET = os.environ.get("SESSION_SECRET", "").encode("utf-8") or secrets.token_bytes(32)
+
+# How long a token stays valid, in seconds
+TOKEN_TTL = 8 * 60 * 60
+
+# Seconds the revocation lists are kept in memory between reads, so a revocation
+# made by another process applies within this long. Ones made here apply at once.
+REVOCATION_SYNC_SECONDS = 30
+
+_revocations_lock = threading.Lock()
+#(monotonic time read, revoked token ids, username -> issued_before)
+_revocations = None
+
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _sign(payload):
+    return hmac.new(SESSION_SECRET, payload, hashlib.sha256).digest()
+
+
+def issue_token(username, role, ttl=TOKEN_TTL):
+    """Create a signed token for a user who just logged in."""
+    now = time.time()
+    payload = {
+        "sub": username,
+        "role": role,
+        "iat": now,
+        "exp": now + ttl,
+        "jti": secrets.token_hex(8),
+    }
+    body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return f"{_b64encode(body)}.{_b64encode(_sign(body))}"
+
+
+def _decode(token):
+    try:
+        body_part, signature_part = token.split(".", 1)
+        body = _b64decode(body_part)
+        signature = _b64decode(signature_part)
+    except (ValueError, AttributeError):
+        return None
+    if not hmac.compare_digest(signature, _sign(body)):
+        return None
+    try:
+        return json.loads(body)
+    except ValueError:
+        return None
+
+
+def _revocations_in_force(conn):
+    global _revocations
+    now = time.monotonic()
+    with _revocations_lock:
+        if _revocations is not None and now - _revocations[0] < REVOCATION_SYNC_SECONDS:
+            return _revocations[1], _revocations[2]
+    revoked_tokens, revoked_users = get_revocations(conn or get_read_connection())
+    with _revocations_lock:
+        _revocations = (now, revoked_tokens, revoked_users)
+    return revoked_tokens, revoked_users
+
+
+def forget_revocations():
+    """Drop the in-memory revocation lists, so the next validation reads them from the database."""
+    global _revocations
+    with _revocations_lock:
+        _revocations = None
+
+
+def validate_token(token, conn=None):
+    """Return (username, role) for a valid token, or None.
+
+    Checks the signature, expiry and the revocations. Those are read from the
+    database at most every REVOCATION_SYNC_SECONDS, so a page load normally
+    needs no query and no bcrypt, only an HMAC.
+    """
+    if not token:
+        return None
+    payload = _decode(token)
+    if payload is None or payload["exp"] < time.time():
+        return None
+    revoked_tokens, revoked_users = _revocations_in_force(conn)
+    if payload["jti"] in revoked_tokens:
+        return None
+    issued_before = revoked_users.get(payload["sub"])
+    if issued_before is not None and payload["iat"] <= issued_before:
+        return None
+    return payload["sub"], payload["role"]
+
+
+def revoke_token(token):
+    """Revoke a single token, e.g. on logout."""
+    payload = _decode(token) if token else None
+    if payload is not None:
+        insert_revoked_token(get_connection(), payload["jti"], payload["exp"])
+        forget_revocations()
+
+
+def revoke_user_tokens(conn, username, commit=True):
+    """Revoke every token issued to a user so far, e.g. after a role change.
+
+    With commit=False call forget_revocations() once the caller has committed.
+    """
+    now = time.time()
+    insert_user_revocation(conn, username, now, now + TOKEN_TTL, commit=commit)
+    if commit:
+        forget_revocations()
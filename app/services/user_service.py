@@ -1,61 +1,126 @@
-import bcrypt
-import sqlite3
+import re
+import time
 from pathlib import Path
 from app.data.db import connect_database
-
-def migrate_users_from_file(conn, filepath='DATA/users.txt'):
-    """Migrate users from text file to database."""
+from app.data.cache import bump_table_version
+from app.services.auth_executor import AuthBusyError, auth_executor, check_password, hash_password
+from app.services.session_tokens import issue_token
+from app.services.instrumentation import timed
+from app.services.bcrypt_cost import needs_rehash, new_salt
+
+# Users written per executemany call during a migration
+MIGRATION_BATCH_SIZE = 10_000
+
+ALLOWED_ROLES = ("user", "admin")
+
+# Role names from directory exports mapped onto ours
+DEFAULT_ROLE_MAP = {
+    "": "user",
+    "user": "user",
+    "member": "user",
+    "analyst": "user",
+    "admin": "admin",
+    "administrator": "admin",
+}
+
+BCRYPT_HASH = re.compile(r"^\$2[aby]\$\d{2}\$[./A-Za-z0-9]{53}$")
+
+
+def _parse_user_line(line, role_map):
+    """Parse 'username,password_hash[,role]' (':' also accepted). Returns (row, error)."""
+    parts = re.split(r"[,:]", line)
+    if len(parts) < 2:
+        return None, "expected username and password hash"
+    username = parts[0].strip()
+    password_hash = parts[1].strip()
+    raw_role = parts[2].strip().lower() if len(parts) > 2 else ""
+
+    if not username or any(c.isspace() for c in username):
+        return None, "invalid username"
+    if not BCRYPT_HASH.match(password_hash):
+        return None, "password hash is not bcrypt"
+    role = role_map.get(raw_role)
+    if role not in ALLOWED_ROLES:
+        return None, f"unknown role '{raw_role}'"
+    return (username, password_hash, role), None
+
+
+@timed(trace=False)
+def migrate_users_from_file(conn, filepath='DATA/users.txt', batch_size=MIGRATION_BATCH_SIZE,
+                            role_map=None, quarantine_path=None):
+    """Migrate users from text file to database.
+
+    The file is streamed and inserted with executemany in batches, all in one
+    transaction. Malformed lines are written to quarantine_path (default
+    <file>.rejected) with their line number and reason. Returns a summary
+    dict with inserted, skipped (already existed), rejected, elapsed and
+    rows_per_sec.
+    """
     file_path = Path(filepath)
+    summary = {"inserted": 0, "skipped": 0, "rejected": 0, "elapsed": 0.0, "rows_per_sec": 0.0}
 
     if not file_path.exists():
         print(f"⚠️ File not found: {file_path}")
         print("   No users to migrate.")
-        return 0  # No users migrated
+        return summary
 
-    cursor = conn.cursor()
-    migrated_count = 0
-
-    with open(file_path, 'r') as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            
-            # Parse line: username,password_hash
-            parts = line.split(',')
-            if len(parts) >= 2:
-                username = parts[0]
-                password_hash = parts[1]
-                # Insert user (ignore if already exists)
-                try:
-                    cursor.execute(
-                        "INSERT OR IGNORE INTO users (username, password_hash, role) VALUES (?, ?, ?)",
-                        (username, password_hash, 'user')
-                    )
-                    if cursor.rowcount > 0:
-                        migrated_count += 1
-                except sqlite3.Error as e:
-                    print(f"Error migrating user {username}: {e}")
-    
-    conn.commit()
-    print(f"✅ Migrated {migrated_count} users from {file_path.name}")
+    role_map = role_map or DEFAULT_ROLE_MAP
+    quarantine_path = Path(quarantine_path) if quarantine_path else file_path.with_name(file_path.name + ".rejected")
+    query = "INSERT OR IGNORE INTO users (username, password_hash, role) VALUES (?, ?, ?)"
 
-    # Verify users were migrated
-    conn = connect_database()
+    started = time.perf_counter()
     cursor = conn.cursor()
-
-    # Query all users
-    cursor.execute("SELECT id, username, role FROM users")
-    users = cursor.fetchall()
-
-    print(" Users in database:")
-    print(f"{'ID':<5} {'Username':<15} {'Role':<10}")
-    print("-" * 35)
-    for user in users:
-        print(f"{user[0]:<5} {user[1]:<15} {user[2]:<10}")
-
-    print(f"\nTotal users: {len(users)}")
-    conn.close()
+    batch = []
+    quarantine = None
+    valid = 0
+
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            for line_number, line in enumerate(f, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+
+                row, error = _parse_user_line(line, role_map)
+                if error:
+                    summary["rejected"] += 1
+                    if quarantine is None:
+                        quarantine = open(quarantine_path, 'w', encoding='utf-8')
+                    quarantine.write(f"{line_number}\t{error}\t{line}\n")
+                    continue
+
+                batch.append(row)
+                valid += 1
+                if len(batch) >= batch_size:
+                    cursor.executemany(query, batch)
+                    summary["inserted"] += cursor.rowcount
+                    batch = []
+
+        if batch:
+            cursor.executemany(query, batch)
+            summary["inserted"] += cursor.rowcount
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        if quarantine is not None:
+            quarantine.close()
+
+    bump_table_version("users")
+    elapsed = time.perf_counter() - started
+    summary["skipped"] = valid - summary["inserted"]
+    summary["elapsed"] = elapsed
+    summary["rows_per_sec"] = valid / elapsed if elapsed else 0.0
+
+    print(
+        f"✅ Migrated {summary['inserted']} users from {file_path.name} "
+        f"({summary['skipped']} already existed, {summary['rejected']} rejected) "
+        f"in {elapsed:.2f}s"
+    )
+    if summary["rejected"]:
+        print(f"   Rejected lines written to {quarantine_path}")
+    return summary
 
 def register_user(conn, username, password, role='user'):
     """Register new user with password hashing."""
@@ -65,13 +130,14 @@ def register_user(conn, username, password, role='user'):
     # Check if user already exists
     cursor.execute("SELECT * FROM users WHERE username = ?", (username,))
     if cursor.fetchone():
-        conn.close()
         return False, f"Username '{username}' already exists."
 
-    # Hash password
+    # Hash password on the auth pool
     password_bytes = password.encode('utf-8')
-    salt = bcrypt.gensalt()
-    hashed = bcrypt.hashpw(password_bytes, salt)
+    try:
+        hashed = hash_password(password_bytes, new_salt())
+    except AuthBusyError:
+        return False, "The server is busy, please try again in a moment."
     password_hash = hashed.decode('utf-8')
     
     # Insert new user
@@ -80,12 +146,37 @@ def register_user(conn, username, password, role='user'):
         (username, password_hash, role)
     )
     conn.commit()
+    bump_table_version("users")
 
     return True, f"User '{username}' registered successfully!"
 
 def login_user(conn, username, password):
     """Authenticate user."""
 
+    success, message, _ = _login_user(conn, username, password)
+    return success, message
+
+def login_with_token(conn, username, password):
+    """Authenticate user and issue a signed session token.
+
+    Returns (success, message, token, role). The token lets later page loads
+    skip the users table and bcrypt entirely, see session_tokens.validate_token.
+    """
+    success, message, user = _login_user(conn, username, password)
+    if not success:
+        return False, message, None, None
+    role = user[3]
+    return True, message, issue_token(username, role), role
+
+def _login_user(conn, username, password):
+    """Check credentials, timing the whole login. Returns (success, message, user row)."""
+    started = time.perf_counter()
+    try:
+        return _check_credentials(conn, username, password)
+    finally:
+        auth_executor.record("login", time.perf_counter() - started)
+
+def _check_credentials(conn, username, password):
     cursor = conn.cursor()
 
     # Find user
@@ -93,14 +184,36 @@ def login_user(conn, username, password):
     user = cursor.fetchone()
 
     if not user:
-        return False, "User not found."
+        return False, "User not found.", None
     
     # Verify password (user[2] is password_hash column)
     stored_hash = user[2]
     password_bytes = password.encode('utf-8')
     hash_bytes = stored_hash.encode('utf-8')
     
-    if bcrypt.checkpw(password_bytes, hash_bytes):
-        return True, f"Welcome, {username}!"
+    try:
+        valid = check_password(password_bytes, hash_bytes)
+    except AuthBusyError:
+        return False, "Too many logins in progress, please try again in a moment.", None
+
+    if valid:
+        if needs_rehash(stored_hash):
+            _rehash_password(conn, username, password_bytes)
+        return True, f"Welcome, {username}!", user
     else:
-        return False, "Invalid password."
\ No newline at end of file
+        return False, "Invalid password.", None
+
+def _rehash_password(conn, username, password_bytes):
+    """Store the password again at the target bcrypt cost."""
+    try:
+        hashed = hash_password(password_bytes, new_salt())
+    except AuthBusyError:
+        #not worth failing the login over, try again next time
+        return
+    cursor = conn.cursor()
+    cursor.execute(
+        "UPDATE users SET password_hash = ? WHERE username = ?",
+        (hashed.decode('utf-8'), username)
+    )
+    conn.commit()
+    bump_table_version("users")
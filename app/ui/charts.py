@@ -0,0 +1,206 @@
+"""Plotly figures that keep their payload bounded however many rows they plot.
+
+Small inputs are drawn point by point as before. Above MAX_POINTS a scatter
+switches to a summary computed here rather than in the browser: box plots
+per category, or a 2D density heatmap for two numeric axes, with the most
+extreme points still drawn on top so anomalies stay visible. Long lines are
+thinned with LTTB, which keeps peaks and dips where plain striding drops them.
+"""
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+# Scatters plot raw points up to this many, above it they switch to summaries
+MAX_POINTS = 5_000
+
+# Most extreme points kept per category (or overall for density) on top of a summary
+OUTLIER_POINTS = 100
+
+# Points per line series left after LTTB downsampling
+MAX_LINE_POINTS = 2_000
+
+# Cells per axis of a density heatmap
+DENSITY_BINS = 60
+
+# Axes spanning more than this ratio (max / min, all positive) are binned and drawn on a log scale
+LOG_AXIS_RATIO = 1_000
+
+
+def lttb(x, y, threshold):
+    """Indices of the points Largest-Triangle-Three-Buckets keeps when thinning (x, y) to threshold.
+
+    x must be sorted and numeric. The first and last points are always kept.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+
+    #every bucket but the first and last point gets one survivor
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    keep = np.empty(threshold, dtype=np.int64)
+    keep[0] = 0
+    keep[-1] = n - 1
+    previous = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        #the next bucket's average is the third corner of the triangle
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        next_x = x[end:next_end].mean() if next_end > end else x[-1]
+        next_y = y[end:next_end].mean() if next_end > end else y[-1]
+        area = np.abs(
+            (x[previous] - next_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (next_y - y[previous])
+        )
+        previous = start + int(np.argmax(area))
+        keep[i + 1] = previous
+    return keep
+
+
+def _numeric(series):
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series.to_numpy(dtype="datetime64[ns]").astype(np.int64)
+    return series.to_numpy(dtype=float)
+
+
+def line_chart(df, x, y, title, color=None, markers=True, max_points=MAX_LINE_POINTS):
+    """px.line with each series thinned by LTTB to at most max_points."""
+    if len(df) > max_points:
+        groups = df.groupby(color, observed=True, sort=False) if color else [(None, df)]
+        parts = []
+        for _, series in groups:
+            series = series.sort_values(x)
+            parts.append(series.iloc[lttb(_numeric(series[x]), series[y].to_numpy(dtype=float), max_points)])
+        df = pd.concat(parts) if parts else df
+        #markers on thousands of points just hide the line
+        markers = False
+    return px.line(df, x=x, y=y, color=color, title=title, markers=markers)
+
+
+def box_summary(df, x, y):
+    """Per-category count, quartiles and whisker ends of y, in x's category order."""
+    rows = []
+    for category, values in df.groupby(x, observed=True, sort=True)[y]:
+        values = values.to_numpy(dtype=float)
+        q1, median, q3 = np.percentile(values, [25, 50, 75])
+        iqr = q3 - q1
+        #whiskers stop at the furthest point inside 1.5 IQR, not at the fence itself
+        inside = values[(values >= q1 - 1.5 * iqr) & (values <= q3 + 1.5 * iqr)]
+        rows.append({x: category, "count": len(values), "q1": q1, "median": median, "q3": q3,
+                     "mean": values.mean(), "lowerfence": inside.min(), "upperfence": inside.max()})
+    return pd.DataFrame(rows, columns=[x, "count", "q1", "median", "q3", "mean", "lowerfence", "upperfence"])
+
+
+def _furthest(values, limit):
+    """Positions of the limit values furthest from the median."""
+    if len(values) <= limit:
+        return np.arange(len(values))
+    distance = np.abs(values - np.median(values))
+    return np.argpartition(distance, -limit)[-limit:]
+
+
+def _extremes(df, y, per_group=None, limit=OUTLIER_POINTS):
+    """The rows furthest from the median of y, overall or within each per_group value."""
+    values = df[y].to_numpy(dtype=float)
+    if per_group is None:
+        return df.iloc[_furthest(values, limit)]
+    groups = df.groupby(per_group, observed=True, sort=True).indices.values()
+    return df.iloc[np.concatenate([positions[_furthest(values[positions], limit)] for positions in groups])]
+
+
+def _hover(df, hover_data):
+    customdata = df[hover_data].astype(str).to_numpy() if hover_data else None
+    template = "<br>".join(f"{name}=%{{customdata[{i}]}}" for i, name in enumerate(hover_data or []))
+    return customdata, template
+
+
+def category_scatter(df, x, y, title, size=None, hover_data=None, max_points=MAX_POINTS):
+    """Points of y per category of x, or box plots plus the outliers once there are too many."""
+    df = df.dropna(subset=[y])
+    if len(df) <= max_points:
+        return px.scatter(df, x=x, y=y, size=size, hover_data=hover_data, title=title)
+
+    summary = box_summary(df, x, y)
+    categories = summary[x].astype(str).tolist()
+    fig = go.Figure(go.Box(
+        name=y, x=categories, q1=summary["q1"], median=summary["median"], q3=summary["q3"],
+        lowerfence=summary["lowerfence"], upperfence=summary["upperfence"], mean=summary["mean"],
+        boxpoints=False, showlegend=False,
+    ))
+    #the points the boxes can't show, so unusual tickets can still be hovered
+    outliers = _extremes(df, y, per_group=x)
+    customdata, template = _hover(outliers, hover_data)
+    fig.add_trace(go.Scattergl(
+        x=outliers[x].astype(str), y=outliers[y], mode="markers", name="most extreme",
+        customdata=customdata, hovertemplate=f"{x}=%{{x}}<br>{y}=%{{y}}<br>{template}<extra></extra>",
+        marker={"size": 5, "opacity": 0.6},
+    ))
+    fig.update_layout(
+        title=f"{title} ({len(df):,} points summarised)",
+        xaxis={"title": x, "categoryorder": "array", "categoryarray": categories},
+        yaxis={"title": y},
+    )
+    return fig
+
+
+def _bins(values, bins):
+    """Bin edges, centres and whether the axis should be logarithmic."""
+    low, high = float(values.min()), float(values.max())
+    if low > 0 and high / low > LOG_AXIS_RATIO:
+        edges = np.logspace(np.log10(low), np.log10(high), bins + 1)
+        #10 ** log10(high) can round below high, and histogram2d drops points past the last edge
+        edges[0], edges[-1] = low, high
+        return edges, np.sqrt(edges[:-1] * edges[1:]), True
+    if low == high:
+        high = low + 1
+    edges = np.linspace(low, high, bins + 1)
+    return edges, (edges[:-1] + edges[1:]) / 2, False
+
+
+def density_scatter(df, x, y, title, size=None, hover_data=None, max_points=MAX_POINTS, bins=DENSITY_BINS):
+    """Points of y against x, or a binned density heatmap plus the extremes once there are too many."""
+    df = df.dropna(subset=[x, y])
+    if len(df) <= max_points:
+        return px.scatter(df, x=x, y=y, size=size, hover_data=hover_data, title=title)
+
+    x_values = df[x].to_numpy(dtype=float)
+    y_values = df[y].to_numpy(dtype=float)
+    x_edges, x_centres, x_log = _bins(x_values, bins)
+    y_edges, y_centres, y_log = _bins(y_values, bins)
+    counts, _, _ = np.histogram2d(x_values, y_values, bins=[x_edges, y_edges])
+    x_bin, y_bin = np.nonzero(counts)
+    cells = pd.DataFrame({x: x_centres[x_bin], y: y_centres[y_bin], "count": counts[x_bin, y_bin]})
+    return density_heatmap(cells, x, y, title, len(df), x_centres, y_centres, x_log, y_log,
+                           _extremes(df, y), hover_data)
+
+
+def density_heatmap(cells, x, y, title, total, x_centres, y_centres, x_log=False, y_log=False,
+                    extremes=None, hover_data=None):
+    """Heatmap of already binned counts, e.g. from an SQL GROUP BY, with the extremes drawn on top.
+
+    cells has the bin centres in x and y and the number of points in count,
+    x_centres and y_centres every centre of the grid including empty ones.
+    """
+    #empty cells stay NaN so they are transparent instead of drawing the lowest colour
+    grid = cells.pivot_table(index=y, columns=x, values="count", aggfunc="sum")
+    grid = grid.reindex(index=y_centres, columns=x_centres)
+    fig = go.Figure(go.Heatmap(
+        x=x_centres, y=y_centres, z=grid.to_numpy(),
+        colorscale="Blues", colorbar={"title": "count"},
+        hovertemplate=f"{x}≈%{{x:.3s}}<br>{y}≈%{{y:.3s}}<br>count=%{{z}}<extra></extra>",
+    ))
+    if extremes is not None and len(extremes):
+        customdata, template = _hover(extremes, hover_data)
+        fig.add_trace(go.Scattergl(
+            x=extremes[x], y=extremes[y], mode="markers", name="most extreme",
+            customdata=customdata, hovertemplate=f"{x}=%{{x}}<br>{y}=%{{y}}<br>{template}<extra></extra>",
+            marker={"size": 6, "color": "crimson", "opacity": 0.7},
+        ))
+    fig.update_layout(
+        title=f"{title} ({total:,} points binned)",
+        xaxis={"title": x, "type": "log" if x_log else "linear"},
+        yaxis={"title": y, "type": "log" if y_log else "linear"},
+    )
+    return fig
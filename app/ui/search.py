@@ -0,0 +1,38 @@
+import datetime
+import time
+
+import streamlit as st
+
+
+def search_box(key, search, filters=None, label="Search descriptions"):
+    """Render a full-text search box with a date range and show the matches.
+
+    search is called as search(query, since=..., until=..., **filters) and
+    should return matches best first with a snippet column. Nothing is queried
+    until something is typed. Returns the matches, or None.
+    """
+    col_query, col_dates = st.columns([3, 2])
+    with col_query:
+        query = st.text_input(label, key=f"{key}_query", placeholder="IP, hash, keyword or prefix*")
+    with col_dates:
+        dates = st.date_input("Date range", value=(), key=f"{key}_dates")
+
+    if not query.strip():
+        return None
+
+    #a range picker returns one date while the second click is pending
+    since = dates[0] if len(dates) > 0 else None
+    until = dates[1] + datetime.timedelta(days=1) if len(dates) > 1 else None
+
+    started = time.perf_counter()
+    results = search(query, since=since, until=until, **(filters or {}))
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    if results.empty:
+        st.info("No matches.")
+        return results
+    st.caption(f"{len(results)} matches in {elapsed_ms:.0f} ms")
+    #the snippet already shows the matching part of the description
+    shown = results.drop(columns=["rank", "description", "source_key"], errors="ignore")
+    st.dataframe(shown, use_container_width=True, hide_index=True)
+    return results
@@ -0,0 +1,101 @@
+import json
+import time
+
+import streamlit as st
+
+from app.services.session_tokens import REVOCATION_SYNC_SECONDS, TOKEN_TTL, validate_token, revoke_token
+
+# Cookie the session token is kept in, so a new tab or a reload stays logged in
+SESSION_COOKIE = "session_token"
+
+
+def _clear_state():
+    st.session_state.logged_in = False
+    st.session_state.username = ""
+    st.session_state.role = ""
+    st.session_state.session_token = None
+    st.session_state.token_checked_until = 0.0
+
+
+def _cookie_token():
+    #st.context.cookies holds the cookies the browser sent when this session connected
+    try:
+        token = st.context.cookies.get(SESSION_COOKIE)
+    except Exception:
+        return None
+    #outside a browser session, e.g. under AppTest, there are no real cookies
+    return token if isinstance(token, str) else None
+
+
+def _write_cookie(value, max_age):
+    """Set or, with max_age 0, delete the session cookie in the browser.
+
+    Streamlit can't send Set-Cookie headers, so the cookie is written by a
+    script and can't be HttpOnly. SameSite=Strict keeps it off cross-site
+    requests and Secure keeps it off plain http when the app is served over https.
+    """
+    attributes = f"Max-Age={int(max_age)}; Path=/; SameSite=Strict"
+    if str(st.context.url or "").startswith("https://"):
+        attributes += "; Secure"
+    cookie = json.dumps(f"{SESSION_COOKIE}={value}; {attributes}")
+    st.html(f"<script>document.cookie = {cookie};</script>", unsafe_allow_javascript=True)
+
+
+def restore_session():
+    """Check the session token on page loads.
+
+    A new session (new tab or reload) picks the token up from the session
+    cookie, so it needs no password, bcrypt or users table. A token that was
+    checked in this session is trusted for REVOCATION_SYNC_SECONDS before it
+    is checked again, so most reruns do no work at all. A revoked or expired
+    token logs the user out.
+    """
+    pending = st.session_state.pop("pending_cookie", None)
+    if pending is not None:
+        #written on the page after the login, the login page switches away before it would render
+        _write_cookie(*pending)
+
+    token = st.session_state.get("session_token")
+    if not token and not st.session_state.get("logged_out"):
+        token = _cookie_token()
+    if not token:
+        return
+
+    now = time.time()
+    if token == st.session_state.get("session_token") and now < st.session_state.get("token_checked_until", 0.0):
+        return
+
+    identity = validate_token(token)
+    if identity is None:
+        _clear_state()
+        #stop offering a dead token from the cookie on every rerun
+        st.session_state.logged_out = True
+        _write_cookie("", 0)
+        return
+
+    username, role = identity
+    st.session_state.logged_in = True
+    st.session_state.username = username
+    st.session_state.role = role
+    st.session_state.session_token = token
+    st.session_state.token_checked_until = now + REVOCATION_SYNC_SECONDS
+
+
+def start_session(username, role, token):
+    """Store a freshly issued token after a successful login."""
+    st.session_state.logged_in = True
+    st.session_state.username = username
+    st.session_state.role = role
+    st.session_state.session_token = token
+    st.session_state.token_checked_until = time.time() + REVOCATION_SYNC_SECONDS
+    st.session_state.logged_out = False
+    st.session_state.pending_cookie = (token, TOKEN_TTL)
+
+
+def end_session():
+    """Revoke the current token, clear the login from session state and delete the cookie."""
+    revoke_token(st.session_state.get("session_token"))
+    _clear_state()
+    #this session's st.context.cookies still has the old token, don't log back in from it
+    st.session_state.logged_out = True
+    _write_cookie("", 0)
@@ -0,0 +1,56 @@
+import streamlit as st
+
+
+def paginated_table(key, fetch_page, key_column, page_size=25, filters=None):
+    """Render a table that only fetches the page being looked at.
+
+    fetch_page is called as fetch_page(limit=..., after_id=..., before_id=..., **filters)
+    and must return rows newest first. The cursor lives in session state under
+    key, and is reset whenever the filters change. Returns the visible page.
+    """
+    filters = filters or {}
+    state = st.session_state.setdefault(
+        key, {"after": None, "before": None, "page": 1, "filters": None}
+    )
+    if state["filters"] != filters:
+        state.update(after=None, before=None, page=1, filters=dict(filters))
+
+    #ask for one extra row so we know whether there is another page
+    page = fetch_page(limit=page_size + 1, after_id=state["after"],
+                      before_id=state["before"], **filters)
+    if page.empty and (state["after"] is not None or state["before"] is not None):
+        #the rows around the cursor were deleted, there is nothing to page from so start over
+        state.update(after=None, before=None, page=1)
+        page = fetch_page(limit=page_size + 1, after_id=None, before_id=None, **filters)
+
+    if state["before"] is not None:
+        #when paging backwards the extra row sits at the top
+        has_prev = len(page) > page_size
+        page = page.iloc[-page_size:] if has_prev else page
+        has_next = True
+    else:
+        has_next = len(page) > page_size
+        page = page.iloc[:page_size]
+        has_prev = state["page"] > 1
+    page = page.reset_index(drop=True)
+
+    if page.empty:
+        st.info("No rows found.")
+    else:
+        st.dataframe(page, use_container_width=True)
+
+    col_prev, col_page, col_next = st.columns([1, 2, 1])
+    with col_prev:
+        if st.button("◀ Previous", key=f"{key}_prev", disabled=not has_prev or page.empty):
+            state.update(after=None, before=int(page[key_column].iloc[0]), page=state["page"] - 1)
+            if state["page"] == 1:
+                state["before"] = None
+            st.rerun()
+    with col_page:
+        st.caption(f"Page {state['page']}")
+    with col_next:
+        if st.button("Next ▶", key=f"{key}_next", disabled=not has_next or page.empty):
+            state.update(after=int(page[key_column].iloc[-1]), before=None, page=state["page"] + 1)
+            st.rerun()
+
+    return page
@@ -0,0 +1,85 @@
+"""Compare the old pandas groupby path with the SQL aggregations.
+
+Run from the project root:
+    python -m benchmarks.bench_aggregations --sizes 10000 100000 1000000
+"""
+import argparse
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from app.data import aggregations
+from app.data.cache import result_cache
+from app.data.changes import clear_delta_frames
+from benchmarks.synthetic import BENCH_SIZES, populate
+
+
+def pandas_path(conn):
+    """What the dashboards did before: load everything and group in pandas.
+
+    The queries are the original get_all_incidents and get_all_tickets, those
+    functions now return delta-refreshed compact frames.
+    """
+    incidents = pd.read_sql_query("SELECT * FROM cyber_incidents ORDER BY incident_id DESC", conn)
+    incidents['timestamp'] = pd.to_datetime(incidents['timestamp'], format='ISO8601')
+    incidents.groupby("category").size()
+    incidents.groupby("severity").size()
+    incidents.groupby(incidents['timestamp'].dt.date).size()
+
+    tickets = pd.read_sql_query("SELECT * FROM it_tickets ORDER BY ticket_id DESC", conn)
+    tickets.groupby("priority").size()
+    tickets.groupby("status").size()
+    tickets[tickets['status'] == "Open"].groupby("assigned_to").size()
+    tickets[tickets['resolution_time_hours'] > 48]
+
+
+def sql_path(conn):
+    """The same charts answered by app.data.aggregations."""
+    aggregations.get_incident_metrics(conn)
+    aggregations.get_incident_counts_by_category(conn)
+    aggregations.get_incident_counts_by_severity(conn)
+    aggregations.get_incident_counts_by_date(conn)
+
+    aggregations.get_ticket_metrics(conn)
+    aggregations.get_ticket_counts_by_priority(conn)
+    aggregations.get_ticket_counts_by_status(conn)
+    aggregations.get_open_tickets_by_staff(conn)
+    aggregations.get_long_running_tickets(conn)
+
+
+def best_of(func, conn, repeat):
+    timings = []
+    for _ in range(repeat):
+        #measure the queries, not the result cache or the delta-refreshed frames
+        result_cache.clear()
+        clear_delta_frames()
+        started = time.perf_counter()
+        func(conn)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=BENCH_SIZES)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'pandas (s)':>12} {'sql (s)':>10} {'speedup':>8}")
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            conn = sqlite3.connect(str(Path(tmp) / "bench.db"))
+            populate(conn, incidents=size, tickets=size)
+            conn.execute("ANALYZE")
+
+            pandas_time = best_of(pandas_path, conn, args.repeat)
+            sql_time = best_of(sql_path, conn, args.repeat)
+            conn.close()
+        print(f"{size:>10} {pandas_time:>12.3f} {sql_time:>10.3f} {pandas_time / sql_time:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Concurrent login benchmark for the bcrypt auth pool.
+
+Run from the project root:
+    python -m benchmarks.bench_auth --concurrency 1 2 4 8 16 32 64
+"""
+import argparse
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import bcrypt
+
+from app.data.migrations import migrate
+from app.services.auth_executor import _percentile
+from app.services import auth_executor as auth
+from app.services.bcrypt_cost import get_target_cost
+from app.services.user_service import login_user
+
+PASSWORD = "Benchmark1"
+
+
+def run_logins(db_path, users, concurrency):
+    """Fire concurrency logins at once and return (elapsed, latencies, failures)."""
+    barrier = threading.Barrier(concurrency)
+    latencies = []
+    failures = []
+    lock = threading.Lock()
+
+    def worker(i):
+        conn = sqlite3.connect(db_path)
+        barrier.wait()
+        started = time.perf_counter()
+        ok, message = login_user(conn, users[i % len(users)], PASSWORD)
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies.append(elapsed)
+            if not ok:
+                failures.append(message)
+        conn.close()
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - started, sorted(latencies), failures
+
+
+def stored_hashes(db_path):
+    """username -> password hash of every user."""
+    conn = sqlite3.connect(db_path)
+    hashes = dict(conn.execute("SELECT username, password_hash FROM users"))
+    conn.close()
+    return hashes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32, 64])
+    parser.add_argument("--rounds", type=int, default=None,
+                        help="bcrypt cost of the test users (default: the target cost, so logins don't rehash)")
+    parser.add_argument("--workers", type=int, default=None, help="auth pool size (default: CPU count)")
+    args = parser.parse_args()
+
+    if args.workers:
+        #resize the shared executor in place, user_service holds its own reference to it
+        auth.auth_executor.resize(args.workers)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = str(Path(tmp) / "bench.db")
+        conn = sqlite3.connect(db_path)
+        migrate(conn, analyze=False)
+        rounds = args.rounds or get_target_cost(wait=True)
+        password_hash = bcrypt.hashpw(PASSWORD.encode("utf-8"), bcrypt.gensalt(rounds)).decode("utf-8")
+        users = [f"user{i}" for i in range(8)]
+        conn.executemany(
+            "INSERT INTO users (username, password_hash) VALUES (?, ?)",
+            [(u, password_hash) for u in users],
+        )
+        conn.commit()
+        conn.close()
+
+        print(f"Test users hashed at cost {rounds}, target cost is {get_target_cost(wait=True)}, "
+              f"{auth.auth_executor.workers} auth workers")
+        print(f"{'logins':>7} {'total (s)':>10} {'logins/s':>9} {'p50 (ms)':>9} {'p95 (ms)':>9} {'failed':>7} "
+              f"{'rehashed':>9}")
+        for concurrency in args.concurrency:
+            before = stored_hashes(db_path)
+            elapsed, latencies, failures = run_logins(db_path, users, concurrency)
+            #a login off the target cost also rehashes and stores the password, so it is slower than a plain one
+            rehashed = sum(1 for user, stored in stored_hashes(db_path).items() if stored != before[user])
+            print(
+                f"{concurrency:>7} {elapsed:>10.2f} {concurrency / elapsed:>9.1f} "
+                f"{_percentile(latencies, 50) * 1000:>9.0f} {_percentile(latencies, 95) * 1000:>9.0f} "
+                f"{len(failures):>7} {rehashed:>9}"
+            )
+
+
+if __name__ == "__main__":
+    main()
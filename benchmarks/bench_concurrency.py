@@ -0,0 +1,218 @@
+"""Stress the data layer with concurrent reader and writer threads and report throughput and errors.
+
+Runs the same workload twice against a synthetic tickets table:
+  direct  every thread has its own read-write connection and commits its own writes
+  split   readers use the read-only pool, writers go through the group-commit writer
+A loader thread can also load a tickets CSV over and over the whole time.
+
+Run from the project root:
+    python -m benchmarks.bench_concurrency --readers 8 --writers 4 --duration 10
+"""
+import argparse
+import contextlib
+import io
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+from app.data import aggregations, rankings, tickets
+from app.data.cache import result_cache
+from app.data.changes import clear_delta_frames
+from app.data.db import ConnectionPool, busy_stats, configure_connection, connect_database
+from app.data.writer import GroupCommitWriter
+from benchmarks.synthetic import _staff_names, generate_tickets, populate
+
+MODES = ("direct", "split")
+
+# Error messages kept per run, the rest are only counted
+MAX_ERROR_SAMPLES = 5
+
+
+def write_load_csv(path, n, seed=7):
+    """A tickets CSV of n rows for the loader thread."""
+    rng = np.random.default_rng(seed)
+    generate_tickets(rng, n, _staff_names("IT_Support", n)).to_csv(path, index=False)
+
+
+def populate_file(path, n):
+    """A database file with n synthetic tickets."""
+    conn = configure_connection(sqlite3.connect(str(path)))
+    populate(conn, tickets=n)
+    conn.close()
+
+
+def read_ops():
+    """Dashboard reads, each taking a connection."""
+    return [
+        lambda conn: tickets.get_tickets_page(conn, limit=50),
+        lambda conn: tickets.count_tickets(conn, status="Open"),
+        lambda conn: aggregations.get_ticket_metrics(conn, long_threshold=48),
+        lambda conn: aggregations.get_ticket_counts_by_status(conn),
+        lambda conn: rankings.top_staff_by_open_tickets(conn, k=10),
+    ]
+
+
+def write_ops(max_id):
+    """Single-ticket writes as (function, args) for either write path."""
+    def insert(rng):
+        return tickets.insert_ticket, ("Low", "stress", "Open", "IT_Support_1", "2025-01-01 00:00:00", None)
+
+    def update(rng):
+        return tickets.update_ticket_status, (rng.randint(1, max_id), rng.choice(["Open", "In Progress", "Resolved"]))
+
+    return [insert, update]
+
+
+class _Tally:
+    """Per-kind operation counts, latencies and errors shared by the worker threads."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {"read": [], "write": [], "load": []}
+        self.errors = {"read": 0, "write": 0, "load": 0}
+        self.samples = []
+
+    def ok(self, kind, seconds):
+        with self.lock:
+            self.latencies[kind].append(seconds)
+
+    def failed(self, kind, error):
+        with self.lock:
+            self.errors[kind] += 1
+            if len(self.samples) < MAX_ERROR_SAMPLES:
+                self.samples.append(f"{kind}: {type(error).__name__}: {error}")
+
+
+def _timed_op(tally, kind, func):
+    started = time.perf_counter()
+    try:
+        func()
+    except Exception as e:
+        tally.failed(kind, e)
+    else:
+        tally.ok(kind, time.perf_counter() - started)
+
+
+def run_mode(mode, path, readers, writers, duration, load_csv, max_id, seed=0):
+    """Run the workload for duration seconds and return a dict of throughput and error stats."""
+    tally = _Tally()
+    stop = threading.Event()
+    read_pool = ConnectionPool(path, max_size=readers, read_only=True) if mode == "split" else None
+    writer = GroupCommitWriter(path) if mode == "split" else None
+
+    def reader(index):
+        rng = random.Random(seed + index)
+        ops = read_ops()
+        conn = connect_database(path) if mode == "direct" else None
+        while not stop.is_set():
+            op = rng.choice(ops)
+            if mode == "direct":
+                _timed_op(tally, "read", lambda: op(conn))
+            else:
+                def pooled():
+                    with read_pool.connection() as pooled_conn:
+                        op(pooled_conn)
+                _timed_op(tally, "read", pooled)
+        if conn is not None:
+            conn.close()
+
+    def write(index):
+        rng = random.Random(seed + 1000 + index)
+        ops = write_ops(max_id)
+        conn = connect_database(path) if mode == "direct" else None
+        while not stop.is_set():
+            func, args = rng.choice(ops)(rng)
+            if mode == "direct":
+                _timed_op(tally, "write", lambda: func(conn, *args))
+            else:
+                _timed_op(tally, "write", lambda: writer.write(func, *args, tables=("it_tickets",)))
+        if conn is not None:
+            conn.close()
+
+    def load():
+        #CSV loads write on their own connection and hold the write lock for the whole file
+        conn = connect_database(path)
+        while not stop.is_set():
+            _timed_op(tally, "load", lambda: tickets.load_it_ticket_data_to_sql(conn, load_csv))
+        conn.close()
+
+    threads = [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+    threads += [threading.Thread(target=write, args=(i,)) for i in range(writers)]
+    if load_csv:
+        threads.append(threading.Thread(target=load))
+
+    busy_before = busy_stats()
+    result_cache.clear()
+    clear_delta_frames()
+    started = time.perf_counter()
+    #the CSV loader reports every load, keep it out of the results table
+    with contextlib.redirect_stdout(io.StringIO()):
+        for thread in threads:
+            thread.start()
+        time.sleep(duration)
+        stop.set()
+        for thread in threads:
+            thread.join()
+    elapsed = time.perf_counter() - started
+
+    if writer is not None:
+        writer.stop()
+    if read_pool is not None:
+        read_pool.close_all()
+
+    busy_after = busy_stats()
+    result = {"mode": mode, "seconds": elapsed, "errors": tally.samples,
+              "busy_retries": busy_after["retries"] - busy_before["retries"]}
+    for kind, latencies in tally.latencies.items():
+        done, failed = len(latencies), tally.errors[kind]
+        result[kind] = {
+            "ops": done,
+            "per_second": done / elapsed,
+            "p95_ms": float(np.percentile(latencies, 95)) * 1000 if latencies else None,
+            "errors": failed,
+            "error_rate": failed / (done + failed) if done + failed else 0.0,
+        }
+    return result
+
+
+def _format_kind(stats):
+    p95 = f"{stats['p95_ms']:.1f}" if stats["p95_ms"] is not None else "-"
+    return f"{stats['per_second']:>9.1f} {p95:>9} {stats['errors']:>6} {stats['error_rate']:>6.1%}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per mode")
+    parser.add_argument("--rows", type=int, default=100_000, help="tickets in the table to start with")
+    parser.add_argument("--load-rows", type=int, default=20_000,
+                        help="rows in the CSV the loader thread loads, 0 for no loader")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    args = parser.parse_args()
+
+    print(f"{'mode':<7} {'kind':<6} {'ops/s':>9} {'p95 (ms)':>9} {'errors':>6} {'rate':>6}")
+    for mode in args.modes:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "stress.db"
+            populate_file(path, args.rows)
+            load_csv = None
+            if args.load_rows:
+                load_csv = Path(tmp) / "load_tickets.csv"
+                write_load_csv(load_csv, args.load_rows)
+            result = run_mode(mode, path, args.readers, args.writers, args.duration, load_csv, args.rows)
+        for kind in ("read", "write", "load"):
+            if result[kind]["ops"] or result[kind]["errors"]:
+                print(f"{mode:<7} {kind:<6} {_format_kind(result[kind])}")
+        print(f"{mode:<7} busy retries: {result['busy_retries']}")
+        for sample in result["errors"]:
+            print(f"        ⚠️ {sample}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Compare loading everything and sorting in pandas with the ranking queries in app.data.rankings.
+
+Run from the project root:
+    python -m benchmarks.bench_rankings --sizes 10000 100000 1000000
+"""
+import argparse
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+from app.data import rankings
+from app.data.cache import result_cache
+from app.data.changes import clear_delta_frames
+from app.data.datasets import get_all_datasets
+from app.data.db import configure_connection
+from app.data.tickets import get_all_tickets
+from benchmarks.synthetic import BENCH_SIZES, populate
+
+TOP_K = 5
+
+
+def full_load_cases(conn):
+    """What the dashboards did before: load the table and sort or group it in pandas."""
+    def slowest_staff():
+        tickets = get_all_tickets(conn)
+        resolved = tickets[tickets["status"].isin(["Resolved", "Closed"])]
+        return resolved.groupby("assigned_to", observed=True)["resolution_time_hours"].mean().nlargest(TOP_K)
+
+    return {
+        "largest_datasets": lambda: get_all_datasets(conn).nlargest(TOP_K, "rows"),
+        "smallest_datasets": lambda: get_all_datasets(conn).nsmallest(TOP_K, "rows"),
+        "staff_by_open_tickets": lambda: get_all_tickets(conn).query("status == 'Open'")
+                                         .groupby("assigned_to", observed=True).size().nlargest(TOP_K),
+        "staff_by_resolution_time": slowest_staff,
+    }
+
+
+def ranked_cases(conn):
+    """The same lists answered by app.data.rankings."""
+    return {
+        "largest_datasets": lambda: rankings.top_datasets_by_rows(conn, k=TOP_K),
+        "smallest_datasets": lambda: rankings.top_datasets_by_rows(conn, k=TOP_K, largest=False),
+        "staff_by_open_tickets": lambda: rankings.top_staff_by_open_tickets(conn, k=TOP_K),
+        "staff_by_resolution_time": lambda: rankings.top_staff_by_resolution_time(conn, k=TOP_K),
+    }
+
+
+def best_of(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        #measure the queries, not the result cache or the delta-refreshed frames
+        result_cache.clear()
+        clear_delta_frames()
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=BENCH_SIZES)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'case':<26} {'full load (s)':>14} {'ranked (s)':>11} {'speedup':>8}")
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            conn = configure_connection(sqlite3.connect(str(Path(tmp) / "bench.db")))
+            populate(conn, tickets=size, datasets=size)
+            full, ranked = full_load_cases(conn), ranked_cases(conn)
+            for name in ranked:
+                full_time = best_of(full[name], args.repeat)
+                ranked_time = best_of(ranked[name], args.repeat)
+                print(f"{size:>10} {name:<26} {full_time:>14.4f} {ranked_time:>11.4f} "
+                      f"{full_time / ranked_time:>7.0f}x")
+            conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""Time cold start and first render of the Streamlit entry points, and what they import to get there.
+
+Every case runs in a fresh interpreter under python -X importtime against a
+copy of the database: the login screen, each page for a visitor who isn't
+logged in, and each page for a logged-in admin.
+
+Run from the project root:
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --repeat 5 --out startup.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# (script, logged in) for every case
+CASES = [
+    ("Home.py", False),
+    ("pages/1_Cyber_Security_Dashboard.py", False),
+    ("pages/1_Cyber_Security_Dashboard.py", True),
+    ("pages/2_IT_Opereations_Dashboard.py", True),
+    ("pages/3_Data_Science_Dashboard.py", True),
+    ("pages/4_Settings.py", True),
+]
+
+# Modules worth reporting when a render pulls them in
+HEAVY_MODULES = ("pandas", "numpy", "plotly.express", "bcrypt")
+
+# Printed to stderr between importing the test harness and rendering, imports after it belong to the page
+MARKER = "-- first render --"
+
+_PROBE = """
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+launched = float(sys.argv[1])
+at = AppTest.from_file(sys.argv[2], default_timeout=120)
+if sys.argv[3] == "1":
+    at.session_state["logged_in"] = True
+    at.session_state["username"] = "bench"
+    at.session_state["role"] = "admin"
+print({marker!r}, file=sys.stderr, flush=True)
+started = time.perf_counter()
+at.run()
+first = time.perf_counter() - started
+cold = time.time() - launched
+print({marker!r}, file=sys.stderr, flush=True)
+started = time.perf_counter()
+at.run()
+again = time.perf_counter() - started
+print(json.dumps({{
+    "cold_start_s": cold,
+    "first_render_s": first,
+    "rerender_s": again,
+    "exceptions": [e.message for e in at.exception],
+    "heavy_modules": [m for m in {heavy!r} if m in sys.modules],
+}}))
+""".format(marker=MARKER, heavy=HEAVY_MODULES)
+
+
+def render_imports(stderr):
+    """Modules first imported during the first render, with their cumulative import time in seconds."""
+    sections = stderr.split(MARKER)
+    if len(sections) < 3:
+        return {}
+    imports = {}
+    for line in sections[1].splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|", 2)
+        #top-level imports have a single space before the name, nested ones are indented further
+        if name.startswith("  "):
+            continue
+        imports[name.strip()] = int(cumulative) / 1e6
+    return imports
+
+
+def run_case(script, logged_in, db_path):
+    """One fresh interpreter rendering script twice, returns its timings and imports."""
+    env = dict(os.environ, APP_DB_PATH=str(db_path), PYTHONPATH=str(ROOT), PYTHONWARNINGS="ignore")
+    launched = time.time()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _PROBE, str(launched), str(ROOT / script), "1" if logged_in else "0"],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"{script} failed:\n{proc.stderr[-2000:]}")
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    imports = render_imports(proc.stderr)
+    result["render_import_s"] = sum(imports.values())
+    result["render_imports"] = len(imports)
+    result["slowest_imports"] = sorted(imports.items(), key=lambda item: -item[1])[:5]
+    return result
+
+
+def prepare_database(tmp):
+    """A migrated copy of the app database, so renders measure the page rather than the migrations."""
+    from app.data.db import DB_PATH, connect_database
+    from app.data.migrations import migrate
+
+    db_path = Path(tmp) / "startup.db"
+    shutil.copy(DB_PATH, db_path)
+    conn = connect_database(db_path)
+    with contextlib.redirect_stdout(io.StringIO()):
+        migrate(conn)
+    conn.close()
+    return db_path
+
+
+def summarize(runs):
+    """Median timings over repeated runs of one case, imports and exceptions from the last run."""
+    summary = dict(runs[-1])
+    for name in ("cold_start_s", "first_render_s", "rerender_s", "render_import_s"):
+        summary[name] = statistics.median(run[name] for run in runs)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3, help="fresh interpreters per case, the median is reported")
+    parser.add_argument("--out", help="write the results to this JSON file")
+    parser.add_argument("--verbose", action="store_true", help="also list the slowest imports of each render")
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'script':<38} {'user':<9} {'cold (ms)':>10} {'render (ms)':>12} {'rerun (ms)':>11} "
+          f"{'imports (ms)':>13}  heavy modules")
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = prepare_database(tmp)
+        for script, logged_in in CASES:
+            summary = summarize([run_case(script, logged_in, db_path) for _ in range(args.repeat)])
+            summary.update(script=script, logged_in=logged_in)
+            results.append(summary)
+            user = "admin" if logged_in else "anonymous"
+            print(f"{script:<38} {user:<9} {summary['cold_start_s'] * 1000:>10.0f} "
+                  f"{summary['first_render_s'] * 1000:>12.0f} {summary['rerender_s'] * 1000:>11.0f} "
+                  f"{summary['render_import_s'] * 1000:>13.0f}  {', '.join(summary['heavy_modules']) or '-'}")
+            if summary["exceptions"]:
+                print(f"{'':<38} ⚠️ {summary['exceptions'][0]}")
+            if args.verbose:
+                for name, seconds in summary["slowest_imports"]:
+                    print(f"{'':<48} {name:<40} {seconds * 1000:>8.1f} ms")
+
+    if args.out:
+        Path(args.out).write_text(json.dumps({"repeat": args.repeat, "results": results}, indent=2))
+        print(f"✅ Wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,340 @@
+"""Time the data layer, CSV loaders and dashboard aggregations on synthetic data.
+
+Run from the project root:
+    python -m benchmarks.suite --scales 10000 100000 1000000 --out bench.json
+    python -m benchmarks.suite --scales 100000 --compare bench.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import platform
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from app.data import aggregations, datasets, incidents, rankings, tickets, users
+from app.data.cache import result_cache
+from app.data.changes import clear_delta_frames
+from app.data.db import configure_connection
+from app.data.ingest import peak_rss_mb
+from app.data.migrations import migrate
+from app.data.rollups import get_incident_trend, get_ticket_trend
+from app.data.search import search_incidents, search_tickets
+from app.data.sla import get_resolution_percentiles
+from app.data.snapshots import SNAPSHOT_COLUMNS, refresh_snapshot, snapshot_frame
+from app.data.spikes import detect_spikes
+from app.services.user_service import migrate_users_from_file
+from benchmarks.synthetic import END_DATE, write_synthetic_data
+
+# Functions that read whole tables are skipped above this many rows
+FULL_SCAN_MAX_ROWS = 1_000_000
+
+# Slowdown against the baseline reported as a regression by --compare
+REGRESSION_TOLERANCE = 0.25
+
+# Slowdowns smaller than this are timer noise on millisecond-scale cases
+REGRESSION_MIN_SECONDS = 0.005
+
+# Rows per call for the *_many write cases
+BATCH = 1_000
+
+
+def _quiet(func, *args, **kwargs):
+    #loaders and migrations print progress, keep it out of the results table
+    with contextlib.redirect_stdout(io.StringIO()):
+        return func(*args, **kwargs)
+
+
+def measure(func, repeat):
+    """Best wall time over repeat runs plus the Python peak allocation of one more traced run."""
+    timings = []
+    for _ in range(repeat):
+        #measure the queries, not the result cache or the delta-refreshed frames
+        result_cache.clear()
+        clear_delta_frames()
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+
+    result_cache.clear()
+    clear_delta_frames()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return min(timings), peak / 2 ** 20
+
+
+def measure_delta(write, read, repeat):
+    """Best wall time of read right after write, with read's frame loaded before the first write."""
+    read()
+    timings = []
+    for _ in range(repeat):
+        write()
+        started = time.perf_counter()
+        read()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def load_cases(conn, files):
+    """(name, func) for each loader, run once in order against an empty database."""
+    return [
+        ("load_incident_data_to_sql",
+         lambda: incidents.load_incident_data_to_sql(conn, files["cyber_incidents"]["path"])),
+        ("load_it_ticket_data_to_sql",
+         lambda: tickets.load_it_ticket_data_to_sql(conn, files["it_tickets"]["path"])),
+        ("load_datasets_metadata_to_sql",
+         lambda: datasets.load_datasets_metadata_to_sql(conn, files["datasets_metadata"]["path"])),
+        ("migrate_users_from_file",
+         lambda: migrate_users_from_file(conn, files["users"]["path"])),
+    ]
+
+
+def query_cases(conn, scale):
+    """(group, name, func) for every read path the dashboards use."""
+    middle_incident = scale // 2
+    middle_ticket = scale // 2
+    as_of = END_DATE.date()
+    cases = [
+        ("read", "get_incidents_page", lambda: incidents.get_incidents_page(conn, limit=26)),
+        ("read", "get_incidents_page_deep", lambda: incidents.get_incidents_page(conn, limit=26, after_id=middle_incident)),
+        ("read", "get_incidents_page_filtered",
+         lambda: incidents.get_incidents_page(conn, limit=26, severity="Critical", status="Open")),
+        ("read", "count_incidents", lambda: incidents.count_incidents(conn, severity="High")),
+        ("read", "get_tickets_page", lambda: tickets.get_tickets_page(conn, limit=26)),
+        ("read", "get_tickets_page_deep", lambda: tickets.get_tickets_page(conn, limit=26, after_id=middle_ticket)),
+        ("read", "count_tickets", lambda: tickets.count_tickets(conn, status="Open")),
+        ("read", "get_datasets_page", lambda: datasets.get_datasets_page(conn, limit=26)),
+        ("read", "count_datasets", lambda: datasets.count_datasets(conn)),
+        ("read", "get_users_page", lambda: users.get_users_page(conn, limit=26)),
+        ("read", "get_user_by_username", lambda: users.get_user_by_username(conn, "user1")),
+        ("read", "get_all_incidents", lambda: incidents.get_all_incidents(conn)),
+        ("read", "get_all_tickets", lambda: tickets.get_all_tickets(conn)),
+        ("read", "get_all_datasets", lambda: datasets.get_all_datasets(conn)),
+        ("read", "get_all_users", lambda: users.get_all_users(conn)),
+        ("read", "snapshot_frame_incidents", lambda: snapshot_frame(conn, "cyber_incidents")),
+        ("read", "snapshot_frame_tickets", lambda: snapshot_frame(conn, "it_tickets")),
+
+        ("aggregate", "get_incident_metrics", lambda: aggregations.get_incident_metrics(conn)),
+        ("aggregate", "get_incident_counts_by_category", lambda: aggregations.get_incident_counts_by_category(conn)),
+        ("aggregate", "get_incident_counts_by_severity", lambda: aggregations.get_incident_counts_by_severity(conn)),
+        ("aggregate", "get_incident_counts_by_date", lambda: aggregations.get_incident_counts_by_date(conn)),
+        ("aggregate", "get_avg_resolution_by_category", lambda: aggregations.get_avg_resolution_by_category(conn)),
+        ("aggregate", "get_unresolved_incidents_by_assignee",
+         lambda: aggregations.get_unresolved_incidents_by_assignee(conn)),
+        ("aggregate", "get_ticket_metrics", lambda: aggregations.get_ticket_metrics(conn)),
+        ("aggregate", "get_ticket_counts_by_priority", lambda: aggregations.get_ticket_counts_by_priority(conn)),
+        ("aggregate", "get_ticket_counts_by_status", lambda: aggregations.get_ticket_counts_by_status(conn)),
+        ("aggregate", "get_long_running_tickets", lambda: aggregations.get_long_running_tickets(conn)),
+        ("aggregate", "get_open_tickets_by_staff", lambda: aggregations.get_open_tickets_by_staff(conn)),
+        ("aggregate", "get_dataset_metrics", lambda: aggregations.get_dataset_metrics(conn)),
+        ("aggregate", "get_dataset_counts_by_uploader", lambda: aggregations.get_dataset_counts_by_uploader(conn)),
+        ("aggregate", "get_incident_trend_day", lambda: get_incident_trend(conn, "day")),
+        ("aggregate", "get_incident_trend_hour", lambda: get_incident_trend(conn, "hour", by="severity")),
+        ("aggregate", "get_ticket_trend_week", lambda: get_ticket_trend(conn, "week", by="priority")),
+        ("aggregate", "detect_spikes", lambda: detect_spikes(conn, as_of=as_of)),
+        ("aggregate", "resolution_percentiles_priority", lambda: get_resolution_percentiles(conn, by="priority")),
+        ("aggregate", "resolution_percentiles_month", lambda: get_resolution_percentiles(conn, by="month")),
+
+        ("rank", "top_datasets_by_rows", lambda: rankings.top_datasets_by_rows(conn)),
+        ("rank", "bottom_datasets_by_rows", lambda: rankings.top_datasets_by_rows(conn, largest=False)),
+        ("rank", "top_staff_by_open_tickets", lambda: rankings.top_staff_by_open_tickets(conn)),
+        ("rank", "top_staff_by_resolution_time", lambda: rankings.top_staff_by_resolution_time(conn)),
+
+        ("search", "search_incidents_ip", lambda: search_incidents(conn, "10.84.192.1")),
+        ("search", "search_incidents_common", lambda: search_incidents(conn, "ransomware")),
+        ("search", "search_incidents_prefix", lambda: search_incidents(conn, "exfil*", severity="High")),
+        ("search", "search_tickets", lambda: search_tickets(conn, "vpn password", status="Open")),
+    ]
+    return cases
+
+
+def delta_cases(conn, scale):
+    """(group, name, write, read) for reading a whole table again after one small write."""
+    now = END_DATE.strftime("%Y-%m-%d %H:%M:%S")
+    ticket_row = ("High", "Benchmark ticket", "Open", "IT_Support_000", now, 4)
+    return [
+        ("delta", "get_all_tickets_after_insert",
+         lambda: tickets.insert_ticket(conn, *ticket_row), lambda: tickets.get_all_tickets(conn)),
+        ("delta", "get_all_tickets_after_update",
+         lambda: tickets.update_ticket_status(conn, scale // 2, "Resolved"), lambda: tickets.get_all_tickets(conn)),
+        ("delta", "get_all_incidents_after_update",
+         lambda: incidents.update_incident_status(conn, scale // 2, "Closed"), lambda: incidents.get_all_incidents(conn)),
+    ]
+
+
+def write_cases(conn, scale):
+    """(group, name, func) for the single-row and batched write paths."""
+    rng = np.random.default_rng(0)
+    now = END_DATE.strftime("%Y-%m-%d %H:%M:%S")
+    incident_row = (now, "High", "Malware", "Open", "Benchmark incident")
+    ticket_row = ("High", "Benchmark ticket", "Open", "IT_Support_000", now, 4)
+
+    def random_ids():
+        return rng.integers(1, scale + 1, size=BATCH).tolist()
+
+    def insert_and_delete_incident():
+        incidents.delete_incident(conn, incidents.insert_incident(conn, *incident_row))
+
+    def insert_and_delete_ticket():
+        tickets.delete_ticket(conn, tickets.insert_ticket(conn, *ticket_row))
+
+    return [
+        ("write", "insert_delete_incident", insert_and_delete_incident),
+        ("write", "update_incident_status", lambda: incidents.update_incident_status(conn, scale // 3, "Resolved")),
+        ("write", "insert_incidents_many", lambda: incidents.insert_incidents_many(conn, [incident_row] * BATCH)),
+        ("write", "update_incident_status_many",
+         lambda: incidents.update_incident_status_many(conn, random_ids(), "In Progress")),
+        ("write", "insert_delete_ticket", insert_and_delete_ticket),
+        ("write", "update_ticket_status", lambda: tickets.update_ticket_status(conn, scale // 3, "Resolved")),
+        ("write", "insert_tickets_many", lambda: tickets.insert_tickets_many(conn, [ticket_row] * BATCH)),
+        ("write", "update_ticket_status_many",
+         lambda: tickets.update_ticket_status_many(conn, random_ids(), "In Progress")),
+    ]
+
+
+def run_scale(scale, repeat, seed, work_dir, progress):
+    """Generate data at one scale, run every case against it and return the result records."""
+    results = []
+
+    def record(group, name, seconds, peak_mb=None, rows=None):
+        #peak_mb is what this case allocated, peak_rss_mb the process high-water mark so far
+        rss = peak_rss_mb()
+        entry = {
+            "scale": scale, "group": group, "name": name, "seconds": round(seconds, 6),
+            "peak_mb": None if peak_mb is None else round(peak_mb, 2),
+            "peak_rss_mb": None if rss is None else round(rss, 1),
+        }
+        if rows is not None:
+            entry["rows_per_sec"] = round(rows / seconds) if seconds else None
+        results.append(entry)
+        progress(entry)
+
+    data_dir = Path(work_dir) / f"data_{scale}"
+    started = time.perf_counter()
+    files = write_synthetic_data(data_dir, scale, seed=seed)
+    record("generate", "write_synthetic_data", time.perf_counter() - started,
+           rows=sum(info["rows"] for info in files.values()))
+
+    conn = configure_connection(sqlite3.connect(str(Path(work_dir) / f"bench_{scale}.db")))
+    _quiet(migrate, conn, analyze=False)
+
+    table_rows = {
+        "load_incident_data_to_sql": files["cyber_incidents"]["rows"],
+        "load_it_ticket_data_to_sql": files["it_tickets"]["rows"],
+        "load_datasets_metadata_to_sql": files["datasets_metadata"]["rows"],
+        "migrate_users_from_file": files["users"]["rows"],
+    }
+    #loads only run once, tracing them would double their cost for little insight
+    for name, func in load_cases(conn, files):
+        started = time.perf_counter()
+        _quiet(func)
+        record("load", name, time.perf_counter() - started, rows=table_rows[name])
+    conn.execute("ANALYZE")
+
+    #first build of the memory-mapped snapshots, later reads only map them
+    for table in SNAPSHOT_COLUMNS:
+        started = time.perf_counter()
+        refresh_snapshot(conn, table)
+        record("snapshot", f"build_{table}", time.perf_counter() - started, rows=files[table]["rows"])
+
+    for group, name, func in query_cases(conn, scale) + write_cases(conn, scale):
+        if name.startswith("get_all_") and scale > FULL_SCAN_MAX_ROWS:
+            continue
+        seconds, peak_mb = measure(func, repeat)
+        record(group, name, seconds, peak_mb)
+
+    if scale <= FULL_SCAN_MAX_ROWS:
+        for group, name, write, read in delta_cases(conn, scale):
+            record(group, name, measure_delta(write, read, repeat))
+
+    conn.close()
+    return results
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment(args):
+    """What a run was measured on, so results from different machines aren't compared blindly."""
+    return {
+        "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "scales": args.scales,
+        "repeat": args.repeat,
+        "seed": args.seed,
+    }
+
+
+def compare(results, baseline, tolerance=REGRESSION_TOLERANCE, min_seconds=REGRESSION_MIN_SECONDS):
+    """Return (key, old seconds, new seconds) for every case slower than baseline by more than tolerance."""
+    old = {(r["scale"], r["group"], r["name"]): r["seconds"] for r in baseline["results"]}
+    regressions = []
+    for r in results:
+        key = (r["scale"], r["group"], r["name"])
+        if key not in old or r["seconds"] - old[key] < min_seconds:
+            continue
+        if r["seconds"] > old[key] * (1 + tolerance):
+            regressions.append((key, old[key], r["seconds"]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON file to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=REGRESSION_TOLERANCE)
+    args = parser.parse_args()
+
+    def progress(entry):
+        peak = "" if entry["peak_mb"] is None else f"{entry['peak_mb']:>9.1f}"
+        print(f"{entry['scale']:>9} {entry['group']:<9} {entry['name']:<38} {entry['seconds'] * 1000:>10.1f} {peak:>9}")
+
+    run = {"environment": environment(args), "results": []}
+    print(f"{'scale':>9} {'group':<9} {'case':<38} {'ms':>10} {'peak MB':>9}")
+    with tempfile.TemporaryDirectory() as work_dir:
+        for scale in args.scales:
+            run["results"] += run_scale(scale, args.repeat, args.seed, work_dir, progress)
+
+    if args.out:
+        Path(args.out).write_text(json.dumps(run, indent=2))
+        print(f"✅ Results written to {args.out}")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        regressions = compare(run["results"], baseline, args.tolerance)
+        for (scale, group, name), old, new in regressions:
+            print(f"⚠️ {name} at {scale} rows: {old * 1000:.1f} ms -> {new * 1000:.1f} ms")
+        if regressions:
+            sys.exit(1)
+        print(f"✅ No regressions beyond {args.tolerance:.0%} against {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
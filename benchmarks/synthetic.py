@@ -0,0 +1,241 @@
+"""Generate deterministic synthetic data in the same CSV formats as DATA/.
+
+Run from the project root:
+    python -m benchmarks.synthetic --rows 1000000 --out /tmp/synthetic
+"""
+import argparse
+import contextlib
+import io
+import string
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+SEVERITIES = ["Low", "Medium", "High", "Critical"]
+SEVERITY_WEIGHTS = [0.40, 0.33, 0.20, 0.07]
+
+CATEGORIES = ["Phishing", "Malware", "Unauthorized Access", "DDoS", "Misconfiguration"]
+CATEGORY_WEIGHTS = [0.38, 0.25, 0.17, 0.12, 0.08]
+
+PRIORITIES = ["Low", "Medium", "High", "Critical"]
+PRIORITY_WEIGHTS = [0.35, 0.35, 0.22, 0.08]
+
+# Median hours to resolve per priority, resolution times are log-normal around these
+PRIORITY_MEDIAN_HOURS = {"Low": 72, "Medium": 36, "High": 12, "Critical": 4}
+
+INCIDENT_STATUSES = ["Open", "In Progress", "Resolved", "Closed"]
+TICKET_STATUSES = ["Open", "In Progress", "Resolved", "Waiting for User"]
+# Recent rows are mostly still open, older ones mostly done
+RECENT_STATUS_WEIGHTS = [0.55, 0.30, 0.10, 0.05]
+OLD_STATUS_WEIGHTS = [0.03, 0.04, 0.48, 0.45]
+RECENT_DAYS = 14
+
+# Share of events per hour of the day, busiest during working hours
+HOURLY_WEIGHTS = np.array([1, 1, 1, 1, 1, 2, 3, 5, 8, 9, 9, 8, 7, 8, 9, 9, 8, 6, 4, 3, 2, 2, 1, 1], dtype=float)
+
+DATASET_TOPICS = ["Customer_Churn", "Financial_Fraud", "Network_Traffic", "Sales_Forecast", "Sensor_Readings",
+                  "Clickstream", "Threat_Intel", "HR_Attrition", "Supply_Chain", "Support_Chats"]
+
+INCIDENT_WORDS = ["suspicious", "login", "beacon", "lateral", "movement", "credential", "dump", "ransomware",
+                  "exfiltration", "dns", "tunnel", "powershell", "macro", "payload", "scan", "bruteforce"]
+TICKET_WORDS = ["printer", "vpn", "password", "reset", "laptop", "email", "outlook", "disk", "full", "slow",
+                "network", "drive", "license", "install", "monitor", "access"]
+
+# Rows of the other tables generated per incident row
+TICKET_RATIO = 1.0
+DATASET_RATIO = 0.01
+USER_RATIO = 0.01
+
+CHUNK_ROWS = 500_000
+
+# Table sizes the query benchmarks run at by default
+BENCH_SIZES = [10_000, 100_000, 1_000_000]
+HISTORY_DAYS = 3 * 365
+END_DATE = pd.Timestamp("2025-12-31")
+
+_HASH_ALPHABET = np.array(list("./" + string.ascii_letters + string.digits))
+
+
+def _zipf_weights(n, s=1.1):
+    """Weights for n items where the k-th most common is 1/k^s as likely as the first."""
+    weights = 1.0 / np.arange(1, n + 1) ** s
+    return weights / weights.sum()
+
+
+def _staff_names(prefix, rows):
+    #more rows means a bigger team, but a few people still get most of the work
+    return [f"{prefix}_{i:03d}" for i in range(max(8, int(np.sqrt(rows) / 10)))]
+
+
+def _timestamps(rng, n):
+    """Event times over HISTORY_DAYS growing towards END_DATE, with daily and weekly cycles."""
+    #u ** 0.8 puts more events in recent days, like a growing organisation
+    days = np.floor(HISTORY_DAYS * rng.random(n) ** 0.8).astype(np.int64)
+    day = END_DATE.normalize() - pd.to_timedelta(days, unit="D")
+    #move most weekend events back to the Friday before
+    weekday = day.dayofweek.to_numpy()
+    weekend = (weekday >= 5) & (rng.random(n) < 0.6)
+    day = day - pd.to_timedelta(np.where(weekend, weekday - 4, 0), unit="D")
+    hours = rng.choice(24, size=n, p=HOURLY_WEIGHTS / HOURLY_WEIGHTS.sum())
+    seconds = hours * 3600 + rng.integers(0, 3600, size=n)
+    return pd.DatetimeIndex(day + pd.to_timedelta(seconds, unit="s"))
+
+
+def _statuses(rng, timestamps, statuses):
+    recent = (END_DATE - timestamps).days.to_numpy() < RECENT_DAYS
+    return np.where(
+        recent,
+        rng.choice(statuses, size=len(timestamps), p=RECENT_STATUS_WEIGHTS),
+        rng.choice(statuses, size=len(timestamps), p=OLD_STATUS_WEIGHTS),
+    )
+
+
+def _descriptions(rng, n, words, first_id, label):
+    picks = np.asarray(words)[rng.integers(0, len(words), size=(n, 3))]
+    octets = rng.integers(0, 256, size=(n, 2))
+    return [
+        f"{label} {first_id + i}: {a} {b} {c} on host 10.{o1}.{o2}.{i % 250 + 1}"
+        for i, ((a, b, c), (o1, o2)) in enumerate(zip(picks, octets))
+    ]
+
+
+def generate_incidents(rng, n, first_id=1):
+    """A DataFrame of n incidents shaped like DATA/cyber_incidents.csv."""
+    timestamps = _timestamps(rng, n)
+    return pd.DataFrame({
+        "incident_id": np.arange(first_id, first_id + n),
+        "timestamp": timestamps.strftime("%Y-%m-%d %H:%M:%S.%f"),
+        "severity": rng.choice(SEVERITIES, size=n, p=SEVERITY_WEIGHTS),
+        "category": rng.choice(CATEGORIES, size=n, p=CATEGORY_WEIGHTS),
+        "status": _statuses(rng, timestamps, INCIDENT_STATUSES),
+        "description": _descriptions(rng, n, INCIDENT_WORDS, first_id, "Incident"),
+    })
+
+
+def generate_tickets(rng, n, staff, first_id=1):
+    """A DataFrame of n tickets shaped like DATA/it_tickets.csv."""
+    timestamps = _timestamps(rng, n)
+    priority = rng.choice(PRIORITIES, size=n, p=PRIORITY_WEIGHTS)
+    median = pd.Series(priority).map(PRIORITY_MEDIAN_HOURS).to_numpy()
+    resolution = np.clip(rng.lognormal(np.log(median), 1.0), 1, 2000).astype(np.int64)
+    return pd.DataFrame({
+        "ticket_id": np.arange(first_id, first_id + n),
+        "priority": priority,
+        "description": _descriptions(rng, n, TICKET_WORDS, first_id, "Ticket"),
+        "status": _statuses(rng, timestamps, TICKET_STATUSES),
+        "assigned_to": rng.choice(staff, size=n, p=_zipf_weights(len(staff))),
+        "created_at": timestamps.strftime("%Y-%m-%d %H:%M:%S"),
+        "resolution_time_hours": resolution,
+    })
+
+
+def generate_datasets(rng, n, uploaders, first_id=1):
+    """A DataFrame of n dataset records shaped like DATA/datasets_metadata.csv."""
+    #row counts are heavy tailed: mostly tens of thousands, a few in the billions
+    rows = np.clip(rng.lognormal(np.log(50_000), 2.0, size=n), 10, 5_000_000_000).astype(np.int64)
+    return pd.DataFrame({
+        "dataset_id": np.arange(first_id, first_id + n),
+        "name": [f"{DATASET_TOPICS[t]}_{first_id + i}" for i, t in enumerate(rng.integers(0, len(DATASET_TOPICS), size=n))],
+        "rows": rows,
+        "columns": np.clip(rng.lognormal(np.log(20), 0.8, size=n), 2, 2000).astype(np.int64),
+        "uploaded_by": rng.choice(uploaders, size=n, p=_zipf_weights(len(uploaders))),
+        "upload_date": _timestamps(rng, n).strftime("%Y-%m-%d"),
+    })
+
+
+def generate_users(rng, n, first_id=1):
+    """Lines for users.txt. Hashes are well-formed bcrypt strings but match no password."""
+    salts = _HASH_ALPHABET[rng.integers(0, len(_HASH_ALPHABET), size=(n, 53))]
+    roles = np.where(rng.random(n) < 0.05, "admin", "user")
+    return [f"user{first_id + i},$2b$12${''.join(s)},{role}" for i, (s, role) in enumerate(zip(salts, roles))]
+
+
+def populate(conn, incidents=0, tickets=0, datasets=0, seed=42):
+    """Fill a new database with synthetic rows, loaded before the triggers exist and then migrated.
+
+    Loading first and letting the later migrations backfill the rollups,
+    search indexes and sketches is much faster than going through the triggers.
+    """
+    #imported here so generating CSVs doesn't need the app on the path
+    from app.data.migrations import migrate
+
+    rng = np.random.default_rng(seed)
+    with contextlib.redirect_stdout(io.StringIO()):
+        migrate(conn, target=1, analyze=False)
+        if incidents:
+            generate_incidents(rng, incidents).drop(columns="incident_id").to_sql(
+                "cyber_incidents", conn, if_exists="append", index=False)
+        if tickets:
+            generate_tickets(rng, tickets, _staff_names("IT_Support", tickets)).drop(columns="ticket_id").to_sql(
+                "it_tickets", conn, if_exists="append", index=False)
+        if datasets:
+            generate_datasets(rng, datasets, _staff_names("data_scientist", datasets)).drop(columns="dataset_id").to_sql(
+                "datasets_metadata", conn, if_exists="append", index=False)
+        conn.commit()
+        migrate(conn)
+
+
+def _write_chunks(path, total, make_chunk, chunk_rows):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        for index, start in enumerate(range(0, total, chunk_rows)):
+            chunk = make_chunk(index, start + 1, min(chunk_rows, total - start))
+            chunk.to_csv(f, header=index == 0, index=False)
+
+
+def write_synthetic_data(out_dir, rows, seed=42, chunk_rows=CHUNK_ROWS):
+    """Write cyber_incidents.csv, it_tickets.csv, datasets_metadata.csv and users.txt to out_dir.
+
+    rows is the incident count, the other tables are sized from it. The
+    output depends only on rows, seed and chunk_rows. Returns the paths and
+    row counts written.
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    counts = {
+        "cyber_incidents": rows,
+        "it_tickets": max(1, int(rows * TICKET_RATIO)),
+        "datasets_metadata": max(1, int(rows * DATASET_RATIO)),
+        "users": max(1, int(rows * USER_RATIO)),
+    }
+    staff = _staff_names("IT_Support", counts["it_tickets"])
+    uploaders = _staff_names("data_scientist", counts["datasets_metadata"])
+
+    def rng_for(table_index, chunk_index):
+        #independent stream per table and chunk so each file is reproducible on its own
+        return np.random.default_rng([seed, table_index, chunk_index])
+
+    paths = {name: out_dir / f"{name}.csv" for name in ("cyber_incidents", "it_tickets", "datasets_metadata")}
+    paths["users"] = out_dir / "users.txt"
+
+    _write_chunks(paths["cyber_incidents"], counts["cyber_incidents"],
+                  lambda i, first, n: generate_incidents(rng_for(0, i), n, first), chunk_rows)
+    _write_chunks(paths["it_tickets"], counts["it_tickets"],
+                  lambda i, first, n: generate_tickets(rng_for(1, i), n, staff, first), chunk_rows)
+    _write_chunks(paths["datasets_metadata"], counts["datasets_metadata"],
+                  lambda i, first, n: generate_datasets(rng_for(2, i), n, uploaders, first), chunk_rows)
+    with open(paths["users"], "w", encoding="utf-8") as f:
+        for index, start in enumerate(range(0, counts["users"], chunk_rows)):
+            n = min(chunk_rows, counts["users"] - start)
+            f.write("\n".join(generate_users(rng_for(3, index), n, start + 1)) + "\n")
+
+    return {name: {"path": str(paths[name]), "rows": counts[name]} for name in counts}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000, help="number of incidents, other tables scale from it")
+    parser.add_argument("--out", default="synthetic_data")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    written = write_synthetic_data(args.out, args.rows, seed=args.seed)
+    for name, info in written.items():
+        print(f"✅ {info['rows']:>10} rows -> {info['path']}")
+    print(f"Generated in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,11 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-from app.data.db import connect_database
-from app.data.incidents import (get_all_incidents, insert_incident, update_incident_status, delete_incident)
+from app.ui.session import restore_session
 
 st.set_page_config(page_title="Cyber Incidents Dashboard", page_icon="📊", layout="wide")
 
+#restore the login from a session token if there is one
+restore_session()
+
 #if logged in show dashboard content
 if not st.session_state.get("logged_in", False):
     st.error("You must be logged in to view the dashboard.")
@@ -13,22 +13,67 @@ if not st.session_state.get("logged_in", False):
         st.switch_page("Home.py")
     st.stop()
     
-#connecting to week8 database
-conn = connect_database()
+#the data layer, pandas and plotly only load once the page is actually going to render
+import plotly.express as px
+from app.data.db import get_connection, get_read_connection
+from app.data.writer import get_writer
+from app.data.incidents import (get_incidents_page, insert_incident, update_incident_status, delete_incident,
+                                update_incident_status_many, delete_incidents_many)
+from app.data.aggregations import (get_incident_metrics, get_incident_counts_by_category, get_incident_counts_by_severity,
+                                   get_avg_resolution_by_category)
+from app.data.rankings import top_analysts_by_unresolved_incidents
+from app.data.rollups import get_incident_trend
+from app.data.spikes import detect_spikes
+from app.data.search import search_incidents
+from app.ui.tables import paginated_table
+from app.ui.search import search_box
+from app.ui.charts import line_chart
+from app.services.instrumentation import PageTimer
+
+#time each section of this render, see the Settings page
+timer = PageTimer("Cyber Security")
+
+#reads go through the read-only connection, single-row writes commit on get_connection()
+#and the bulk actions go through the group-commit writer
+conn = get_read_connection()
 
 #page title
 st.title("📊 Cyber Incidents Dashboard")
 
-#read: display incidents as a table
-incidents = get_all_incidents(conn)
-
+#read: display incidents one page at a time
+timer.mark("All Incidents")
 st.subheader("All Incidents")
-if not incidents.empty:
-    st.dataframe(incidents, use_container_width=True)
-else:
-    st.info("No incidents found.")
+col_sev, col_cat, col_status = st.columns(3)
+with col_sev:
+    filter_severity = st.selectbox("Filter severity", ["All", "Low", "Medium", "High", "Critical"])
+with col_cat:
+    filter_category = st.selectbox("Filter category", ["All", "DDoS", "Malware", "Phishing", "Misconfiguration", "Unauthorized Access"])
+with col_status:
+    filter_status = st.selectbox("Filter status", ["All", "Open", "In Progress", "Resolved", "Closed"])
+
+page_filters = {
+    "severity": None if filter_severity == "All" else filter_severity,
+    "category": None if filter_category == "All" else filter_category,
+    "status": None if filter_status == "All" else filter_status,
+}
+incidents_page = paginated_table(
+    "incidents_table",
+    lambda **kwargs: get_incidents_page(conn, **kwargs),
+    "incident_id",
+    filters=page_filters,
+)
+
+#full-text search over incident descriptions, using the same filters as the table
+timer.mark("Search Incidents")
+st.subheader("Search Incidents")
+search_box(
+    "incident_search",
+    lambda query, **kwargs: search_incidents(conn, query, **kwargs),
+    filters=page_filters,
+)
 
 #create: insert new incident with a form
+timer.mark("Add New Incident")
 st.subheader("Add New Incident")
 with st.form("add_incident_form"):
     severity = st.selectbox("Severity",["Low", "Medium", "High", "Critical"])
@@ -43,15 +88,16 @@ if submitted:
     from datetime import datetime
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     #call week8 function to insert into database
-    insert_incident(conn, timestamp, severity, category, status, description)
+    insert_incident(get_connection(), timestamp, severity, category, status, description)
     st.success("Incident added successfully!")
     st.rerun()
 
 #updating incidents
+timer.mark("Update Incident")
 st.subheader("Update Incident")
-if not incidents.empty:
-    selected_id = st.selectbox("Select incident to update", incidents['incident_id'])
-    incident = incidents[incidents['incident_id'] == selected_id].iloc[0]
+if not incidents_page.empty:
+    selected_id = st.selectbox("Select incident to update", incidents_page['incident_id'])
+    incident = incidents_page[incidents_page['incident_id'] == selected_id].iloc[0]
 
     with st.form("update_incident_form"):
         new_status = st.selectbox(
@@ -60,15 +106,16 @@ if not incidents.empty:
             index=["Open", "In Progress", "Resolved"].index(incident['status'])
         )
         if st.form_submit_button("Update Incident"):
-            update_incident_status(conn, selected_id, new_status)
+            update_incident_status(get_connection(), selected_id, new_status)
             st.success("Incident updated!")
             st.rerun()
 
 #deleting incident
+timer.mark("Delete Incident")
 st.subheader("Delete Incident")
-if not incidents.empty:
-    selected_id = st.selectbox("Select incident to delete", incidents['incident_id'], key="delete_id")
-    incident = incidents[incidents['incident_id'] == selected_id].iloc[0]
+if not incidents_page.empty:
+    selected_id = st.selectbox("Select incident to delete", incidents_page['incident_id'], key="delete_id")
+    incident = incidents_page[incidents_page['incident_id'] == selected_id].iloc[0]
     
     #confirming deletion
     col1, col2 = st.columns([3, 1])
@@ -76,80 +123,104 @@ if not incidents.empty:
         st.warning("Are you sure you want to delete incident?")
     with col2:
         if st.button("Delete Incident", key="confirm_delete"):
-            delete_incident(conn, selected_id)
+            delete_incident(get_connection(), selected_id)
             st.success("Incident deleted!")
             st.rerun()
 
+#bulk actions on the incidents shown in the table, written as one transaction
+timer.mark("Bulk Actions")
+st.subheader("Bulk Actions")
+if not incidents_page.empty:
+    select_all = st.checkbox("Select all incidents on this page", key="bulk_incident_all")
+    if select_all:
+        bulk_ids = incidents_page['incident_id'].tolist()
+        st.caption(f"{len(bulk_ids)} incidents selected")
+    else:
+        bulk_ids = st.multiselect("Select incidents", incidents_page['incident_id'].tolist(), key="bulk_incident_ids")
+    col1, col2, col3 = st.columns([2, 1, 1])
+    with col1:
+        bulk_status = st.selectbox("New status", ["Open", "In Progress", "Resolved"], key="bulk_incident_status")
+    with col2:
+        if st.button("Update selected", key="bulk_update_incidents", disabled=not bulk_ids):
+            get_writer().write(update_incident_status_many, bulk_ids, bulk_status, tables=("cyber_incidents",))
+            st.success(f"{len(bulk_ids)} incidents updated!")
+            st.rerun()
+    with col3:
+        if st.button("Delete selected", key="bulk_delete_incidents", disabled=not bulk_ids):
+            get_writer().write(delete_incidents_many, bulk_ids, tables=("cyber_incidents",))
+            st.success(f"{len(bulk_ids)} incidents deleted!")
+            st.rerun()
+
+timer.mark("Security Metrics")
 st.subheader("Security Metrics")
-if not incidents.empty:
-    total_incidents = len(incidents)
-    high_severity = incidents['severity'].value_counts().get("High", 0)
-    st.metric("Total Incidents", total_incidents)
-    st.metric("High Severity Incidents", high_severity)
+metrics = get_incident_metrics(conn)
+if metrics["total"]:
+    st.metric("Total Incidents", metrics["total"])
+    st.metric("High Severity Incidents", metrics["high_severity"])
 
+timer.mark("Visual Analytics")
 st.subheader("Visual Analytics")
 
-if not incidents.empty:
-    #ensuring that created_at is datetime
-    incidents['timestamp'] = pd.to_datetime(incidents['timestamp'], format='ISO8601')
+if metrics["total"]:
     #bar chart to count incidents by type
-    threat_counts = incidents.groupby("category").size().reset_index(name="Count")
+    threat_counts = get_incident_counts_by_category(conn)
     fig_bar = px.bar(
         threat_counts,
         x="category",
-        y="Count",
+        y="count",
         title="Incident Type Distribution",
-        color="Count",
+        color="count",
         color_continuous_scale="Blues"
     )
     st.plotly_chart(fig_bar, use_container_width=True)
 
     #pie chart showing severity distribution
-    severity_counts = incidents.groupby("severity").size().reset_index(name="Count")
+    severity_counts = get_incident_counts_by_severity(conn)
     fig_pie = px.pie(
         severity_counts,
         names="severity",
-        values="Count",
+        values="count",
         title="Incident Severity Distribution",
         color_discrete_sequence=px.colors.sequential.RdBu
     )
     st.plotly_chart(fig_pie, use_container_width=True)
 
-    #time series chart to show incidents over times
-    time_series = incidents.groupby(incidents['timestamp'].dt.date).size().reset_index(name='Count')
-    fig_time = px.line(
+    #time series chart to show incidents over times, read from the rollup tables
+    #hourly buckets over years are thinned with LTTB before they are sent to the browser
+    granularity = st.radio("Granularity", ["hour", "day", "week"], index=1, horizontal=True, key="incident_trend_bucket")
+    time_series = get_incident_trend(conn, bucket=granularity)
+    fig_time = line_chart(
         time_series,
-        x='timestamp',
-        y='Count',
+        x='bucket',
+        y='count',
         title='Incidents Over Time',
         markers=True
     )
     st.plotly_chart(fig_time, use_container_width=True)
 
     # High-Level Insights
+timer.mark("High-Level Insights")
 st.subheader("High-Level Insights")
-if not incidents.empty:
+if metrics["total"]:
     #incident category with longest average resolution time
-    if 'resolution_time_hours' in incidents.columns:
-        avg_resolution = incidents.groupby('category')['resolution_time_hours'].mean().reset_index()
-        slowest_category = avg_resolution.sort_values('resolution_time_hours', ascending=False).iloc[0]
+    avg_resolution = get_avg_resolution_by_category(conn)
+    if not avg_resolution.empty:
+        slowest_category = avg_resolution.iloc[0]
         st.markdown(f"**Threat Category with Longest Avg Resolution Time:** {slowest_category['category']} ({slowest_category['resolution_time_hours']:.2f} hrs)")
 
-    #spike detection for phishing incidents
-    phishing_incidents = incidents[incidents['category'] == "Phishing"]
-    if not phishing_incidents.empty:
-        recent_count = phishing_incidents[phishing_incidents['timestamp'] > (pd.Timestamp.now() - pd.Timedelta(days=7))].shape[0]
-        avg_count = phishing_incidents.shape[0] / max(1, ((pd.Timestamp.now() - phishing_incidents['timestamp'].min()).days))
-        if recent_count > 1.5 * avg_count:
-            st.warning(f"⚠️ Spike detected: {recent_count} Phishing incidents in the past week (avg: {avg_count:.1f}/week)")
-        else:
-            st.success("No recent Phishing spike detected.")
+    #spike detection across every category and severity
+    spikes = detect_spikes(conn)
+    if spikes.empty:
+        st.success("No recent incident spikes detected.")
+    else:
+        for spike in spikes.head(5).itertuples(index=False):
+            st.warning(f"⚠️ Spike detected: {spike.recent} {spike.value} incidents in the past week "
+                       f"(expected: {spike.expected:.1f}, z-score {spike.z_score:.1f})")
 
     #analyst/team causing bottlenecks
-    if 'assigned_to' in incidents.columns:
-        open_incidents = incidents[incidents['status'] != "Resolved"]
-        if not open_incidents.empty:
-            open_by_analyst = open_incidents.groupby('assigned_to').size().reset_index(name="Open Incidents")
-            top_blocker = open_by_analyst.sort_values('Open Incidents', ascending=False).iloc[0]
-            st.markdown(f"**Analyst/Team with most unresolved incidents:** {top_blocker['assigned_to']} ({top_blocker['Open Incidents']} incidents)")
+    open_by_analyst = top_analysts_by_unresolved_incidents(conn, k=1)
+    if not open_by_analyst.empty:
+        top_blocker = open_by_analyst.iloc[0]
+        st.markdown(f"**Analyst/Team with most unresolved incidents:** {top_blocker['assigned_to']} ({top_blocker['count']} incidents)")
 
+timer.finish()
@@ -1,12 +1,12 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
 from datetime import datetime
-from app.data.db import connect_database
-from app.data.tickets import (get_all_tickets, insert_ticket, update_ticket_status, delete_ticket)
+from app.ui.session import restore_session
 
 st.set_page_config(page_title="IT Operations Dashboard", page_icon="💻", layout="wide")
 
+#restore the login from a session token if there is one
+restore_session()
+
 #if logged in show dashboard content
 if not st.session_state.get("logged_in", False):
     st.error("You must be logged in to view the dashboard.")
@@ -14,19 +14,63 @@ if not st.session_state.get("logged_in", False):
         st.switch_page("Home.py")
     st.stop()
 
-conn = connect_database()
+#the data layer, pandas and plotly only load once the page is actually going to render
+import plotly.express as px
+from app.data.db import get_connection, get_read_connection
+from app.data.writer import get_writer
+from app.data.tickets import (get_tickets_page, insert_ticket, update_ticket_status, delete_ticket,
+                              update_ticket_status_many, delete_tickets_many)
+from app.data.aggregations import (get_ticket_metrics, get_ticket_counts_by_priority, get_ticket_counts_by_status,
+                                   get_long_running_tickets)
+from app.data.rankings import top_staff_by_open_tickets, top_staff_by_resolution_time
+from app.data.rollups import get_ticket_trend
+from app.data.search import search_tickets
+from app.data.snapshots import snapshot_frame
+from app.data.sla import get_resolution_percentiles
+from app.ui.tables import paginated_table
+from app.ui.search import search_box
+from app.ui.charts import category_scatter, line_chart
+from app.services.instrumentation import PageTimer
+
+#time each section of this render, see the Settings page
+timer = PageTimer("IT Operations")
+#reads go through the read-only connection, single-row writes commit on get_connection()
+#and the bulk actions go through the group-commit writer
+conn = get_read_connection()
 
 st.title("💻 IT Operations Dashboard")
 
-#display all tickets
-tickets = get_all_tickets(conn)
+#display tickets one page at a time
+timer.mark("All Tickets")
 st.subheader("All Tickets")
-if not tickets.empty:
-    st.dataframe(tickets, use_container_width=True)
-else:
-    st.info("No tickets found.")
+col_priority, col_status = st.columns(2)
+with col_priority:
+    filter_priority = st.selectbox("Filter priority", ["All", "Low", "Medium", "High", "Critical"])
+with col_status:
+    filter_status = st.selectbox("Filter status", ["All", "Open", "In Progress", "Resolved", "Waiting for User"])
+
+page_filters = {
+    "priority": None if filter_priority == "All" else filter_priority,
+    "status": None if filter_status == "All" else filter_status,
+}
+tickets_page = paginated_table(
+    "tickets_table",
+    lambda **kwargs: get_tickets_page(conn, **kwargs),
+    "ticket_id",
+    filters=page_filters,
+)
+
+#full-text search over ticket descriptions, using the same filters as the table
+timer.mark("Search Tickets")
+st.subheader("Search Tickets")
+search_box(
+    "ticket_search",
+    lambda query, **kwargs: search_tickets(conn, query, **kwargs),
+    filters=page_filters,
+)
 
 #add new ticket
+timer.mark("Add New Ticket")
 st.subheader("Add New Ticket")
 with st.form("add_ticket_form"):
     priority = st.selectbox("Priority", ["Low", "Medium", "High", "Critical"])
@@ -38,15 +82,16 @@ with st.form("add_ticket_form"):
 
 if submitted:
     created_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    insert_ticket(conn, priority, description, status, assigned_to, created_at, resolution_time)
+    insert_ticket(get_connection(), priority, description, status, assigned_to, created_at, resolution_time)
     st.success("Ticket added successfully!")
     st.rerun()
 
 #update ticket
+timer.mark("Update Ticket Status")
 st.subheader("Update Ticket Status")
-if not tickets.empty:
-    selected_id = st.selectbox("Select ticket to update", tickets['ticket_id'])
-    ticket = tickets[tickets['ticket_id'] == selected_id].iloc[0]
+if not tickets_page.empty:
+    selected_id = st.selectbox("Select ticket to update", tickets_page['ticket_id'])
+    ticket = tickets_page[tickets_page['ticket_id'] == selected_id].iloc[0]
 
     with st.form("update_ticket_form"):
         new_status = st.selectbox(
@@ -55,86 +100,155 @@ if not tickets.empty:
             index=["Open", "In Progress", "Resolved"].index(ticket['status'])
         )
         if st.form_submit_button("Update Status"):
-            update_ticket_status(conn, selected_id, new_status)
+            update_ticket_status(get_connection(), selected_id, new_status)
             st.success("Ticket status updated!")
             st.rerun()
 
 #delete ticket
+timer.mark("Delete Ticket")
 st.subheader("Delete Ticket")
-if not tickets.empty:
-    delete_id = st.selectbox("Select ticket to delete", tickets['ticket_id'], key="delete_ticket_id")
-    ticket = tickets[tickets['ticket_id'] == delete_id].iloc[0]
+if not tickets_page.empty:
+    delete_id = st.selectbox("Select ticket to delete", tickets_page['ticket_id'], key="delete_ticket_id")
+    ticket = tickets_page[tickets_page['ticket_id'] == delete_id].iloc[0]
 
     col1, col2 = st.columns([3, 1])
     with col1:
         st.warning("Are you sure you want to delete this ticket?")
     with col2:
         if st.button("Delete Ticket", key="confirm_delete_ticket"):
-            delete_ticket(conn, delete_id)
+            delete_ticket(get_connection(), delete_id)
             st.success("Ticket deleted!")
             st.rerun()
 
+#bulk actions on the tickets shown in the table, written as one transaction
+timer.mark("Bulk Actions")
+st.subheader("Bulk Actions")
+if not tickets_page.empty:
+    select_all = st.checkbox("Select all tickets on this page", key="bulk_ticket_all")
+    if select_all:
+        bulk_ids = tickets_page['ticket_id'].tolist()
+        st.caption(f"{len(bulk_ids)} tickets selected")
+    else:
+        bulk_ids = st.multiselect("Select tickets", tickets_page['ticket_id'].tolist(), key="bulk_ticket_ids")
+    col1, col2, col3 = st.columns([2, 1, 1])
+    with col1:
+        bulk_status = st.selectbox("New status", ["Open", "In Progress", "Resolved"], key="bulk_ticket_status")
+    with col2:
+        if st.button("Update selected", key="bulk_update_tickets", disabled=not bulk_ids):
+            get_writer().write(update_ticket_status_many, bulk_ids, bulk_status, tables=("it_tickets",))
+            st.success(f"{len(bulk_ids)} tickets updated!")
+            st.rerun()
+    with col3:
+        if st.button("Delete selected", key="bulk_delete_tickets", disabled=not bulk_ids):
+            get_writer().write(delete_tickets_many, bulk_ids, tables=("it_tickets",))
+            st.success(f"{len(bulk_ids)} tickets deleted!")
+            st.rerun()
+
 #metrics
+timer.mark("Ticket Metrics")
 st.subheader("Ticket Metrics")
-if not tickets.empty:
-    total_tickets = len(tickets)
-    open_tickets = tickets['status'].value_counts().get("Open", 0)
-    high_priority = tickets['priority'].value_counts().get("High", 0) + tickets['priority'].value_counts().get("Critical", 0)
-    st.metric("Total Tickets", total_tickets)
-    st.metric("Open Tickets", open_tickets)
-    st.metric("High Priority Tickets", high_priority)
+metrics = get_ticket_metrics(conn, long_threshold=48)
+if metrics["total"]:
+    st.metric("Total Tickets", metrics["total"])
+    st.metric("Open Tickets", metrics["open"])
+    st.metric("High Priority Tickets", metrics["high_priority"])
 
 #visual Analytics
+timer.mark("Visual Analytics")
 st.subheader("Visual Analytics")
-if not tickets.empty:
+if metrics["total"]:
     #bar chart showing tickets per priority
-    priority_counts = tickets.groupby("priority").size().reset_index(name="Count")
+    priority_counts = get_ticket_counts_by_priority(conn)
     fig_priority = px.bar(
         priority_counts,
         x="priority",
-        y="Count",
+        y="count",
         title="Tickets by Priority",
-        color="Count",
+        color="count",
         color_continuous_scale="Blues"
     )
     st.plotly_chart(fig_priority, use_container_width=True)
 
     #pie chart tickets by status
-    status_counts = tickets.groupby("status").size().reset_index(name="Count")
+    status_counts = get_ticket_counts_by_status(conn)
     fig_status = px.pie(
         status_counts,
         names="status",
-        values="Count",
+        values="count",
         title="Tickets by Status",
         color_discrete_sequence=px.colors.sequential.RdBu
     )
     st.plotly_chart(fig_status, use_container_width=True)
 
+    #weekly ticket volume per priority from the rollup tables
+    ticket_trend = get_ticket_trend(conn, bucket="week", by="priority")
+    fig_trend = line_chart(
+        ticket_trend,
+        x="bucket",
+        y="count",
+        color="priority",
+        title="Tickets Opened per Week",
+        markers=True
+    )
+    st.plotly_chart(fig_trend, use_container_width=True)
+
     #scatter comparing resolution time and priority to detect anomalies
-    fig_scatter = px.scatter(
+    #individual tickets come from the memory-mapped snapshot, large tables are drawn as box plots
+    tickets = snapshot_frame(conn, "it_tickets", ["ticket_id", "priority", "assigned_to", "resolution_time_hours"])
+    fig_scatter = category_scatter(
         tickets,
         x='priority',
         y='resolution_time_hours',
         size='resolution_time_hours',
-        hover_data=['description', 'assigned_to'],
+        hover_data=['ticket_id', 'assigned_to'],
         title="Resolution Time by Priority"
     )
     st.plotly_chart(fig_scatter, use_container_width=True)
 
 #IT Operations Insights
+timer.mark("Operational Insights")
 st.subheader("Operational Insights")
-if not tickets.empty:
+if metrics["total"]:
     #tickets taking long to resolve
-    long_tickets = tickets[tickets['resolution_time_hours'] > 48]
-    if not long_tickets.empty:
-        st.warning(f"{len(long_tickets)} tickets have resolution time > 48 hours. Consider reviewing these.")
-        st.dataframe(long_tickets[['ticket_id', 'priority', 'status', 'assigned_to', 'resolution_time_hours']], use_container_width=True)
+    if metrics["long_running"]:
+        long_tickets = get_long_running_tickets(conn, threshold=48)
+        st.warning(f"{metrics['long_running']} tickets have resolution time > 48 hours. Consider reviewing these.")
+        st.dataframe(long_tickets, use_container_width=True)
     else:
         st.success("All tickets are being resolved in reasonable time.")
 
     #staff with most open tickets
-    open_by_staff = tickets[tickets['status'] == "Open"].groupby("assigned_to").size().reset_index(name="Open Tickets")
-    open_by_staff = open_by_staff.sort_values("Open Tickets", ascending=False)
+    open_by_staff = top_staff_by_open_tickets(conn, k=10).rename(columns={"count": "Open Tickets"})
     if not open_by_staff.empty:
         st.markdown("**Staff with most open tickets:**")
         st.dataframe(open_by_staff, use_container_width=True)
+
+    #staff whose resolved tickets took longest on average, ignoring anyone with only a few
+    slowest_staff = top_staff_by_resolution_time(conn, k=5, min_tickets=10).rename(
+        columns={"count": "Resolved Tickets", "avg_resolution_hours": "Avg Resolution (hrs)"})
+    if not slowest_staff.empty:
+        st.markdown("**Staff with slowest average resolution:**")
+        st.dataframe(slowest_staff, use_container_width=True)
+
+#percentiles of resolved tickets, read from the sketches the triggers keep up to date
+timer.mark("Resolution Time Percentiles")
+st.subheader("Resolution Time Percentiles")
+if metrics["total"]:
+    sla_groups = {"Priority": "priority", "Assignee": "assigned_to", "Month": "month"}
+    sla_by = st.radio("Group by", list(sla_groups), horizontal=True, key="sla_group_by")
+    percentiles = get_resolution_percentiles(conn, by=sla_groups[sla_by])
+    if percentiles.empty:
+        st.info("No resolved tickets yet.")
+    elif sla_by == "Month":
+        fig_sla = px.line(
+            percentiles,
+            x="month",
+            y=["p50", "p90", "p99"],
+            title="Resolution Time Percentiles per Month (hours)",
+            markers=True
+        )
+        st.plotly_chart(fig_sla, use_container_width=True)
+    else:
+        st.dataframe(percentiles, use_container_width=True, hide_index=True)
+
+timer.finish()
@@ -1,12 +1,12 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
 from pathlib import Path
-from app.data.db import connect_database
-from app.data.datasets import (get_all_datasets, insert_dataset, update_dataset, delete_dataset)
+from app.ui.session import restore_session
 
 st.set_page_config(page_title="Data Science Dashboard", page_icon="📊", layout="wide")
 
+#restore the login from a session token if there is one
+restore_session()
+
 #if logged in show dashboard content
 if not st.session_state.get("logged_in", False):
     st.error("You must be logged in to view the dashboard.")
@@ -14,20 +14,42 @@ if not st.session_state.get("logged_in", False):
         st.switch_page("Home.py")
     st.stop()
 
-#connecting to week8 database
-conn = connect_database()
+#the data layer, pandas and plotly only load once the page is actually going to render
+import pandas as pd
+import plotly.express as px
+from app.data.db import get_connection, get_read_connection
+from app.data.writer import get_writer
+from app.data.datasets import (get_datasets_page, insert_dataset, update_dataset, delete_dataset,
+                               delete_datasets_many)
+from app.data.aggregations import (get_dataset_metrics, get_dataset_counts_by_uploader, get_dataset_shapes,
+                                   get_dataset_shape_density)
+from app.data.rankings import top_datasets_by_rows
+from app.ui.tables import paginated_table
+from app.ui.charts import DENSITY_BINS, LOG_AXIS_RATIO, MAX_POINTS, OUTLIER_POINTS, density_heatmap, density_scatter
+from app.services.instrumentation import PageTimer
+
+#time each section of this render, see the Settings page
+timer = PageTimer("Data Science")
+
+#reads go through the read-only connection, single-row writes commit on get_connection()
+#and the bulk actions go through the group-commit writer
+conn = get_read_connection()
 
 st.title("📊 Data Science Dashboard")
 
-#read: display datasets as a table
-datasets = get_all_datasets(conn)
+#read: display datasets one page at a time
+timer.mark("All Datasets")
 st.subheader("All Datasets")
-if not datasets.empty:
-    st.dataframe(datasets, use_container_width=True)
-else:
-    st.info("No datasets found.")
+filter_uploader = st.text_input("Filter by uploader")
+datasets_page = paginated_table(
+    "datasets_table",
+    lambda **kwargs: get_datasets_page(conn, **kwargs),
+    "dataset_id",
+    filters={"uploaded_by": filter_uploader or None},
+)
 
 #creating new dataset
+timer.mark("Add New Dataset")
 st.subheader("Add New Dataset")
 with st.form("add_dataset_form"):
     name = st.text_input("Dataset Name")
@@ -38,15 +60,16 @@ with st.form("add_dataset_form"):
     submitted = st.form_submit_button("Add Dataset")
 
 if submitted:
-    insert_dataset(conn, name, rows, columns_count, uploaded_by, upload_date.strftime("%Y-%m-%d"))
+    insert_dataset(get_connection(), name, rows, columns_count, uploaded_by, upload_date.strftime("%Y-%m-%d"))
     st.success("Dataset added successfully!")
     st.rerun()
 
 # Update dataset
+timer.mark("Update Dataset")
 st.subheader("Update Dataset")
-if not datasets.empty:
-    selected_id = st.selectbox("Select dataset to update", datasets['dataset_id'])
-    dataset = datasets[datasets['dataset_id'] == selected_id].iloc[0]
+if not datasets_page.empty:
+    selected_id = st.selectbox("Select dataset to update", datasets_page['dataset_id'])
+    dataset = datasets_page[datasets_page['dataset_id'] == selected_id].iloc[0]
 
     with st.form("update_dataset_form"):
         new_name = st.text_input("Dataset Name", value=dataset['name'])
@@ -55,7 +78,7 @@ if not datasets.empty:
         new_uploaded_by = st.text_input("Uploaded By", value=dataset['uploaded_by'])
         if st.form_submit_button("Update Dataset"):
             update_dataset(
-                conn,
+                get_connection(),
                 selected_id,
                 name=new_name,
                 rows=new_rows,
@@ -66,81 +89,122 @@ if not datasets.empty:
             st.rerun()
 
 #delete dataset
+timer.mark("Delete Dataset")
 st.subheader("Delete Dataset")
-if not datasets.empty:
-    delete_id = st.selectbox("Select dataset to delete", datasets['dataset_id'], key="delete_dataset_id")
-    dataset = datasets[datasets['dataset_id'] == delete_id].iloc[0]
+if not datasets_page.empty:
+    delete_id = st.selectbox("Select dataset to delete", datasets_page['dataset_id'], key="delete_dataset_id")
+    dataset = datasets_page[datasets_page['dataset_id'] == delete_id].iloc[0]
 
     col1, col2 = st.columns([3, 1])
     with col1:
         st.warning("Are you sure you want to delete this dataset?")
     with col2:
         if st.button("Delete Dataset", key="confirm_delete_dataset"):
-            delete_dataset(conn, delete_id)
+            delete_dataset(get_connection(), delete_id)
             st.success("Dataset deleted!")
             st.rerun()
 
+#bulk delete for the datasets shown in the table, written as one transaction
+timer.mark("Bulk Actions")
+st.subheader("Bulk Actions")
+if not datasets_page.empty:
+    select_all = st.checkbox("Select all datasets on this page", key="bulk_dataset_all")
+    if select_all:
+        bulk_ids = datasets_page['dataset_id'].tolist()
+        st.caption(f"{len(bulk_ids)} datasets selected")
+    else:
+        bulk_ids = st.multiselect("Select datasets", datasets_page['dataset_id'].tolist(), key="bulk_dataset_ids")
+    if st.button("Delete selected", key="bulk_delete_datasets", disabled=not bulk_ids):
+        get_writer().write(delete_datasets_many, bulk_ids, tables=("datasets_metadata",))
+        st.success(f"{len(bulk_ids)} datasets deleted!")
+        st.rerun()
+
 #metrics
+timer.mark("Dataset Metrics")
 st.subheader("Dataset Metrics")
-if not datasets.empty:
-    total_datasets = len(datasets)
-    total_rows = datasets['rows'].sum()
-    st.metric("Total Datasets", total_datasets)
-    st.metric("Total Rows Across All Datasets", total_rows)
+metrics = get_dataset_metrics(conn)
+if metrics["total"]:
+    st.metric("Total Datasets", metrics["total"])
+    st.metric("Total Rows Across All Datasets", metrics["total_rows"])
 
 #visual Analytics
+timer.mark("Visual Analytics")
 st.subheader("Visual Analytics")
-if not datasets.empty:
-    #bar chart showing number of rows per dataset
+if metrics["total"]:
+    #bar chart of the largest datasets only, one bar per dataset stops being readable long before the table ends
+    largest_by_rows = top_datasets_by_rows(conn, k=20)
     fig_rows = px.bar(
-        datasets,
+        largest_by_rows,
         x='name',
         y='rows',
-        title="Number of Rows per Dataset",
+        title="Number of Rows per Dataset (20 largest)",
         color='rows',
         color_continuous_scale="Blues"
     )
     st.plotly_chart(fig_rows, use_container_width=True)
 
     #pie chart showing distribution of datasets by uploader
-    uploader_counts = datasets.groupby("uploaded_by").size().reset_index(name="Count")
+    uploader_counts = get_dataset_counts_by_uploader(conn)
     fig_pie = px.pie(
         uploader_counts,
         names='uploaded_by',
-        values='Count',
+        values='count',
         title="Datasets per Uploader",
         color_discrete_sequence=px.colors.sequential.RdBu
     )
     st.plotly_chart(fig_pie, use_container_width=True)
 
-    #scatter chart comparing rows and columns 
-    fig_scatter = px.scatter(
-        datasets,
-        x='columns',
-        y='rows',
-        size='rows',
-        hover_data=['name', 'uploaded_by'],
-        title="Rows vs Columns per Dataset"
-    )
+    #scatter chart comparing rows and columns, past MAX_POINTS datasets SQLite bins them and only the grid is read
+    density = None
+    if metrics["total"] > MAX_POINTS:
+        density = get_dataset_shape_density(conn, bins=DENSITY_BINS, log_ratio=LOG_AXIS_RATIO)
+    if density is None:
+        fig_scatter = density_scatter(
+            get_dataset_shapes(conn),
+            x='columns',
+            y='rows',
+            size='rows',
+            hover_data=['name', 'uploaded_by'],
+            title="Rows vs Columns per Dataset"
+        )
+    else:
+        #the largest and smallest datasets are drawn as points on top, off either end of the rows index
+        extremes = pd.concat([
+            top_datasets_by_rows(conn, k=OUTLIER_POINTS // 2),
+            top_datasets_by_rows(conn, k=OUTLIER_POINTS // 2, largest=False),
+        ])
+        fig_scatter = density_heatmap(
+            density["cells"],
+            x='columns',
+            y='rows',
+            title="Rows vs Columns per Dataset",
+            total=density["total"],
+            x_centres=density["columns_centres"],
+            y_centres=density["rows_centres"],
+            x_log=density["columns_log"],
+            y_log=density["rows_log"],
+            extremes=extremes,
+            hover_data=['name', 'uploaded_by']
+        )
     st.plotly_chart(fig_scatter, use_container_width=True)
 
 #data governance insights
+timer.mark("Data Governance Insights")
 st.subheader("Data Governance Insights")
-if not datasets.empty:
-    #identifying largest datasets
-    largest_datasets = datasets.nlargest(5, 'rows')[['name', 'rows', 'columns']]
+if metrics["total"]:
+    #identifying largest datasets, read from either end of the rows index
+    largest_datasets = top_datasets_by_rows(conn, k=5)[['name', 'rows', 'columns']]
     st.markdown("**Top 5 Largest Datasets (by rows):**")
     st.dataframe(largest_datasets, use_container_width=True)
 
     #identifing datasets with fewest rows
-    smallest_datasets = datasets.nsmallest(5, 'rows')[['name', 'rows', 'columns']]
+    smallest_datasets = top_datasets_by_rows(conn, k=5, largest=False)[['name', 'rows', 'columns']]
     st.markdown("**Top 5 Smallest Datasets (possible archive candidates):**")
     st.dataframe(smallest_datasets, use_container_width=True)
 
     #counting datasets per uploader
-    uploader_counts = datasets.groupby('uploaded_by').size().reset_index(name='Dataset Count')
+    uploader_counts = get_dataset_counts_by_uploader(conn).rename(columns={"count": "Dataset Count"})
     st.markdown("**Dataset Count by Uploader:**")
     st.dataframe(uploader_counts, use_container_width=True)
 
-
-
+timer.finish()
@@ -1,10 +1,97 @@
+import time
 import streamlit as st
+from app.ui.session import restore_session
 
 st.set_page_config(page_title="Settings", page_icon="⚙️", layout="wide")
 
+#restore the login from a session token if there is one
+restore_session()
+
 #if logged in show dashboard content
 if not st.session_state.get("logged_in", False):
     st.error("You must be logged in to access settings.")
     if st.button("Go to login page"):
         st.switch_page("Home.py")
     st.stop()
+
+st.title("⚙️ Settings")
+
+#query and render timings are only for admins
+if st.session_state.get("role") != "admin":
+    st.info("Performance instrumentation is only available to admins.")
+    st.stop()
+
+#pandas and the stats sources only load for admins who get to see them
+import pandas as pd
+from app.data.cache import cache_stats
+from app.data.changes import delta_stats
+from app.data.db import pool_stats, busy_stats
+from app.data.writer import get_writer
+from app.services.auth_executor import auth_stats
+from app.services.instrumentation import recorder, instrumentation_snapshot, export_json, INSTRUMENTATION_ENABLED
+
+st.subheader("Performance Instrumentation")
+if not INSTRUMENTATION_ENABLED:
+    st.warning("Instrumentation is turned off (APP_INSTRUMENTATION=0).")
+
+snapshot = instrumentation_snapshot()
+cache = cache_stats()
+#the dashboards read through the read-only pool
+pool = pool_stats(read_only=True)
+
+col1, col2, col3, col4 = st.columns(4)
+with col1:
+    st.metric("Cache Hit Rate", f"{cache['hit_rate']:.0%}")
+with col2:
+    st.metric("Cached Results", f"{cache['entries']} ({cache['bytes'] / 2 ** 20:.1f} MB)")
+with col3:
+    st.metric("Pool Hit Rate", f"{pool['hit_rate']:.0%}")
+with col4:
+    st.metric("Connections In Use", f"{pool['in_use']} / {pool['open']}")
+
+#per page render times, the (total) row is the whole script run
+st.markdown("**Page Render Times**")
+renders = pd.DataFrame(snapshot["renders"])
+if renders.empty:
+    st.caption("No dashboard renders recorded yet.")
+else:
+    totals = renders[renders["section"] == "(total)"]
+    st.dataframe(totals[["page", "calls", "p50_ms", "p95_ms", "max_ms"]], use_container_width=True, hide_index=True)
+    with st.expander("Per-section render times"):
+        sections = renders[renders["section"] != "(total)"]
+        st.dataframe(sections[["page", "section", "calls", "p50_ms", "p95_ms", "max_ms"]],
+                     use_container_width=True, hide_index=True)
+
+st.markdown("**Slowest Queries**")
+queries = pd.DataFrame(snapshot["queries"])
+if queries.empty:
+    st.caption("No queries recorded yet.")
+else:
+    st.dataframe(queries.head(20)[["query", "calls", "rows", "avg_ms", "p95_ms", "max_ms", "total_ms"]],
+                 use_container_width=True, hide_index=True)
+
+st.markdown("**Data Functions**")
+functions = pd.DataFrame(snapshot["functions"])
+if functions.empty:
+    st.caption("No data function calls recorded yet.")
+else:
+    st.dataframe(functions[["function", "calls", "rows", "avg_ms", "p95_ms", "max_ms", "total_ms"]],
+                 use_container_width=True, hide_index=True)
+
+stats = {"cache": cache, "pool": pool, "write_pool": pool_stats(), "writer": get_writer().stats(),
+         "busy": busy_stats(), "auth": auth_stats(), "delta": delta_stats()}
+with st.expander("Cache, pool, writer and auth stats"):
+    st.json(stats)
+
+col_export, col_reset = st.columns(2)
+with col_export:
+    st.download_button(
+        "Export JSON",
+        export_json(stats),
+        file_name=f"instrumentation-{time.strftime('%Y%m%d-%H%M%S')}.json",
+        mime="application/json",
+    )
+with col_reset:
+    if st.button("Reset Timings"):
+        recorder.reset()
+        st.rerun()
@@ -0,0 +1,48 @@
+import pytest
+
+from app.data.db import connect_database
+from app.data.incidents import insert_incident
+from app.data.migrations import migrate
+from app.data.writer import GroupCommitWriter
+
+# Values of the incidents add_incident inserts, unless overridden
+INCIDENT = {
+    "timestamp": "2024-01-01 00:00:00",
+    "severity": "High",
+    "category": "Malware",
+    "status": "Open",
+    "description": "test",
+}
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """A fully migrated database file of its own for each test."""
+    path = tmp_path / "test.db"
+    conn = connect_database(path)
+    migrate(conn)
+    conn.close()
+    return path
+
+
+@pytest.fixture
+def conn(db_path):
+    conn = connect_database(db_path)
+    yield conn
+    conn.close()
+
+
+@pytest.fixture
+def add_incident():
+    """Insert an incident with the INCIDENT values, any of which can be overridden.
+
+    add_incident(conn) inserts on a connection, add_incident(writer) goes
+    through a GroupCommitWriter. Returns the new incident_id.
+    """
+    def add(target, commit=True, **values):
+        row = dict(INCIDENT, **values)
+        args = (row["timestamp"], row["severity"], row["category"], row["status"], row["description"])
+        if isinstance(target, GroupCommitWriter):
+            return target.write(insert_incident, *args, tables=("cyber_incidents",))
+        return insert_incident(target, *args, commit=commit)
+    return add
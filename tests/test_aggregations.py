@@ -0,0 +1,110 @@
+import numpy as np
+import pandas as pd
+
+from app.data.aggregations import (get_dataset_counts_by_uploader, get_dataset_metrics, get_dataset_shape_density,
+                                   get_open_tickets_by_staff, get_ticket_counts_by_priority, get_ticket_metrics)
+from app.data.datasets import insert_datasets_many
+from app.data.tickets import insert_tickets_many
+from app.ui.charts import _bins
+
+# Rows each table is filled with
+ROWS = 500
+
+
+def _tickets(conn):
+    rng = np.random.default_rng(3)
+    frame = pd.DataFrame({
+        "priority": rng.choice(["Low", "Medium", "High", "Critical"], ROWS),
+        "description": "test",
+        "status": rng.choice(["Open", "In Progress", "Resolved"], ROWS),
+        "assigned_to": rng.choice(["IT_Support_A", "IT_Support_B", "IT_Support_C"], ROWS),
+        "created_at": "2024-01-01 00:00:00",
+        "resolution_time_hours": rng.integers(0, 100, ROWS),
+    })
+    insert_tickets_many(conn, frame.astype(object).itertuples(index=False, name=None))
+    return frame
+
+
+def _datasets(conn):
+    rng = np.random.default_rng(4)
+    frame = pd.DataFrame({
+        "name": [f"dataset {i}" for i in range(ROWS)],
+        "rows": rng.integers(1, 5_000, ROWS),
+        "columns": rng.integers(1, 40, ROWS),
+        "uploaded_by": rng.choice(["data_scientist", "cyber_admin", "it_admin"], ROWS),
+        "upload_date": "2024-01-01",
+    })
+    insert_datasets_many(conn, frame.astype(object).itertuples(index=False, name=None))
+    return frame
+
+
+def test_ticket_aggregations_match_pandas(conn):
+    frame = _tickets(conn)
+    metrics = get_ticket_metrics(conn, long_threshold=48)
+    assert metrics == {
+        "total": len(frame),
+        "open": int((frame["status"] == "Open").sum()),
+        "high_priority": int(frame["priority"].isin(["High", "Critical"]).sum()),
+        "long_running": int((frame["resolution_time_hours"] > 48).sum()),
+    }
+
+    by_priority = get_ticket_counts_by_priority(conn).set_index("priority")["count"]
+    assert by_priority.to_dict() == frame["priority"].value_counts().to_dict()
+
+    by_staff = get_open_tickets_by_staff(conn).set_index("assigned_to")["count"]
+    expected = frame[frame["status"] == "Open"]["assigned_to"].value_counts()
+    assert by_staff.to_dict() == expected.to_dict()
+
+
+def _grid(density):
+    """The density cells as a full (columns, rows) array of counts."""
+    cells = density["cells"]
+    x_bin = np.searchsorted(density["columns_centres"], cells["columns"])
+    y_bin = np.searchsorted(density["rows_centres"], cells["rows"])
+    counts = np.zeros((len(density["columns_centres"]), len(density["rows_centres"])))
+    counts[x_bin, y_bin] = cells["count"]
+    return counts
+
+
+def test_dataset_aggregations_match_pandas(conn):
+    frame = _datasets(conn)
+    assert get_dataset_metrics(conn) == {"total": len(frame), "total_rows": int(frame["rows"].sum())}
+    by_uploader = get_dataset_counts_by_uploader(conn).set_index("uploaded_by")["count"]
+    assert by_uploader.to_dict() == frame["uploaded_by"].value_counts().to_dict()
+
+
+def test_shape_density_matches_numpy_histogram(conn):
+    frame = _datasets(conn)
+    density = get_dataset_shape_density(conn, bins=10, log_ratio=1_000)
+    assert density["total"] == len(frame)
+    assert not density["columns_log"] and not density["rows_log"]
+
+    expected, _, _ = np.histogram2d(frame["columns"], frame["rows"], bins=10)
+    assert (_grid(density) == expected).all()
+
+
+def test_shape_density_uses_a_log_axis_for_wide_ranges(conn):
+    insert_datasets_many(conn, [(f"d{i}", 10 ** i, 5, "x", "2024-01-01") for i in range(7)])
+    density = get_dataset_shape_density(conn, bins=7, log_ratio=1_000)
+    assert density["rows_log"] and not density["columns_log"]
+    #one dataset per decade, one per log bin
+    assert sorted(density["cells"]["count"]) == [1] * 7
+
+
+def test_shape_density_of_an_empty_table_is_none(conn):
+    assert get_dataset_shape_density(conn) is None
+
+
+def test_shape_density_matches_the_chart_binning_on_a_log_axis(conn):
+    rng = np.random.default_rng(9)
+    rows = np.exp(rng.uniform(0, 14, ROWS)).astype(int) + 1
+    insert_datasets_many(conn, [(f"d{i}", int(r), int(1 + i % 30), "x", "2024-01-01") for i, r in enumerate(rows)])
+    density = get_dataset_shape_density(conn, bins=12, log_ratio=1_000)
+    assert density["rows_log"]
+
+    #the same grid density_scatter bins in memory
+    columns = 1 + np.arange(ROWS) % 30
+    x_edges, _, _ = _bins(columns.astype(float), 12)
+    y_edges, _, _ = _bins(rows.astype(float), 12)
+    expected, _, _ = np.histogram2d(columns, rows, bins=[x_edges, y_edges])
+    assert (_grid(density) == expected).all()
@@ -0,0 +1,74 @@
+import threading
+import time
+
+import pytest
+
+from app.services.auth_executor import AuthBusyError, AuthExecutor
+
+
+def _blocked(executor, count):
+    """Start count jobs that hold their worker or queue slot until the returned event is set."""
+    release = threading.Event()
+    started = threading.Barrier(count + 1)
+    threads = []
+    for _ in range(count):
+        def job():
+            started.wait()
+            executor.run("test", release.wait, 5)
+        t = threading.Thread(target=job)
+        t.start()
+        threads.append(t)
+    started.wait()
+    return release, threads
+
+
+def _wait_for(executor, in_flight):
+    for _ in range(500):
+        if executor.stats()["in_flight"] == in_flight:
+            return
+        time.sleep(0.01)
+    raise AssertionError(f"in_flight never reached {in_flight}")
+
+
+def test_full_queue_rejects_new_requests():
+    executor = AuthExecutor(workers=1, max_queue=1, queue_timeout=0.05)
+    release, threads = _blocked(executor, 2)
+    _wait_for(executor, 2)
+    with pytest.raises(AuthBusyError):
+        executor.run("test", sum, [1, 2])
+    assert executor.stats()["rejected"] == 1
+
+    release.set()
+    for t in threads:
+        t.join()
+    #slots are given back, work is accepted again
+    assert executor.run("test", sum, [1, 2]) == 3
+    assert executor.stats()["test"]["count"] == 3
+
+
+def test_resize_replaces_the_pool():
+    executor = AuthExecutor(workers=1, max_queue=0, queue_timeout=0.05)
+    executor.resize(3)
+    assert executor.stats()["workers"] == 3
+    #three jobs fit at once on the new pool
+    release, threads = _blocked(executor, 3)
+    _wait_for(executor, 3)
+    with pytest.raises(AuthBusyError):
+        executor.run("test", sum, [1])
+    release.set()
+    for t in threads:
+        t.join()
+
+
+def test_resize_lets_running_jobs_finish():
+    executor = AuthExecutor(workers=1, max_queue=0)
+    release, threads = _blocked(executor, 1)
+    _wait_for(executor, 1)
+    resized = threading.Thread(target=executor.resize, args=(2,))
+    resized.start()
+    release.set()
+    resized.join()
+    for t in threads:
+        t.join()
+    assert executor.stats()["in_flight"] == 0
+    assert executor.stats()["test"]["count"] == 1
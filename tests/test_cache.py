@@ -0,0 +1,44 @@
+from app.data.cache import cache_stats
+from app.data.db import connect_database
+from app.data.incidents import count_incidents
+from app.data.tickets import insert_ticket
+
+
+def test_repeated_read_is_a_hit(conn, add_incident):
+    add_incident(conn)
+    assert count_incidents(conn) == 1
+    hits = cache_stats()["hits"]
+    assert count_incidents(conn) == 1
+    assert cache_stats()["hits"] == hits + 1
+
+
+def test_write_from_this_process_invalidates(conn, add_incident):
+    assert count_incidents(conn) == 0
+    add_incident(conn)
+    assert count_incidents(conn) == 1
+
+
+def test_commit_on_another_connection_invalidates(db_path, conn, add_incident):
+    assert count_incidents(conn) == 0
+    #a raw write with no bump_table_version, as another process would make it
+    other = connect_database(db_path)
+    try:
+        add_incident(other, commit=False)
+        other.commit()
+    finally:
+        other.close()
+    assert count_incidents(conn) == 1
+
+
+def test_write_to_another_table_keeps_the_entry(db_path, conn, add_incident):
+    add_incident(conn)
+    assert count_incidents(conn) == 1
+    other = connect_database(db_path)
+    try:
+        insert_ticket(other, "High", "test", "Open", "IT_Support", "2024-01-01 00:00:00", None, commit=False)
+        other.commit()
+    finally:
+        other.close()
+    hits = cache_stats()["hits"]
+    assert count_incidents(conn) == 1
+    assert cache_stats()["hits"] == hits + 1
@@ -0,0 +1,67 @@
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal
+
+from app.data.changes import delta_frame, delta_stats
+from app.data.frames import compact_frame
+from app.data.incidents import delete_incident, load_incident_data_to_sql, update_incident_status
+
+
+def _full_reload(conn):
+    df = pd.read_sql_query("SELECT * FROM cyber_incidents ORDER BY incident_id DESC", conn)
+    return compact_frame(df, "cyber_incidents")
+
+
+def _assert_same(delta, full):
+    #categories a patch added come after the ones first loaded, only the values have to match
+    assert_frame_equal(delta, full, check_categorical=False)
+
+
+@pytest.fixture
+def seeded(conn, add_incident):
+    for _ in range(200):
+        add_incident(conn)
+    return conn
+
+
+def test_patched_frame_matches_full_reload(seeded, add_incident):
+    conn = seeded
+    delta_frame(conn, "cyber_incidents")
+    patches = delta_stats()["patches"]
+
+    add_incident(conn, category="Phishing")
+    update_incident_status(conn, 5, "Closed")
+    delete_incident(conn, 7)
+    #past the range an int8 key could hold
+    conn.execute("INSERT INTO cyber_incidents (incident_id, severity, status) VALUES (100000, 'Low', 'Open')")
+    conn.commit()
+    delete_incident(conn, 100000)
+
+    delta = delta_frame(conn, "cyber_incidents")
+    assert delta_stats()["patches"] == patches + 1
+    _assert_same(delta, _full_reload(conn))
+
+
+def test_unchanged_table_is_not_reread(seeded):
+    conn = seeded
+    first = delta_frame(conn, "cyber_incidents")
+    unchanged = delta_stats()["unchanged"]
+    _assert_same(delta_frame(conn, "cyber_incidents"), first)
+    assert delta_stats()["unchanged"] == unchanged + 1
+
+
+def test_bulk_load_forces_a_reload(seeded, tmp_path):
+    conn = seeded
+    delta_frame(conn, "cyber_incidents")
+    reloads = delta_stats()["reloads"]
+
+    csv_path = tmp_path / "incidents.csv"
+    csv_path.write_text(
+        "incident_id,timestamp,severity,category,status,description\n"
+        "1,2024-01-01 10:00:00.000000,Low,Malware,Open,bulk\n"
+    )
+    load_incident_data_to_sql(conn, csv_path, bulk=True)
+
+    delta = delta_frame(conn, "cyber_incidents")
+    assert delta_stats()["reloads"] == reloads + 1
+    _assert_same(delta, _full_reload(conn))
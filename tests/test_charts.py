@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+
+from app.ui.charts import density_scatter, line_chart, lttb
+
+
+def _noisy(n, seed=7):
+    rng = np.random.default_rng(seed)
+    return np.arange(n, dtype=float), rng.normal(0, 1, n)
+
+
+def test_lttb_keeps_the_ends_and_returns_threshold_points():
+    x, y = _noisy(10_000)
+    keep = lttb(x, y, 500)
+    assert len(keep) == 500
+    assert keep[0] == 0 and keep[-1] == len(x) - 1
+    assert (np.diff(keep) > 0).all()
+
+
+def test_lttb_keeps_spikes():
+    x, y = _noisy(10_000)
+    y[1234] = 50
+    y[7777] = -50
+    keep = lttb(x, y, 200)
+    assert 1234 in keep and 7777 in keep
+    assert y[keep].max() == y.max() and y[keep].min() == y.min()
+
+
+def test_lttb_leaves_short_series_alone():
+    x, y = _noisy(100)
+    assert (lttb(x, y, 500) == np.arange(100)).all()
+
+
+def test_line_chart_thins_each_series():
+    x, y = _noisy(3_000)
+    df = pd.DataFrame({"x": np.concatenate([x, x]), "y": np.concatenate([y, -y]),
+                       "series": ["a"] * 3_000 + ["b"] * 3_000})
+    fig = line_chart(df, "x", "y", "test", color="series", max_points=100)
+    assert [len(trace.x) for trace in fig.data] == [100, 100]
+
+
+def test_density_scatter_bins_every_point():
+    rng = np.random.default_rng(8)
+    df = pd.DataFrame({"columns": rng.integers(1, 50, 20_000), "rows": rng.integers(1, 10_000, 20_000)})
+    fig = density_scatter(df, x="columns", y="rows", title="test", max_points=1_000, bins=20)
+    heatmap = fig.data[0]
+    assert np.nansum(heatmap.z) == len(df)
+    assert heatmap.z.shape == (20, 20)
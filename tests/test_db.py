@@ -0,0 +1,108 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from app.data import db
+from app.data.db import BUSY_RETRIES, ConnectionPool, busy_stats, get_connection, get_pool, retry_on_busy
+
+
+def test_pool_reuses_released_connections(db_path):
+    pool = ConnectionPool(db_path, max_size=2)
+    with pool.connection() as first:
+        pass
+    with pool.connection() as second:
+        assert second is first
+    stats = pool.stats()
+    assert (stats["hits"], stats["misses"], stats["open"]) == (1, 1, 1)
+    pool.close_all()
+
+
+def test_exhausted_pool_times_out(db_path):
+    pool = ConnectionPool(db_path, max_size=1)
+    with pool.connection():
+        with pytest.raises(TimeoutError):
+            pool.acquire(timeout=0.05)
+    assert pool.stats()["timeouts"] == 1
+    pool.close_all()
+
+
+def test_read_only_pool_refuses_writes(db_path):
+    pool = get_pool(db_path, read_only=True)
+    with pool.connection() as conn:
+        with pytest.raises(Exception, match="readonly|read-only|attempt to write"):
+            conn.execute("INSERT INTO users (username, password_hash) VALUES ('x', 'y')")
+
+
+def test_closed_lease_is_replaced(db_path):
+    conn = get_connection(db_path)
+    assert get_connection(db_path) is conn
+
+    #a caller closing the thread's leased connection must not break later pages
+    conn.close()
+    replacement = get_connection(db_path)
+    assert replacement is not conn
+    assert replacement.execute("SELECT 1").fetchone() == (1,)
+    #the closed connection gave its slot back instead of leaking it
+    assert get_pool(db_path).stats()["open"] == 1
+
+
+def _flaky(failures, error="database is locked"):
+    """A conn-first write that raises failures OperationalErrors before it succeeds, and counts its calls."""
+    calls = []
+
+    @retry_on_busy
+    def write(conn):
+        calls.append(conn.in_transaction)
+        if len(calls) <= failures:
+            raise sqlite3.OperationalError(error)
+        return "written"
+    return write, calls
+
+
+def test_busy_write_is_retried(conn, monkeypatch):
+    monkeypatch.setattr(db, "BUSY_BACKOFF", 0.001)
+    write, calls = _flaky(2)
+    recovered = busy_stats()["recovered"]
+    assert write(conn) == "written"
+    assert len(calls) == 3
+    assert busy_stats()["recovered"] == recovered + 1
+
+
+def test_busy_write_gives_up_after_the_retries(conn, monkeypatch):
+    monkeypatch.setattr(db, "BUSY_BACKOFF", 0.001)
+    write, calls = _flaky(BUSY_RETRIES + 1)
+    with pytest.raises(sqlite3.OperationalError):
+        write(conn)
+    assert len(calls) == BUSY_RETRIES + 1
+
+
+def test_other_errors_are_not_retried(conn):
+    write, calls = _flaky(1, error="no such table: nope")
+    with pytest.raises(sqlite3.OperationalError, match="no such table"):
+        write(conn)
+    assert len(calls) == 1
+
+
+def test_busy_write_inside_a_transaction_is_not_retried(conn):
+    #replaying one statement can't replay the rest of the caller's transaction
+    conn.execute("BEGIN")
+    write, calls = _flaky(1)
+    with pytest.raises(sqlite3.OperationalError, match="locked"):
+        write(conn)
+    assert calls == [True]
+    conn.rollback()
+
+
+def test_write_waits_out_another_writer(db_path, conn, add_incident):
+    #no busy timeout, so SQLITE_BUSY comes straight back and only the retries can wait
+    conn.execute("PRAGMA busy_timeout = 0")
+    other = sqlite3.connect(db_path, check_same_thread=False)
+    other.execute("BEGIN IMMEDIATE")
+    threading.Timer(0.1, other.rollback).start()
+    try:
+        assert add_incident(conn) == 1
+    finally:
+        time.sleep(0.1)
+        other.close()
@@ -0,0 +1,47 @@
+import pandas as pd
+
+from app.data.frames import compact_frame
+from app.data.tickets import get_all_tickets, insert_tickets_many
+
+
+def _tickets():
+    return pd.DataFrame({
+        "ticket_id": [1, 2, 3],
+        "priority": ["High", "Low", "Urgent"],
+        "status": ["Open", "Resolved", "Open"],
+        "assigned_to": ["a", "b", "a"],
+        "created_at": ["2024-01-01 10:00:00", "2024-01-02 11:00:00", "not a date"],
+        "resolution_time_hours": [5, 200, None],
+    })
+
+
+def test_key_column_stays_int64():
+    df = compact_frame(_tickets(), "it_tickets")
+    assert df["ticket_id"].dtype == "int64"
+    #a later delta with ids past int8 still fits without a cast
+    merged = pd.concat([df, compact_frame(_tickets().assign(ticket_id=[300, 70_000, 5_000_000_000]), "it_tickets")])
+    assert merged["ticket_id"].dtype == "int64"
+    assert merged["ticket_id"].iloc[-1] == 5_000_000_000
+
+
+def test_other_columns_are_compacted():
+    df = compact_frame(_tickets(), "it_tickets")
+    assert df["resolution_time_hours"].dtype == "float32"
+    assert df["status"].dtype == "category"
+    assert pd.api.types.is_datetime64_dtype(df["created_at"])
+    assert df["created_at"].isna().tolist() == [False, False, True]
+    #priority is ordered, unknown values kept and sorted last
+    assert list(df["priority"].cat.categories) == ["Low", "Medium", "High", "Critical", "Urgent"]
+    assert df["priority"].cat.ordered
+
+
+def test_integer_columns_other_than_the_key_are_downcast():
+    df = compact_frame(pd.DataFrame({"dataset_id": [1, 2], "rows": [10, 20], "columns": [3, 4]}),
+                       "datasets_metadata")
+    assert df["dataset_id"].dtype == "int64"
+    assert df["rows"].dtype == "int8" and df["columns"].dtype == "int8"
+
+
+def test_get_all_keeps_ids_int64(conn):
+    insert_tickets_many(conn, [("High", "x", "Open", "a", "2024-01-01 00:00:00", 1)] * 3)
+    assert get_all_tickets(conn)["ticket_id"].dtype == "int64"
@@ -0,0 +1,100 @@
+import pytest
+
+from app.data.incidents import load_incident_data_to_sql
+from app.data.ingest import BULK_PRAGMAS, ingest_csv
+
+# Columns of cyber_incidents the CSV fills
+COLUMNS = ["timestamp", "severity", "category", "status", "description"]
+
+HEADER = "incident_id,timestamp,severity,category,status,description\n"
+
+
+def _line(incident_id, status="Open"):
+    return f"{incident_id},2024-01-01 10:00:00.000000,High,Malware,{status},Incident {incident_id}\n"
+
+
+def _rows(conn):
+    return conn.execute(
+        "SELECT source_key, status FROM cyber_incidents ORDER BY CAST(source_key AS INTEGER)"
+    ).fetchall()
+
+
+def test_resume_reads_only_appended_rows(conn, tmp_path):
+    csv_path = tmp_path / "incidents.csv"
+    csv_path.write_text(HEADER + _line(1) + _line(2) + _line(3))
+    assert load_incident_data_to_sql(conn, csv_path, incremental=True) == 3
+
+    #nothing new, the checkpoint sits at the end of the file
+    assert load_incident_data_to_sql(conn, csv_path, incremental=True) == 0
+
+    with open(csv_path, "a") as f:
+        f.write(_line(4) + _line(5))
+    assert load_incident_data_to_sql(conn, csv_path, incremental=True) == 2
+    assert [key for key, _ in _rows(conn)] == ["1", "2", "3", "4", "5"]
+
+
+def test_half_written_line_waits_for_the_next_run(conn, tmp_path):
+    csv_path = tmp_path / "incidents.csv"
+    csv_path.write_text(HEADER + _line(1) + _line(2)[:10])
+    assert load_incident_data_to_sql(conn, csv_path, incremental=True) == 1
+
+    with open(csv_path, "a") as f:
+        f.write(_line(2)[10:])
+    assert load_incident_data_to_sql(conn, csv_path, incremental=True) == 1
+    assert [key for key, _ in _rows(conn)] == ["1", "2"]
+
+
+def test_duplicate_id_updates_instead_of_inserting(conn, tmp_path):
+    csv_path = tmp_path / "incidents.csv"
+    csv_path.write_text(HEADER + _line(1) + _line(2))
+    load_incident_data_to_sql(conn, csv_path, incremental=True)
+
+    with open(csv_path, "a") as f:
+        f.write(_line(2, status="Closed") + _line(3))
+    load_incident_data_to_sql(conn, csv_path, incremental=True)
+    assert _rows(conn) == [("1", "Open"), ("2", "Closed"), ("3", "Open")]
+
+
+def test_rewritten_file_is_read_again_without_duplicates(conn, tmp_path):
+    csv_path = tmp_path / "incidents.csv"
+    csv_path.write_text(HEADER + _line(1) + _line(2))
+    load_incident_data_to_sql(conn, csv_path, incremental=True)
+
+    #same length but different bytes before the checkpoint, so it can't resume
+    csv_path.write_text(HEADER + _line(1, status="Done") + _line(2))
+    assert load_incident_data_to_sql(conn, csv_path, incremental=True) == 2
+    assert _rows(conn) == [("1", "Done"), ("2", "Open")]
+
+
+def test_refuses_table_loaded_without_keys(conn, tmp_path):
+    csv_path = tmp_path / "incidents.csv"
+    csv_path.write_text(HEADER + _line(1))
+    load_incident_data_to_sql(conn, csv_path)
+
+    with pytest.raises(ValueError, match="without a source_key"):
+        load_incident_data_to_sql(conn, csv_path, incremental=True)
+    assert conn.execute("SELECT COUNT(*) FROM cyber_incidents").fetchone()[0] == 1
+
+
+def _pragmas(conn):
+    return {name: conn.execute(f"PRAGMA {name}").fetchone()[0] for name in BULK_PRAGMAS}
+
+
+def test_pragmas_are_restored_after_a_load(conn, tmp_path):
+    csv_path = tmp_path / "incidents.csv"
+    csv_path.write_text(HEADER + _line(1) + _line(2))
+    before = _pragmas(conn)
+    ingest_csv(conn, csv_path, "cyber_incidents", COLUMNS)
+    assert _pragmas(conn) == before
+
+
+def test_failed_load_rolls_back_and_restores_pragmas(conn, tmp_path):
+    csv_path = tmp_path / "incidents.csv"
+    csv_path.write_text(HEADER + _line(1) + _line(2))
+    before = _pragmas(conn)
+    #severity can't be cast to an integer, the first chunk fails
+    with pytest.raises(ValueError):
+        ingest_csv(conn, csv_path, "cyber_incidents", COLUMNS, dtypes={"severity": "int64"})
+    assert _pragmas(conn) == before
+    assert not conn.in_transaction
+    assert conn.execute("SELECT COUNT(*) FROM cyber_incidents").fetchone()[0] == 0
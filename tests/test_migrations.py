@@ -0,0 +1,42 @@
+from app.data.db import connect_database
+from app.data.migrations import LATEST_VERSION, MIGRATIONS, get_schema_version, migrate
+
+
+def test_versions_are_contiguous():
+    versions = [version for version, _, _ in MIGRATIONS]
+    assert versions == list(range(1, len(MIGRATIONS) + 1))
+    assert LATEST_VERSION == 10
+
+
+def test_fresh_database_gets_every_migration(tmp_path):
+    conn = connect_database(tmp_path / "fresh.db")
+    try:
+        assert migrate(conn) == list(range(1, LATEST_VERSION + 1))
+        assert get_schema_version(conn) == LATEST_VERSION
+        assert migrate(conn) == []
+    finally:
+        conn.close()
+
+
+def test_upgrade_keeps_data(tmp_path):
+    conn = connect_database(tmp_path / "old.db")
+    try:
+        assert migrate(conn, target=3) == [1, 2, 3]
+        conn.execute(
+            "INSERT INTO cyber_incidents (timestamp, severity, category, status, description) "
+            "VALUES ('2024-01-01 00:00:00', 'High', 'Malware', 'Open', 'kept')"
+        )
+        conn.commit()
+
+        assert migrate(conn) == list(range(4, LATEST_VERSION + 1))
+        assert conn.execute("SELECT description FROM cyber_incidents").fetchall() == [("kept",)]
+        #rows already there are indexed by the search migration
+        assert conn.execute("SELECT COUNT(*) FROM incidents_fts WHERE incidents_fts MATCH 'kept'").fetchone()[0] == 1
+    finally:
+        conn.close()
+
+
+def test_rerunning_a_migration_is_safe(conn):
+    for _, _, apply in MIGRATIONS:
+        apply(conn)
+    assert get_schema_version(conn) == LATEST_VERSION
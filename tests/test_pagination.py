@@ -0,0 +1,82 @@
+import pytest
+from streamlit.testing.v1 import AppTest
+
+from app.data.pagination import fetch_page
+from app.data.tickets import TICKET_FILTERS, get_tickets_page, insert_tickets_many
+
+
+def _add_tickets(conn, count):
+    priorities = ["Low", "High"]
+    insert_tickets_many(conn, [
+        (priorities[i % 2], f"ticket {i}", "Open", "IT_Support", "2024-01-01 00:00:00", i)
+        for i in range(count)
+    ])
+
+
+def _ids(page):
+    return page["ticket_id"].tolist()
+
+
+def test_after_cursor_walks_down_the_table(conn):
+    _add_tickets(conn, 25)
+    first = get_tickets_page(conn, limit=10)
+    assert _ids(first) == list(range(25, 15, -1))
+    second = get_tickets_page(conn, limit=10, after_id=first["ticket_id"].iloc[-1])
+    assert _ids(second) == list(range(15, 5, -1))
+    last = get_tickets_page(conn, limit=10, after_id=second["ticket_id"].iloc[-1])
+    assert _ids(last) == list(range(5, 0, -1))
+
+
+def test_before_cursor_returns_the_previous_page_newest_first(conn):
+    _add_tickets(conn, 25)
+    page = get_tickets_page(conn, limit=10, before_id=15)
+    assert _ids(page) == list(range(25, 15, -1))
+
+
+def test_cursor_respects_filters(conn):
+    _add_tickets(conn, 25)
+    page = get_tickets_page(conn, limit=5, after_id=20, priority="High")
+    assert _ids(page) == [18, 16, 14, 12, 10]
+    assert set(page["priority"]) == {"High"}
+
+
+def test_after_and_before_together_is_an_error(conn):
+    with pytest.raises(ValueError):
+        fetch_page(conn, "it_tickets", "ticket_id", TICKET_FILTERS, after=5, before=10)
+
+
+def test_unknown_filter_column_is_an_error(conn):
+    with pytest.raises(ValueError):
+        fetch_page(conn, "it_tickets", "ticket_id", TICKET_FILTERS, filters={"description": "x"})
+
+
+def _table_app():
+    import pandas as pd
+    import streamlit as st
+    from app.ui.tables import paginated_table
+
+    ids = st.session_state.setdefault("ids", list(range(1, 31)))
+
+    def fetch(limit, after_id=None, before_id=None):
+        rows = sorted(ids, reverse=True)
+        if after_id is not None:
+            rows = [i for i in rows if i < after_id]
+        return pd.DataFrame({"id": rows[:limit]})
+
+    page = paginated_table("table", fetch, "id", page_size=10)
+    st.session_state.shown = page["id"].tolist()
+
+
+def test_empty_page_after_deletes_starts_over():
+    at = AppTest.from_function(_table_app).run()
+    at.button(key="table_next").click().run()
+    at.button(key="table_next").click().run()
+    assert at.session_state.shown == list(range(10, 0, -1))
+    assert at.session_state.table["page"] == 3
+
+    #everything from the cursor down is deleted, the table goes back to the first page
+    at.session_state.ids = list(range(11, 31))
+    at.run()
+    assert at.session_state.shown == list(range(30, 20, -1))
+    assert at.session_state.table["page"] == 1
+    assert not at.exception
@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.data.datasets import insert_datasets_many
+from app.data.rankings import top_datasets_by_rows, top_staff_by_open_tickets, top_staff_by_resolution_time
+from app.data.sla import RELATIVE_ACCURACY
+from app.data.tickets import insert_tickets_many
+
+
+def _datasets(conn):
+    rng = np.random.default_rng(10)
+    #few distinct row counts so the tie break on dataset_id matters
+    rows = [None if i % 17 == 0 else int(v) for i, v in enumerate(rng.integers(1, 40, 300))]
+    insert_datasets_many(conn, [(f"d{i}", r, 3, "x", "2024-01-01") for i, r in enumerate(rows)])
+    return pd.DataFrame({"dataset_id": np.arange(1, 301), "rows": rows}).dropna()
+
+
+def _tickets(conn):
+    rng = np.random.default_rng(11)
+    staff = [f"IT_Support_{c}" for c in "ABCDEFGH"]
+    assigned_to = rng.choice(staff, 800, p=np.arange(1, 9) / 36)
+    frame = pd.DataFrame({
+        "status": rng.choice(["Open", "Resolved"], 800),
+        "assigned_to": assigned_to,
+        #each assignee resolves at their own typical speed
+        "resolution_time_hours": [5.0 * (1 + staff.index(a)) + v for a, v in zip(assigned_to, rng.integers(0, 4, 800))],
+    })
+    insert_tickets_many(conn, [
+        ("High", "test", row.status, row.assigned_to, "2024-01-01 00:00:00", row.resolution_time_hours)
+        for row in frame.itertuples()
+    ])
+    return frame
+
+
+@pytest.mark.parametrize("largest", [True, False])
+def test_top_datasets_equal_a_sorted_frame(conn, largest):
+    frame = _datasets(conn)
+    expected = frame.sort_values(["rows", "dataset_id"], ascending=not largest).head(25)
+    result = top_datasets_by_rows(conn, k=25, largest=largest)
+    assert result["dataset_id"].tolist() == expected["dataset_id"].tolist()
+    assert result["rows"].tolist() == expected["rows"].astype(int).tolist()
+
+
+@pytest.mark.parametrize("largest", [True, False])
+def test_top_staff_by_open_tickets_equal_a_sorted_frame(conn, largest):
+    frame = _tickets(conn)
+    counts = frame[frame["status"] == "Open"].groupby("assigned_to").size().rename("count").reset_index()
+    expected = counts.sort_values(["count", "assigned_to"], ascending=[not largest, True]).head(5)
+    result = top_staff_by_open_tickets(conn, k=5, largest=largest)
+    assert result.values.tolist() == expected.values.tolist()
+
+
+def test_top_staff_by_resolution_time_matches_the_exact_averages(conn):
+    frame = _tickets(conn)
+    resolved = frame[frame["status"] == "Resolved"]
+    exact = resolved.groupby("assigned_to")["resolution_time_hours"].agg(["size", "mean"])
+    exact = exact[exact["size"] >= 30].sort_values("mean", ascending=False)
+
+    result = top_staff_by_resolution_time(conn, k=3, min_tickets=30)
+    assert result["assigned_to"].tolist() == exact.index[:3].tolist()
+    assert result["count"].tolist() == exact["size"].iloc[:3].tolist()
+    for estimate, value in zip(result["avg_resolution_hours"], exact["mean"]):
+        assert abs(estimate - value) <= RELATIVE_ACCURACY * value
+
+
+def test_k_out_of_range_is_an_error(conn):
+    with pytest.raises(ValueError):
+        top_datasets_by_rows(conn, k=0)
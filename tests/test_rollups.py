@@ -0,0 +1,66 @@
+from app.data.bulk import bulk_load
+from app.data.incidents import delete_incident, insert_incidents_many, update_incident_status
+from app.data.rollups import backfill_rollups
+
+
+def _incidents(count):
+    categories = ["Malware", "Phishing", "DDoS"]
+    return [
+        (f"2024-01-{1 + i % 20:02d} {i % 24:02d}:00:00", "High" if i % 3 else "Low", categories[i % 3], "Open",
+         f"incident {i}")
+        for i in range(count)
+    ]
+
+
+def _rollup(conn):
+    #deleted rows can leave buckets at zero, those aren't counts
+    return sorted(conn.execute("SELECT * FROM incident_rollups WHERE count != 0").fetchall())
+
+
+def _rebuilt(conn):
+    backfill_rollups(conn, tables=("cyber_incidents",))
+    return _rollup(conn)
+
+
+def test_triggers_keep_rollups_in_step_with_writes(conn, add_incident):
+    insert_incidents_many(conn, _incidents(60))
+    update_incident_status(conn, 5, "Resolved")
+    delete_incident(conn, 6)
+    first = add_incident(conn, timestamp="2024-02-03 04:05:06")
+    delete_incident(conn, first)
+    add_incident(conn, timestamp="2024-02-10 12:00:00", category="Phishing")
+
+    maintained = _rollup(conn)
+    assert maintained == _rebuilt(conn)
+    #every bucket size counts every incident once
+    for size in ("hour", "day", "week"):
+        total = conn.execute("SELECT SUM(count) FROM incident_rollups WHERE bucket_size = ?", (size,)).fetchone()[0]
+        assert total == 60
+
+
+def test_bulk_load_rebuilds_rollups_once(conn):
+    insert_incidents_many(conn, _incidents(10))
+    with bulk_load(conn, "cyber_incidents"):
+        conn.executemany(
+            "INSERT INTO cyber_incidents (timestamp, severity, category, status, description) VALUES (?, ?, ?, ?, ?)",
+            _incidents(50),
+        )
+        #no per-row trigger ran inside the load
+        assert conn.execute("SELECT SUM(count) FROM incident_rollups WHERE bucket_size = 'day'").fetchone()[0] == 10
+    conn.commit()
+
+    assert conn.execute("SELECT SUM(count) FROM incident_rollups WHERE bucket_size = 'day'").fetchone()[0] == 60
+    assert _rollup(conn) == _rebuilt(conn)
+    #the triggers are back for the writes after the load
+    update_incident_status(conn, 1, "Resolved")
+    assert _rollup(conn) == _rebuilt(conn)
+
+
+def test_failed_bulk_load_keeps_the_triggers(conn):
+    try:
+        with bulk_load(conn, "cyber_incidents"):
+            raise RuntimeError("load failed")
+    except RuntimeError:
+        conn.rollback()
+    insert_incidents_many(conn, _incidents(5))
+    assert conn.execute("SELECT SUM(count) FROM incident_rollups WHERE bucket_size = 'day'").fetchone()[0] == 5
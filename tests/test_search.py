@@ -0,0 +1,61 @@
+from app.data.bulk import bulk_load
+from app.data.incidents import delete_incident, insert_incidents_many
+from app.data.search import rebuild_search_indexes, search_incidents
+
+
+def _add(conn, descriptions):
+    insert_incidents_many(conn, [
+        ("2024-01-01 00:00:00", "High", "Malware", "Open", description) for description in descriptions
+    ])
+
+
+def _found(conn, query):
+    results = search_incidents(conn, query)
+    return sorted(results["incident_id"].tolist()) if not results.empty else []
+
+
+def _check_index(conn):
+    #fts5 compares an external content index with its base table and raises if they differ
+    conn.execute("INSERT INTO incidents_fts (incidents_fts, rank) VALUES ('integrity-check', 1)")
+
+
+def test_index_follows_updates_and_deletes(conn):
+    _add(conn, ["ransomware on the file server", "phishing email to finance", "ransomware note on a laptop"])
+    assert _found(conn, "ransomware") == [1, 3]
+
+    conn.execute("UPDATE cyber_incidents SET description = 'credential phishing page' WHERE incident_id = 3")
+    conn.commit()
+    delete_incident(conn, 2)
+    assert _found(conn, "ransomware") == [1]
+    assert _found(conn, "phishing") == [3]
+    _check_index(conn)
+
+    #a status change leaves the description and the index alone
+    conn.execute("UPDATE cyber_incidents SET status = 'Resolved' WHERE incident_id = 1")
+    conn.commit()
+    _check_index(conn)
+
+
+def test_bulk_load_rebuilds_the_index_once(conn):
+    _add(conn, ["ransomware on the file server"])
+    with bulk_load(conn, "cyber_incidents"):
+        conn.executemany(
+            "INSERT INTO cyber_incidents (timestamp, severity, category, status, description) VALUES (?, ?, ?, ?, ?)",
+            [("2024-01-02 00:00:00", "Low", "Phishing", "Open", f"phishing wave {i}") for i in range(20)],
+        )
+    conn.commit()
+    _check_index(conn)
+    assert len(_found(conn, "phishing")) == 20
+
+    #the triggers are back after the load
+    delete_incident(conn, 1)
+    assert _found(conn, "ransomware") == []
+    _check_index(conn)
+
+
+def test_rebuild_matches_the_maintained_index(conn):
+    _add(conn, [f"malware sample {i}" for i in range(10)])
+    delete_incident(conn, 4)
+    before = _found(conn, "malware")
+    rebuild_search_indexes(conn)
+    assert _found(conn, "malware") == before == [i for i in range(1, 11) if i != 4]
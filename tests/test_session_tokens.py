@@ -0,0 +1,96 @@
+import time
+
+import pytest
+
+from app.data.db import connect_database
+from app.data.revocations import get_revocations, insert_revoked_token
+from app.services import session_tokens
+from app.services.session_tokens import issue_token, revoke_token, revoke_user_tokens, validate_token
+
+
+@pytest.fixture(autouse=True)
+def fresh_revocations():
+    """Every test reads the revocations of its own database."""
+    session_tokens.forget_revocations()
+    yield
+    session_tokens.forget_revocations()
+
+
+@pytest.fixture
+def write_conn(db_path, monkeypatch):
+    """revoke_token writes to the test database instead of the app's."""
+    conn = connect_database(db_path)
+    monkeypatch.setattr(session_tokens, "get_connection", lambda: conn)
+    yield conn
+    conn.close()
+
+
+def test_valid_token(conn):
+    token = issue_token("alice", "admin")
+    assert validate_token(token, conn) == ("alice", "admin")
+
+
+def test_expired_token(conn):
+    token = issue_token("alice", "user", ttl=-1)
+    assert validate_token(token, conn) is None
+
+
+def test_tampered_token(conn):
+    body, signature = issue_token("alice", "user").split(".")
+    forged = session_tokens._b64encode(
+        session_tokens._b64decode(body).replace(b'"user"', b'"admin"')
+    )
+    assert validate_token(f"{forged}.{signature}", conn) is None
+    assert validate_token("not a token", conn) is None
+
+
+def test_revoked_token(conn, write_conn):
+    token = issue_token("alice", "user")
+    other = issue_token("alice", "user")
+    assert validate_token(token, conn) is not None
+
+    revoke_token(token)
+    assert validate_token(token, conn) is None
+    assert validate_token(other, conn) == ("alice", "user")
+
+
+def test_revoked_user(conn):
+    token = issue_token("alice", "user")
+    bystander = issue_token("bob", "user")
+    revoke_user_tokens(conn, "alice")
+    assert validate_token(token, conn) is None
+    assert validate_token(bystander, conn) == ("bob", "user")
+
+    #a login after the revocation gets a working token again
+    time.sleep(0.01)
+    assert validate_token(issue_token("alice", "admin"), conn) == ("alice", "admin")
+
+
+def test_revocations_survive_a_restart(db_path, write_conn):
+    token = issue_token("alice", "user")
+    revoke_token(token)
+
+    #a fresh connection has nothing cached, the revocation is read back from the database
+    conn = connect_database(db_path)
+    try:
+        revoked, _ = get_revocations.uncached(conn)
+        assert len(revoked) == 1
+        assert validate_token(token, conn) is None
+    finally:
+        conn.close()
+
+
+def test_other_process_revocation_applies_after_sync(conn, db_path, monkeypatch):
+    token = issue_token("alice", "user")
+    assert validate_token(token, conn) is not None
+
+    #revoked on another connection, as another process would, without touching this one's memory
+    other = connect_database(db_path)
+    try:
+        insert_revoked_token(other, session_tokens._decode(token)["jti"], time.time() + 60)
+    finally:
+        other.close()
+    assert validate_token(token, conn) is not None
+
+    monkeypatch.setattr(session_tokens, "REVOCATION_SYNC_SECONDS", 0)
+    assert validate_token(token, conn) is None
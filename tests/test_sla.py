@@ -0,0 +1,72 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+from app.data.sla import (LN_GAMMA, RELATIVE_ACCURACY, SLA_QUANTILES, ZERO_BUCKET, backfill_sla_sketches,
+                          get_resolution_percentiles, sketch_quantiles)
+from app.data.tickets import delete_ticket, insert_tickets_many, update_ticket_status
+
+
+def _bucket(value):
+    return ZERO_BUCKET if value <= 0 else math.ceil(math.log(value) / LN_GAMMA)
+
+
+def _within_accuracy(estimates, exact):
+    for estimate, value in zip(estimates, exact):
+        assert abs(estimate - value) <= RELATIVE_ACCURACY * value + 1e-9
+
+
+def _add_tickets(conn, hours, status="Resolved"):
+    insert_tickets_many(conn, [
+        (["Low", "High"][i % 2], "test", status, "IT_Support_A", f"2024-0{1 + i % 3}-01 10:00:00", float(h))
+        for i, h in enumerate(hours)
+    ])
+
+
+def test_quantiles_are_within_the_relative_accuracy():
+    values = np.random.default_rng(5).lognormal(mean=2, sigma=1.5, size=5000)
+    buckets, counts = np.unique([_bucket(v) for v in values], return_counts=True)
+    estimates = sketch_quantiles(buckets, counts, quantiles=(0.01, 0.25, 0.5, 0.9, 0.99, 1.0))
+    _within_accuracy(estimates, np.quantile(values, (0.01, 0.25, 0.5, 0.9, 0.99, 1.0), method="lower"))
+
+
+def test_zero_and_empty_sketches():
+    assert sketch_quantiles([ZERO_BUCKET], [3]) == [0.0] * len(SLA_QUANTILES)
+    assert all(np.isnan(sketch_quantiles([], [])))
+
+
+def test_percentiles_from_the_triggers_match_the_tickets(conn):
+    hours = np.random.default_rng(6).gamma(2.0, 20.0, size=600).round(1) + 0.1
+    _add_tickets(conn, hours)
+    _add_tickets(conn, [1000.0] * 50, status="Open")
+
+    overall = get_resolution_percentiles(conn).iloc[0]
+    assert overall["count"] == len(hours)
+    _within_accuracy(overall[["p50", "p90", "p99"]], np.quantile(hours, SLA_QUANTILES, method="lower"))
+
+    by_priority = get_resolution_percentiles(conn, by="priority").set_index("priority")
+    for i, priority in enumerate(["Low", "High"]):
+        exact = np.quantile(hours[i::2], SLA_QUANTILES, method="lower")
+        _within_accuracy(by_priority.loc[priority, ["p50", "p90", "p99"]], exact)
+
+
+def test_merged_groups_equal_the_overall_sketch(conn):
+    _add_tickets(conn, np.arange(1, 301, dtype=float))
+    merged = get_resolution_percentiles(conn, by="month", merge=True)
+    overall = get_resolution_percentiles(conn)
+    pd.testing.assert_frame_equal(merged, overall)
+
+
+def test_reopened_and_deleted_tickets_leave_the_sketch(conn):
+    _add_tickets(conn, [10.0, 20.0, 30.0, 40.0])
+    update_ticket_status(conn, 4, "Open")
+    delete_ticket(conn, 3)
+    result = get_resolution_percentiles(conn).iloc[0]
+    assert result["count"] == 2
+    #numpy's "lower" p99 of two tickets is the smaller one
+    _within_accuracy(result[["p50", "p99"]], np.quantile([10.0, 20.0], (0.5, 0.99), method="lower"))
+
+    maintained = conn.execute("SELECT * FROM ticket_sla_sketches WHERE count != 0 ORDER BY 1, 2, 3").fetchall()
+    backfill_sla_sketches(conn)
+    assert conn.execute("SELECT * FROM ticket_sla_sketches WHERE count != 0 ORDER BY 1, 2, 3").fetchall() == maintained
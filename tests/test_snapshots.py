@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+from pandas.testing import assert_frame_equal
+
+from app.data.snapshots import SNAPSHOT_COLUMNS, refresh_snapshot
+from app.data.tickets import delete_ticket, insert_tickets_many, update_ticket_status
+
+
+def _add_tickets(conn, count, assigned_to="IT_Support_A"):
+    insert_tickets_many(conn, [
+        (["Low", "High"][i % 2], "test", "Open", assigned_to, f"2024-01-{1 + i % 28:02d} 10:00:00",
+         None if i % 5 == 0 else float(i))
+        for i in range(count)
+    ])
+
+
+def _table(conn, table):
+    columns = list(SNAPSHOT_COLUMNS[table][1])
+    df = pd.read_sql_query(f"SELECT {', '.join(columns)} FROM {table} ORDER BY {columns[0]}", conn)
+    df["created_at"] = pd.to_datetime(df["created_at"]).astype("datetime64[us]")
+    return df
+
+
+def _check(conn, base):
+    snapshot = refresh_snapshot(conn, "it_tickets", base=base)
+    #plain arrays, categoricals back to text, so it compares with a frame read through SQLite
+    frame = pd.DataFrame({name: np.asarray(values) for name, values in snapshot.frame().items()})
+    expected = _table(conn, "it_tickets")
+    assert_frame_equal(frame.sort_values("ticket_id").reset_index(drop=True), expected, check_dtype=False)
+    return snapshot
+
+
+def test_snapshot_follows_inserts_updates_and_deletes(conn, tmp_path):
+    base = tmp_path / "snapshots"
+    _add_tickets(conn, 50)
+    first = _check(conn, base)
+
+    #appends go into the spare rows of the same files
+    _add_tickets(conn, 10)
+    appended = _check(conn, base)
+    assert appended.path == first.path and appended.rows == 60
+
+    update_ticket_status(conn, 3, "Resolved")
+    updated = _check(conn, base)
+    assert updated.path != first.path
+
+    delete_ticket(conn, 7)
+    assert _check(conn, base).rows == 59
+
+
+def test_snapshot_grows_past_its_capacity_and_new_categories(conn, tmp_path):
+    base = tmp_path / "snapshots"
+    _add_tickets(conn, 20)
+    first = _check(conn, base)
+    _add_tickets(conn, first.meta["capacity"], assigned_to="IT_Support_B")
+    assert _check(conn, base).rows == 20 + first.meta["capacity"]
+
+
+def test_unchanged_table_returns_the_same_snapshot(conn, tmp_path):
+    base = tmp_path / "snapshots"
+    _add_tickets(conn, 5)
+    assert refresh_snapshot(conn, "it_tickets", base=base) is refresh_snapshot(conn, "it_tickets", base=base)
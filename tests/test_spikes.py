@@ -0,0 +1,62 @@
+import datetime
+
+import numpy as np
+import pytest
+
+from app.data.incidents import insert_incidents_many
+from app.data.spikes import BASELINE_DAYS, RECENT_DAYS, detect_spikes
+
+# Last day of the recent window in these tests
+AS_OF = datetime.date(2024, 3, 31)
+
+
+def _day(days_before):
+    return (AS_OF - datetime.timedelta(days=days_before)).isoformat()
+
+
+def _history(conn, phishing_recent):
+    """Malware and Phishing at 1-3 a day, then phishing_recent a day of Phishing over the recent window."""
+    incidents = []
+    for days_before in range(BASELINE_DAYS + RECENT_DAYS):
+        usual = 1 + days_before % 3
+        phishing = phishing_recent if days_before < RECENT_DAYS else usual
+        incidents += [(f"{_day(days_before)} 09:00:00", "High", "Malware", "Open", "test")] * usual
+        incidents += [(f"{_day(days_before)} 10:00:00", "High", "Phishing", "Open", "test")] * phishing
+    insert_incidents_many(conn, incidents)
+
+
+def test_recent_jump_is_a_spike(conn):
+    _history(conn, phishing_recent=10)
+    spikes = detect_spikes(conn, dimensions=("category",), as_of=AS_OF)
+    assert spikes["value"].tolist() == ["Phishing"]
+    assert spikes["recent"].iloc[0] == 10 * RECENT_DAYS
+
+
+def test_z_score_matches_a_direct_computation(conn):
+    _history(conn, phishing_recent=10)
+    spike = detect_spikes(conn, dimensions=("category",), as_of=AS_OF).iloc[0]
+
+    counts = np.array([10 if d < RECENT_DAYS else 1 + d % 3 for d in range(BASELINE_DAYS + RECENT_DAYS)])[::-1]
+    baseline, recent = counts[:BASELINE_DAYS], counts[BASELINE_DAYS:]
+    #a baseline this steady is noisier than it looks, the spread is floored at Poisson noise
+    stderr = max(baseline.std(ddof=1), np.sqrt(baseline.mean())) / np.sqrt(RECENT_DAYS)
+    assert spike["expected"] == pytest.approx(baseline.mean() * RECENT_DAYS)
+    assert spike["z_score"] == pytest.approx((recent.mean() - baseline.mean()) / stderr)
+
+
+def test_steady_history_has_no_spikes(conn):
+    _history(conn, phishing_recent=2)
+    assert detect_spikes(conn, as_of=AS_OF).empty
+
+
+def test_new_series_needs_min_recent_incidents(conn):
+    _history(conn, phishing_recent=2)
+    insert_incidents_many(conn, [(f"{_day(0)} 11:00:00", "Low", "Ransomware", "Open", "test")] * 2)
+    assert detect_spikes(conn, dimensions=("category",), as_of=AS_OF, min_recent=3).empty
+    spikes = detect_spikes(conn, dimensions=("category",), as_of=AS_OF, min_recent=2)
+    assert spikes["value"].tolist() == ["Ransomware"]
+
+
+def test_unknown_dimension_is_an_error(conn):
+    with pytest.raises(ValueError):
+        detect_spikes(conn, dimensions=("description",))
@@ -0,0 +1,88 @@
+import threading
+
+import bcrypt
+
+from app.services import bcrypt_cost
+from app.services.bcrypt_cost import get_hash_cost, needs_rehash
+from app.services.user_service import login_user, migrate_users_from_file
+
+PASSWORD = "Password1"
+
+
+def _add_user(conn, username, cost):
+    password_hash = bcrypt.hashpw(PASSWORD.encode("utf-8"), bcrypt.gensalt(cost)).decode("utf-8")
+    conn.execute("INSERT INTO users (username, password_hash) VALUES (?, ?)", (username, password_hash))
+    conn.commit()
+    return password_hash
+
+
+def _stored_hash(conn, username):
+    return conn.execute("SELECT password_hash FROM users WHERE username = ?", (username,)).fetchone()[0]
+
+
+def test_login_rehashes_a_hash_below_the_target_cost(conn, monkeypatch):
+    monkeypatch.setenv("BCRYPT_COST", "5")
+    _add_user(conn, "alice", 4)
+    assert login_user(conn, "alice", PASSWORD)[0]
+    assert get_hash_cost(_stored_hash(conn, "alice")) == 5
+    #the new hash still checks out
+    assert login_user(conn, "alice", PASSWORD)[0]
+
+
+def test_login_at_the_target_cost_keeps_the_hash(conn, monkeypatch):
+    monkeypatch.setenv("BCRYPT_COST", "4")
+    stored = _add_user(conn, "bob", 4)
+    assert login_user(conn, "bob", PASSWORD)[0]
+    assert _stored_hash(conn, "bob") == stored
+
+
+def test_failed_login_keeps_the_hash(conn, monkeypatch):
+    monkeypatch.setenv("BCRYPT_COST", "5")
+    stored = _add_user(conn, "carol", 4)
+    assert not login_user(conn, "carol", "wrong")[0]
+    assert _stored_hash(conn, "carol") == stored
+
+
+def test_no_rehash_while_calibration_is_running(monkeypatch):
+    monkeypatch.delenv("BCRYPT_COST", raising=False)
+    #a calibration that has started but not finished
+    monkeypatch.setattr(bcrypt_cost, "_calibration", threading.Thread())
+    monkeypatch.setattr(bcrypt_cost, "_target_cost", None)
+    assert not needs_rehash(bcrypt.hashpw(b"x", bcrypt.gensalt(4)).decode("utf-8"))
+
+    monkeypatch.setattr(bcrypt_cost, "_target_cost", 5)
+    assert needs_rehash(bcrypt.hashpw(b"x", bcrypt.gensalt(4)).decode("utf-8"))
+
+
+def test_migration_quarantines_bad_lines(conn, tmp_path):
+    good = bcrypt.hashpw(PASSWORD.encode("utf-8"), bcrypt.gensalt(4)).decode("utf-8")
+    users_file = tmp_path / "users.txt"
+    users_file.write_text("\n".join([
+        f"alice,{good}",
+        f"bob:{good}:Administrator",
+        "carol,plaintext",
+        f"dave,{good},superuser",
+        "",
+        "no-hash",
+        f"alice,{good}",
+    ]) + "\n")
+
+    summary = migrate_users_from_file(conn, users_file)
+    assert (summary["inserted"], summary["skipped"], summary["rejected"]) == (2, 1, 3)
+    assert conn.execute("SELECT username, role FROM users ORDER BY username").fetchall() == [
+        ("alice", "user"), ("bob", "admin")]
+
+    rejected = (tmp_path / "users.txt.rejected").read_text().splitlines()
+    assert [line.split("\t")[:2] for line in rejected] == [
+        ["3", "password hash is not bcrypt"],
+        ["4", "unknown role 'superuser'"],
+        ["6", "expected username and password hash"],
+    ]
+
+
+def test_migration_without_bad_lines_writes_no_quarantine(conn, tmp_path):
+    good = bcrypt.hashpw(PASSWORD.encode("utf-8"), bcrypt.gensalt(4)).decode("utf-8")
+    users_file = tmp_path / "users.txt"
+    users_file.write_text(f"alice,{good}\n")
+    assert migrate_users_from_file(conn, users_file, batch_size=1)["inserted"] == 1
+    assert not (tmp_path / "users.txt.rejected").exists()
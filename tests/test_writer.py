@@ -0,0 +1,70 @@
+import sqlite3
+
+import pytest
+
+from app.data.incidents import insert_incident
+from app.data.writer import GroupCommitWriter
+
+
+@pytest.fixture
+def writer(db_path):
+    writer = GroupCommitWriter(db_path)
+    yield writer
+    writer.stop()
+
+
+def _descriptions(conn):
+    return [row[0] for row in conn.execute("SELECT description FROM cyber_incidents ORDER BY incident_id")]
+
+
+def _insert_then_fail(conn, commit=True):
+    insert_incident(conn, "2024-01-01 00:00:00", "High", "Malware", "Open", "rolled back", commit=False)
+    raise ValueError("job failed")
+
+
+def _break_transaction(conn, commit=True):
+    #ends the writer's transaction under it, so the batch itself fails rather than just this job
+    conn.execute("ROLLBACK")
+    raise ValueError("job failed")
+
+
+def test_write_returns_result(conn, writer, add_incident):
+    incident_id = add_incident(writer)
+    assert _descriptions(conn) == ["test"]
+    assert conn.execute("SELECT MAX(incident_id) FROM cyber_incidents").fetchone()[0] == incident_id
+
+
+def test_failing_job_raises_and_is_rolled_back(conn, writer, add_incident):
+    with pytest.raises(ValueError, match="job failed"):
+        writer.write(_insert_then_fail)
+    add_incident(writer, description="after")
+    assert _descriptions(conn) == ["after"]
+    assert writer.stats()["failed_jobs"] == 1
+
+
+def test_failing_job_leaves_its_batch(conn, writer):
+    futures = [
+        writer.submit(insert_incident, "2024-01-01 00:00:00", "High", "Malware", "Open", "first"),
+        writer.submit(_insert_then_fail),
+        writer.submit(insert_incident, "2024-01-01 00:00:00", "High", "Malware", "Open", "second"),
+    ]
+    assert futures[0].result(timeout=10)
+    with pytest.raises(ValueError):
+        futures[1].result(timeout=10)
+    assert futures[2].result(timeout=10)
+    assert _descriptions(conn) == ["first", "second"]
+
+
+def test_failed_batch_doesnt_stop_the_writer(conn, writer, add_incident):
+    with pytest.raises(sqlite3.OperationalError):
+        writer.write(_break_transaction, timeout=10)
+    add_incident(writer, description="after")
+    assert _descriptions(conn) == ["after"]
+    assert writer.stats()["failed_commits"] == 1
+
+
+def test_write_after_stop_raises(db_path, add_incident):
+    writer = GroupCommitWriter(db_path)
+    writer.stop()
+    with pytest.raises(RuntimeError, match="stopped"):
+        add_incident(writer)